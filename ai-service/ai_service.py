@@ -1,7 +1,10 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+import httpx
 import os
 import json
 import re
+import asyncio
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,32 +12,203 @@ load_dotenv()
 # 환경에 따라 다른 데이터베이스 모듈 사용
 if os.getenv('USE_SUPABASE', 'false').lower() == 'true':
     try:
-        from database_requests import search_hotels, search_tours
+        from database_requests import search_hotels, search_tours, fetch_hotels, fetch_tours, fetch_recent_messages, SEARCH_CACHE
     except ImportError:
-        from database import search_hotels, search_tours
+        from database import search_hotels, search_tours, fetch_hotels, fetch_tours, fetch_recent_messages, SEARCH_CACHE
 else:
-    from database import search_hotels, search_tours
+    from database import search_hotels, search_tours, fetch_hotels, fetch_tours, fetch_recent_messages, SEARCH_CACHE
+
+# 비동기 검색 (asyncpg / httpx 가 없으면 동기 검색을 스레드에서 실행)
+try:
+    if search_hotels.__module__ == 'database_requests':
+        from database_requests import search_hotels_async, search_tours_async, get_available_regions_async
+    else:
+        from database_async import search_hotels_async, search_tours_async, get_available_regions_async
+except ImportError:
+    search_hotels_async = search_tours_async = get_available_regions_async = None
+
+from catalog import get_catalog
+from response_filter import FILTER_VOCABULARIES, StreamingResponseFilter, filter_response
+from description_index import detect_query_types, get_description_sections
+from pricing import get_price_table, quote, format_quote
+from keyword_matcher import KeywordMatcher
+from synonyms import get_synonym_graph
+from tour_name_index import TourNameIndex
+from fuzzy_match import FuzzyNameIndex
+from conversation_store import ConversationRecord, create_conversation_store
+from conversation_history import ConversationHistory
+from party_slots import UNTRACKED_KEYWORDS
+from message_features import TOUR_TYPE_KEYWORDS, STAGE_TIMINGS, build_message_features, intent_from_hits
+from cache import TTLCache
+
+# 호텔/투어 카탈로그를 메모리에 두고 주기적으로 갱신 (false 면 매 요청 DB 검색)
+USE_CATALOG = os.getenv('USE_CATALOG', 'true').lower() == 'true'
+CATALOG_REFRESH_INTERVAL = int(os.getenv('CATALOG_REFRESH_INTERVAL', '60'))  # 초
+
+# 대화 컨텍스트 보관 (마지막 사용 후 TTL 이 지나면 제거, 전체 크기 상한을 넘으면 오래 안 쓴 대화부터 제거)
+# 워커 / 서버가 여러 개면 sqlite:///경로 또는 redis://호스트:포트/db 로 공유
+CONVERSATION_STORE = os.getenv('CONVERSATION_STORE', 'memory')
+CONVERSATION_TTL = int(os.getenv('CONVERSATION_TTL', '3600'))  # 초
+CONVERSATION_MAX_BYTES = int(os.getenv('CONVERSATION_MAX_BYTES', str(32 * 1024 * 1024)))
+# 저장소에 없는 대화를 messages 테이블의 최근 턴으로 복원 (재시작 / 배포 후)
+CONVERSATION_REHYDRATE = os.getenv('CONVERSATION_REHYDRATE', 'true').lower() == 'true'
+CONVERSATION_REHYDRATE_TURNS = int(os.getenv('CONVERSATION_REHYDRATE_TURNS', '10'))
+CONVERSATION_HISTORY_CACHE = int(os.getenv('CONVERSATION_HISTORY_CACHE', '1024'))  # 조회 결과 캐시 대화 수
+
+# OpenAI 설정 (비동기 클라이언트는 한 워커에서 많은 동시 요청을 처리하도록 커넥션 풀을 넉넉히)
+OPENAI_MODEL = "gpt-4o-mini"
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '500'))
+OPENAI_MAX_KEEPALIVE = int(os.getenv('OPENAI_MAX_KEEPALIVE', '100'))
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '60'))  # 초
+
+# 메시지 분석 어휘 (지역 / 투어명과 함께 하나의 자동자로 컴파일해 메시지를 한 번만 훑음)
+GREETING_KEYWORDS = ['안녕하세요', '안녕', 'hi', 'hello', '헬로', '하이']
+HOTEL_KEYWORDS = ['호텔', '숙박', '리조트', '펜션', '게스트하우스', '객실', '룸']
+TOUR_KEYWORDS = ['투어', '여행', '관광', '체험', '액티비티', '일정']
+PRICE_KEYWORDS = ['가격', '얼마', '비용', '요금', '돈', '금액', '값', '성인', '어른', '아이', '아동', '유아', '소아', '어린이', '애기', '몇명', '몇 명', '인원']
+PACKAGE_LIST_KEYWORDS = ['무슨 패키지', '어떤 패키지', '패키지가 있', '패키지 뭐', '어떤거 있어', '무엇이 있어']
+TOUR_INTENT_KEYWORDS = ['투어', '관광', '체험', '액티비티', '투어가']
+HOTEL_INTENT_KEYWORDS = ['호텔', '숙박', '리조트', '펜션']
+PRICE_INTENT_KEYWORDS = ['가격', '비용', '요금', '얼마', '명은', '명이면', '인은', '인이면', '돈', '금액']
+PRICE_ONLY_KEYWORDS = ['가격', '얼마', '비용', '요금', '돈', '만원', '$']
+GENERAL_TRAVEL_KEYWORDS = ['여행지', '여행', '어디']
+INFO_REQUEST_KEYWORDS = ['내용', '정보', '자세한', '구체적인', '보여줘', '알려줘', '설명', '상세', '뭐에요', '뭐야', '무엇', '어떤', '구성', '포함', 'details', 'information']
+GOLF_KEYWORDS = ['골프', 'golf', '골프투어']
+RAFTING_KEYWORDS = ['래프팅', 'rafting', '래프팅투어']
+FAMILY_KEYWORDS = ['패밀리', 'family', '패밀리팩', 'pack']
+GUIDANCE_TOUR_KEYWORDS = ['베스트팩', 'bestpack', '호이안', '다낭', '나트랑', '푸꾸옥', '사파', '하롱베이', '칸토', '메콩', '래프팅']
+GUIDANCE_HOTEL_KEYWORDS = ['호텔', '숙소', '리조트', '펜션']
+
+MESSAGE_VOCABULARIES = {
+    **FILTER_VOCABULARIES,
+    'greeting': GREETING_KEYWORDS,
+    'hotel': HOTEL_KEYWORDS,
+    'tour': TOUR_KEYWORDS,
+    'price': PRICE_KEYWORDS,
+    'intent_package': PACKAGE_LIST_KEYWORDS,
+    'intent_tour': TOUR_INTENT_KEYWORDS,
+    'intent_hotel': HOTEL_INTENT_KEYWORDS,
+    'intent_price': PRICE_INTENT_KEYWORDS,
+    'price_only': PRICE_ONLY_KEYWORDS,
+    'general_travel': GENERAL_TRAVEL_KEYWORDS,
+    'info_request': INFO_REQUEST_KEYWORDS,
+    'golf': GOLF_KEYWORDS,
+    'rafting': RAFTING_KEYWORDS,
+    'family': FAMILY_KEYWORDS,
+    'guidance_tour': GUIDANCE_TOUR_KEYWORDS,
+    'guidance_hotel': GUIDANCE_HOTEL_KEYWORDS,
+    'tour_type': TOUR_TYPE_KEYWORDS,
+}
+
+SYSTEM_PROMPT = "당신은 똑똑한 여행 상담사입니다.\n\n**계산 룰 (최우선):**\n- 성인 + 아동(있을 시에만) = 총 인원\n- 가격은 예약금(있을 시) + 잔금으로 구성\n- 성인 숫자와 아동 숫자를 정확히 파악해서 그에 맞는 금액을 정확히 계산\n- 2명인데 3명으로 계산하거나 다른 금액을 계산하면 안됨\n- 어린이가 키 140cm 이상인 경우 성인으로 계산\n- 예시: 성인 2명 + 아이 2명인데 아이 두 명이 모두 140cm 이상이면 합계 총 성인 4명으로 계산\n\n**지속적 추적:**\n- 이전에 어떤 투어를 얘기하고 있는지 계속 추적\n- 생략이 잘 되기 때문에 투어명을 기억해야 함\n- 성인/아이 숫자도 말하다 생략되기 때문에 성인 숫자, 아이 숫자를 계속 추적 ('현재 인원' 이 주어지면 그 인원으로 계산)\n- 궁극적으로 정확한 금액 안내가 목표\n\n**문맥 추적:** \n- 같은 투어에 대한 연속 질문은 이전 대화를 참조\n- 새로운 투어 질문이면 이전 대화 정보를 적용하지 마세요\n- 주어 생략 시에만 같은 투어로 계속 진행\n\n**인원수 누적 계산:** \n- 같은 투어에 대한 추가 질문만 이전 인원수를 기억\n- 새로운 투어 질문이면 처음부터 계산\n- 추가 인원이 있으면 누적 ('아동 1명 추가' → 기본 인원 + 1명)\n\n**키 기준 가격 처리:**\n- 키 정보가 명시된 경우에만 140cm 기준으로 성인/아동 분류\n- 키 정보가 없으면 아동은 아동 가격으로 계산\n- 절대로 이전 대화의 키 정보를 새로운 질문에 적용하지 마세요\n\n**정확한 데이터 사용:**\n- 반드시 제공된 데이터베이스 가격만 사용\n- 없는 가격을 만들어내지 마세요\n- 데이터에 없는 정보는 '확인 후 안내드리겠습니다'\n\n**완전한 답변:** 성인과 아동 가격을 각각 계산하여 총액을 제시\n\n**정보 제한:** 확실하지 않으면 '그에 대한 정보는 카카오톡 상담을 이용해주세요'"
 
 class TravelAI:
     def __init__(self):
         self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.async_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_KEEPALIVE),
+                timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=5.0)
+            )
+        )
         self.last_search_results = {'hotels': [], 'tours': []}  # 마지막 검색 결과 저장
-        self.conversation_history = {}  # conversation_id별 대화 히스토리
-        self.response_cache = {}  # 응답 캐시
+        self.conversations = create_conversation_store(CONVERSATION_STORE, CONVERSATION_TTL, CONVERSATION_MAX_BYTES)  # conversation_id별 대화 컨텍스트
+        self.conversation_history = None
+        if CONVERSATION_REHYDRATE:
+            self.conversation_history = ConversationHistory(fetch_recent_messages, CONVERSATION_REHYDRATE_TURNS,
+                                                            CONVERSATION_HISTORY_CACHE)
+            self.conversations.loader = self.rehydrate_conversation
+        self.response_cache = TTLCache(max_entries=100, ttl=24 * 60 * 60, max_bytes=2 * 1024 * 1024, name='response')  # 응답 캐시 (24시간)
         self.database_cache = {}  # 데이터베이스 쿼리 캐시
         self.validation_logs = []  # 자가 검증 로그
-    
-    
+        self.catalog = get_catalog(fetch_hotels, fetch_tours, CATALOG_REFRESH_INTERVAL) if USE_CATALOG else None
+        self._message_indexes = (None, None, None, None)  # (어휘 버전, KeywordMatcher, TourNameIndex, FuzzyNameIndex)
+
+    def search_hotels(self, query_terms):
+        """호텔 검색 (카탈로그 스냅샷 우선, 준비 전이면 DB)"""
+        if self.catalog and self.catalog.is_ready():
+            return self.catalog.search_hotels(query_terms)
+        return search_hotels(query_terms)
+
+    def search_tours(self, query_terms):
+        """투어 검색 (카탈로그 스냅샷 우선, 준비 전이면 DB)"""
+        if self.catalog and self.catalog.is_ready():
+            return self.catalog.search_tours(query_terms)
+        return search_tours(query_terms)
+
+    async def search_hotels_async(self, query_terms):
+        """호텔 검색 비동기 버전"""
+        if self.catalog and self.catalog.is_ready():
+            return self.catalog.search_hotels(query_terms)
+        if search_hotels_async is None:
+            return await asyncio.to_thread(search_hotels, query_terms)
+        return await search_hotels_async(query_terms)
+
+    async def search_tours_async(self, query_terms):
+        """투어 검색 비동기 버전"""
+        if self.catalog and self.catalog.is_ready():
+            return self.catalog.search_tours(query_terms)
+        if search_tours_async is None:
+            return await asyncio.to_thread(search_tours, query_terms)
+        return await search_tours_async(query_terms)
+
+    def get_all_tours(self):
+        """전체 활성 투어 목록"""
+        if self.catalog and self.catalog.is_ready():
+            return self.catalog.all_tours()
+        return search_tours([])
+
+    def get_message_indexes(self):
+        """고정 어휘 + 지역 / 투어명 자동자, 투어명 색인, 오타 허용 색인 (카탈로그가 바뀌면 다시 만듦)"""
+        if self.catalog and self.catalog.is_ready():
+            version = ('catalog', self.catalog.version)
+            key, matcher, tour_index, fuzzy_index = self._message_indexes
+            if matcher is not None and key == version:
+                return matcher, tour_index, fuzzy_index
+            regions = self.catalog.get_regions()
+            tours = self.catalog.all_tours()
+            tour_names = [tour['tour_name'] for tour in tours if tour.get('tour_name')]
+        else:
+            regions = self.get_available_regions()
+            tours = self.get_all_tours()
+            tour_names = [tour['tour_name'] for tour in tours if tour.get('tour_name')]
+            version = (tuple(regions), tuple(tour_names))
+            key, matcher, tour_index, fuzzy_index = self._message_indexes
+            if matcher is not None and key == version:
+                return matcher, tour_index, fuzzy_index
+
+        matcher = KeywordMatcher({**MESSAGE_VOCABULARIES, 'region': regions, 'tour_name': tour_names})
+        synonym_graph = get_synonym_graph()
+        aliases = {name: synonym_graph.expand(name) for name in tour_names}
+        tour_index = TourNameIndex(tours, aliases)
+        fuzzy_index = FuzzyNameIndex(tours, aliases)
+        self._message_indexes = (version, matcher, tour_index, fuzzy_index)
+        print(f"Message indexes built: {len(matcher)} keywords, {len(tour_index)} tours, {len(fuzzy_index)} fuzzy terms")
+        return matcher, tour_index, fuzzy_index
+
+    def get_keyword_matcher(self):
+        return self.get_message_indexes()[0]
+
+    def get_tour_name_index(self):
+        return self.get_message_indexes()[1]
+
+    def get_fuzzy_name_index(self):
+        return self.get_message_indexes()[2]
+
+    def scan_message(self, user_message):
+        """메시지 키워드 매칭 결과 (같은 메시지는 한 번만 훑음)"""
+        return self.get_keyword_matcher().scan(user_message)
+
     def is_greeting(self, user_message):
         """인사말 체크"""
-        greetings = ['안녕하세요', '안녕', 'hi', 'hello', '헬로', '하이']
-        return any(greeting in user_message.lower().strip() for greeting in greetings)
+        return self.scan_message(user_message).has('greeting')
 
     def get_welcome_message_with_packages(self):
         """환영 메시지와 함께 패키지 목록 반환"""
         try:
             # 투어 목록만 조회
-            tours = search_tours([])    # 모든 투어
+            tours = self.get_all_tours()    # 모든 투어
 
             message = "안녕하세요! 😊 여행 상담사입니다.\n\n현재 보유한 패키지는 다음과 같습니다:\n\n"
 
@@ -106,46 +280,36 @@ class TravelAI:
         validation_score = 0
         issues = []
 
-        if not conversation_id or conversation_id not in self.conversation_history:
+        context = self.conversations.get(conversation_id)
+        if context is None:
             return {'score': 100, 'issues': [], 'status': 'good'}  # 첫 대화는 검증 제외
 
-        context = self.conversation_history[conversation_id]
-        recent_messages = context.get('messages', [])[-3:]  # 최근 3개 메시지
+        state = context.state
 
-        if not recent_messages:
+        if not state.turn:
             return {'score': 100, 'issues': [], 'status': 'good'}
 
         # 1. 주제 연속성 검증
-        last_message = recent_messages[-1] if recent_messages else None
-        if last_message:
-            last_user_msg = last_message.get('user', '')
-            last_ai_msg = last_message.get('ai', '')
-
-            # 이전 대화에서 특정 투어/호텔을 언급했는지 확인
-            mentioned_tours = ['골프', '래프팅', '패밀리', '라이트', '베스트', '바나힐', '호이안']
-            prev_tour_type = None
-            for tour_type in mentioned_tours:
-                if tour_type in last_user_msg or tour_type in last_ai_msg:
-                    prev_tour_type = tour_type
-                    break
+        # 직전 대화에서 특정 투어를 언급했는지 확인
+        prev_tour_type = state.recent_tour_type(window=1)
 
-            # 현재 메시지가 연속적인지 확인
-            follow_up_patterns = ['추가', '더', '그럼', '아이', '어린이', '성인', '명', '몇', '얼마', '가격']
-            is_follow_up = any(pattern in user_message for pattern in follow_up_patterns)
+        # 현재 메시지가 연속적인지 확인
+        follow_up_patterns = ['추가', '더', '그럼', '아이', '어린이', '성인', '명', '몇', '얼마', '가격']
+        is_follow_up = any(pattern in user_message for pattern in follow_up_patterns)
 
-            if prev_tour_type and is_follow_up:
-                # 연속 대화인 경우 같은 주제의 결과가 있는지 확인
-                if current_results['tours'] or current_results['hotels']:
-                    validation_score += 50
-                else:
-                    issues.append("연속 대화이지만 관련 결과를 찾지 못함")
+        if prev_tour_type and is_follow_up:
+            # 연속 대화인 경우 같은 주제의 결과가 있는지 확인
+            if current_results['tours'] or current_results['hotels']:
+                validation_score += 50
             else:
-                validation_score += 30
+                issues.append("연속 대화이지만 관련 결과를 찾지 못함")
+        else:
+            validation_score += 30
 
         # 2. 맥락 보존 검증
-        if context.get('current_topic'):
-            if (context['current_topic'] == 'tour' and current_results['tours']) or \
-               (context['current_topic'] == 'hotel' and current_results['hotels']):
+        if state.topic:
+            if (state.topic == 'tour' and current_results['tours']) or \
+               (state.topic == 'hotel' and current_results['hotels']):
                 validation_score += 30
             elif not any([current_results['tours'], current_results['hotels']]):
                 # 새로운 주제로 전환된 경우는 문제 없음
@@ -252,88 +416,34 @@ class TravelAI:
         return validation_result
 
     def get_synonyms(self, word):
-        """단어의 유사단어/동의어 반환"""
-        synonym_dict = {
-            # 투어 유형
-            '패밀리': ['패밀리팩', 'family', '가족', '가족투어', '가족패키지'],
-            '골프': ['golf', '골프투어', '골프패키지', '골프여행', '골핑'],
-            '래프팅': ['rafting', '급류타기', '래프팅투어', '물놀이'],
-            '바나힐': ['바나 힐', 'bana hill', 'banahil', '바나힐투어'],
-            '스쿠버': ['scuba', '다이빙', 'diving', '스노클링', '스쿠버다이빙'],
-            '라이트': ['라이트팩', 'light', '라이트투어'],
-            '베스트': ['베스트팩', 'best', '베스트투어'],
-
-            # 지역
-            '다낭': ['danang', 'da nang', '다낭시'],
-            '호이안': ['hoian', 'hoi an', '호이안시'],
-            '나트랑': ['nhatrang', 'nha trang', '나트랑시'],
-            '푸꾸옥': ['phuquoc', 'phu quoc', '푸꾸옥섬'],
-
-            # 숙박
-            '호텔': ['hotel', '숙박', '숙소', '리조트', 'resort'],
-            '리조트': ['resort', '호텔', 'hotel', '펜션'],
-
-            # 가격 관련
-            '가격': ['비용', '요금', '얼마', '돈', '금액', '값'],
-            '비용': ['가격', '요금', '얼마', '돈', '금액', '값'],
-
-            # 정보 요청
-            '구성': ['내용', '포함', '정보', '상세', '설명', '뭐'],
-            '내용': ['구성', '포함', '정보', '상세', '설명', '뭐에요'],
-            '정보': ['내용', '구성', '상세', '설명', '알려줘'],
-        }
-
-        word_lower = word.lower()
-        synonyms = []
-
-        # 직접 매칭
-        if word_lower in synonym_dict:
-            synonyms.extend(synonym_dict[word_lower])
-
-        # 역방향 매칭 (동의어에서 원래 단어 찾기)
-        for key, values in synonym_dict.items():
-            if word_lower in [v.lower() for v in values]:
-                synonyms.append(key)
-                synonyms.extend(values)
-
-        # 중복 제거 및 원본 제외
-        unique_synonyms = []
-        for s in synonyms:
-            if s.lower() != word_lower and s not in unique_synonyms:
-                unique_synonyms.append(s)
-
-        return unique_synonyms
+        """단어의 유사단어/동의어 반환 (synonyms.json 그래프에서 조회)"""
+        return get_synonym_graph().expand(word)
 
     def match_tour_names(self, user_message):
-        """사용자 메시지에서 투어명 동적 매칭"""
+        """사용자 메시지에서 투어명 동적 매칭 (정규화된 투어명 / 별칭 색인)"""
         try:
-            # 모든 투어명 조회
-            all_tours = search_tours([])  # 빈 키워드로 모든 투어 조회
-            matched_tours = []
-
-            user_msg_lower = user_message.lower().replace(' ', '').replace('-', '')
-
-            for tour in all_tours:
-                tour_name = tour.get('tour_name', '').lower().replace(' ', '').replace('-', '')
-
-                # 정확한 투어명 매칭
-                if tour_name in user_msg_lower or user_msg_lower in tour_name:
-                    matched_tours.append(tour['tour_name'])
-                    continue
-
-                # 키워드 기반 매칭
-                tour_keywords = tour_name.split()
-                for keyword in tour_keywords:
-                    if len(keyword) >= 2 and keyword in user_msg_lower:
-                        matched_tours.append(tour['tour_name'])
-                        break
-
-            return list(set(matched_tours))  # 중복 제거
+            return self.get_tour_name_index().match_names(user_message)
         except Exception as e:
             print(f"Tour matching error: {e}")
             return []
 
-    def extract_keywords(self, user_message):
+    def match_tour_name_fuzzy(self, user_message):
+        """오타 / 자모 / 초성 허용 투어명 매칭 -> 가장 비슷한 투어명 (없으면 None)"""
+        try:
+            match = self.get_fuzzy_name_index().best_match(user_message)
+            if match is None:
+                return None
+            tour_name = self.get_tour_name_index().tours[match.tour_id]['tour_name']
+            try:
+                print(f"Fuzzy tour match: {match.term} -> {tour_name} (score {match.score:.2f})")
+            except UnicodeEncodeError:
+                print(f"Fuzzy tour match (score {match.score:.2f})")
+            return tour_name
+        except Exception as e:
+            print(f"Fuzzy tour matching error: {e}")
+            return None
+
+    def extract_keywords(self, user_message, features=None):
         """사용자 메시지에서 키워드 추출"""
         import re
 
@@ -342,36 +452,29 @@ class TravelAI:
             return []
 
         keywords = []
+        hits = features.hits if features else self.scan_message(user_message)
 
         # 동적 투어명 매칭
         matched_tour_names = self.match_tour_names(user_message)
         keywords.extend(matched_tour_names)
 
-        # 지역 키워드 (데이터베이스에서 동적으로 조회)
-        available_regions = self.get_available_regions()
-        for region in available_regions:
-            if region in user_message:
-                keywords.append(region)
+        # 정확히 맞는 투어명이 없으면 오타 / 초성 허용 매칭 ("래프땅", "ㄹㅍㅌ")
+        if not matched_tour_names:
+            fuzzy_name = self.match_tour_name_fuzzy(user_message)
+            if fuzzy_name:
+                keywords.append(fuzzy_name)
+
+        # 지역 키워드 (데이터베이스 지역 목록으로 만든 자동자)
+        keywords.extend(hits.keywords('region'))
 
         # 호텔 관련 키워드
-        hotel_keywords = ['호텔', '숙박', '리조트', '펜션', '게스트하우스', '객실', '룸']
-        for keyword in hotel_keywords:
-            if keyword in user_message:
-                keywords.append(keyword)
+        keywords.extend(hits.keywords('hotel'))
 
         # 기본 투어 관련 키워드 (일반적인 용어들)
-        tour_keywords = ['투어', '여행', '관광', '체험', '액티비티', '일정']
-
-        # 가격 관련 키워드 (유아, 아동 포함)
-        price_keywords = ['가격', '얼마', '비용', '요금', '돈', '금액', '값', '성인', '어른', '아이', '아동', '유아', '소아', '어린이', '애기', '몇명', '몇 명', '인원']
-        for keyword in tour_keywords:
-            if keyword in user_message:
-                keywords.append(keyword)
+        keywords.extend(hits.keywords('tour'))
 
-        # 가격/인원 관련 키워드 추가
-        for keyword in price_keywords:
-            if keyword in user_message:
-                keywords.append(keyword)
+        # 가격/인원 관련 키워드 추가 (유아, 아동 포함)
+        keywords.extend(hits.keywords('price'))
 
         # 한글 단어 추출 (2글자 이상)
         korean_words = re.findall(r'[가-힣]{2,}', user_message)
@@ -403,37 +506,23 @@ class TravelAI:
     
     def determine_intent(self, user_message):
         """사용자 의도 파악"""
-        user_message_lower = user_message.lower()
-
-        # 패키지 목록 문의
-        if any(keyword in user_message_lower for keyword in ['무슨 패키지', '어떤 패키지', '패키지가 있', '패키지 뭐', '어떤거 있어', '무엇이 있어']):
-            return 'general'
-        elif any(keyword in user_message_lower for keyword in ['투어', '관광', '체험', '액티비티', '투어가']):
-            return 'tour'
-        elif any(keyword in user_message_lower for keyword in ['호텔', '숙박', '리조트', '펜션']):
-            return 'hotel'
-        elif any(keyword in user_message_lower for keyword in ['가격', '비용', '요금', '얼마', '명은', '명이면', '인은', '인이면', '돈', '금액']):
-            return 'price'
-        else:
-            return 'general'
+        return intent_from_hits(self.scan_message(user_message))
     
     def get_available_regions(self):
         """데이터베이스에서 실제 사용 가능한 지역 조회"""
+        if self.catalog and self.catalog.is_ready():
+            return self.catalog.get_regions()
+
         try:
-            from database import get_db_connection
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # 호텔과 투어에서 사용 가능한 지역 조회
-            cursor.execute("SELECT DISTINCT hotel_region FROM hotels WHERE is_active = true")
-            hotel_regions = [row['hotel_region'] for row in cursor.fetchall()]
+            from database import db_cursor
+            with db_cursor() as cursor:
+                # 호텔과 투어에서 사용 가능한 지역 조회
+                cursor.execute("SELECT DISTINCT hotel_region FROM hotels WHERE is_active = true")
+                hotel_regions = [row['hotel_region'] for row in cursor.fetchall()]
+
+                cursor.execute("SELECT DISTINCT tour_region FROM tours WHERE is_active = true")
+                tour_regions = [row['tour_region'] for row in cursor.fetchall()]
 
-            cursor.execute("SELECT DISTINCT tour_region FROM tours WHERE is_active = true")
-            tour_regions = [row['tour_region'] for row in cursor.fetchall()]
-            
-            cursor.close()
-            conn.close()
-            
             # 중복 제거하고 정렬
             all_regions = list(set(hotel_regions + tour_regions))
             return sorted(all_regions)
@@ -441,12 +530,21 @@ class TravelAI:
         except Exception as e:
             print(f"Error getting available regions: {e}")
             return ['다낭']  # 기본값
-    
-    def search_database(self, keywords, intent, conversation_id=None):
-        """데이터베이스에서 검색"""
-        hotels = []
-        tours = []
 
+    async def get_available_regions_async(self):
+        """사용 가능한 지역 조회 비동기 버전"""
+        if self.catalog and self.catalog.is_ready():
+            return self.catalog.get_regions()
+        if get_available_regions_async is None:
+            return await asyncio.to_thread(self.get_available_regions)
+        try:
+            return await get_available_regions_async()
+        except Exception as e:
+            print(f"Error getting available regions: {e}")
+            return ['다낭']  # 기본값
+    
+    def begin_search(self, keywords, intent, conversation_id=None):
+        """검색 준비 1단계: 투어 종류 감지 -> (context, current_tour_type, 재사용할 이전 결과 또는 None)"""
         # 대화 컨텍스트 기반 검색 개선
         context = self.get_conversation_context(conversation_id) if conversation_id else None
 
@@ -466,21 +564,23 @@ class TravelAI:
             except UnicodeEncodeError:
                 print("New tour type detected. Clearing previous context.")
             self.last_search_results = {'hotels': [], 'tours': []}
-            # 해당 conversation의 current_topic도 초기화
+            # 해당 conversation의 현재 주제도 초기화
             if context:
-                context['current_topic'] = None
+                context.state.topic = None
 
         # 가격 문의인 경우 이전 검색 결과를 우선 사용 (단, 새 투어 종류가 없는 경우만)
         if intent == 'price' and not current_tour_type and (self.last_search_results['hotels'] or self.last_search_results['tours']):
             print("Using previous search results for price inquiry")
-            return self.last_search_results['hotels'], self.last_search_results['tours']
-        
-        # 실제 데이터베이스에서 사용 가능한 지역 조회
-        available_regions = self.get_available_regions()
-        
+            return context, current_tour_type, (self.last_search_results['hotels'], self.last_search_results['tours'])
+
+        return context, current_tour_type, None
+
+    def apply_search_context(self, keywords, context, current_tour_type):
+        """검색 준비 2단계: 대화 맥락의 투어 종류 / 지역을 keywords 에 추가 -> current_tour_type"""
+        state = context.state if context else None
         # 저장된 현재 투어 종류가 있으면 우선 사용
-        if context and context.get('current_tour_type') and not current_tour_type:
-            stored_tour_type = context['current_tour_type']
+        if state and state.tour_type and not current_tour_type:
+            stored_tour_type = state.tour_type
             keywords.append(stored_tour_type)
             try:
                 print(f"Using stored tour type from context: {stored_tour_type}")
@@ -489,73 +589,48 @@ class TravelAI:
             # 저장된 투어 타입이 있을 때는 해당 타입만 검색하도록 current_tour_type 설정
             current_tour_type = stored_tour_type
 
-        # 이전 대화에서 언급된 지역과 투어 유형 정보 추가 (새 투어 종류가 없고 저장된 투어 종류도 없는 경우만)
-        elif context and context.get('messages') and not current_tour_type:
-            last_regions = []
-            last_tour_types = []
-
-            for msg in context['messages'][-3:]:  # 최근 3개 대화
-                user_msg = msg.get('user', '')
-                ai_msg = msg.get('ai', '')
-
-                # 지역 정보 추출
-                for region in available_regions:
-                    if region in user_msg and region not in keywords:
-                        last_regions.append(region)
-
-                # 투어 유형 정보 추출 (이전 대화에서 언급된 투어 유형)
-                if '골프' in user_msg or 'golf' in user_msg.lower() or '골프' in ai_msg:
-                    if '골프' not in keywords:
-                        last_tour_types.append('골프')
-                elif '래프팅' in user_msg or 'rafting' in user_msg.lower() or '래프팅' in ai_msg:
-                    if '래프팅' not in keywords:
-                        last_tour_types.append('래프팅')
-                elif '패밀리' in user_msg or 'family' in user_msg.lower() or '패밀리' in ai_msg:
-                    if '패밀리' not in keywords:
-                        last_tour_types.append('패밀리')
-                elif '라이트' in user_msg or 'light' in user_msg.lower() or '라이트' in ai_msg:
-                    if '라이트' not in keywords:
-                        last_tour_types.append('라이트')
-                elif '베스트' in user_msg or 'best' in user_msg.lower() or '베스트' in ai_msg:
-                    if '베스트' not in keywords:
-                        last_tour_types.append('베스트')
-
-            if last_regions:
-                keywords.extend(last_regions[:1])  # 가장 최근 지역 1개 추가
+        # 최근 대화에서 언급된 지역과 투어 유형 추가 (새 투어 종류가 없고 저장된 투어 종류도 없는 경우만)
+        elif state and not current_tour_type:
+            last_region = state.recent_region()
+            if last_region and last_region not in keywords:
+                keywords.append(last_region)
                 try:
-                    print(f"Added region from context: {last_regions[0]}")
+                    print(f"Added region from context: {last_region}")
                 except UnicodeEncodeError:
                     print("Added region from context: [Korean region]")
 
-            if last_tour_types:
-                keywords.extend(last_tour_types[:1])  # 가장 최근 투어 유형 1개 추가
+            last_tour_type = state.recent_tour_type()
+            if last_tour_type and last_tour_type not in keywords:
+                keywords.append(last_tour_type)
                 try:
-                    print(f"Added tour type from context: {last_tour_types[0]}")
+                    print(f"Added tour type from context: {last_tour_type}")
                 except UnicodeEncodeError:
                     print("Added tour type from context: [Korean tour type]")
-        
+
+        return current_tour_type
+
+    def plan_search(self, keywords, intent):
+        """검색 준비 3단계: (호텔 검색어, 투어 검색어, 재사용할 이전 결과) - 검색하지 않는 쪽은 None"""
         if intent == 'hotel':
-            hotels = search_hotels(keywords)
+            return keywords, None, None
         elif intent == 'tour':
-            tours = search_tours(keywords)
+            return None, keywords, None
         elif intent in ['general', 'price']:
             # 일반 질문이나 빈 키워드인 경우
             if not keywords or len([k for k in keywords if k.strip()]) == 0:
                 # 이전 검색 결과가 있으면 재사용 (연속 대화 지원)
                 if hasattr(self, 'last_search_results') and self.last_search_results:
-                    hotels = self.last_search_results.get('hotels', [])
-                    tours = self.last_search_results.get('tours', [])
                     try:
                         print("Using previous search results for continuity")
                     except UnicodeEncodeError:
                         print("Using previous search results")
-                else:
-                    hotels = search_hotels([''])  # 빈 문자열로 검색하면 모든 호텔
-                    tours = search_tours([''])    # 빈 문자열로 검색하면 모든 투어
-            else:
-                hotels = search_hotels(keywords)
-                tours = search_tours(keywords)
-        
+                    return None, None, (self.last_search_results.get('hotels', []), self.last_search_results.get('tours', []))
+                return [''], [''], None  # 빈 문자열로 검색하면 모든 호텔 / 투어
+            return keywords, keywords, None
+        return None, None, None
+
+    def finish_search(self, hotels, tours, current_tour_type):
+        """검색 마무리: 투어 종류 필터링 + 결과 저장"""
         # 특정 투어 종류가 명시된 경우 해당 종류만 필터링
         if current_tour_type and tours:
             filtered_tours = []
@@ -574,7 +649,43 @@ class TravelAI:
             self.last_search_results = {'hotels': hotels, 'tours': tours}
 
         return hotels, tours
-    
+
+    def search_database(self, keywords, intent, conversation_id=None):
+        """데이터베이스에서 검색"""
+        context, current_tour_type, previous = self.begin_search(keywords, intent, conversation_id)
+        if previous is not None:
+            return previous
+
+        current_tour_type = self.apply_search_context(keywords, context, current_tour_type)
+
+        hotel_terms, tour_terms, reused = self.plan_search(keywords, intent)
+        if reused is not None:
+            hotels, tours = reused
+        else:
+            hotels = self.search_hotels(hotel_terms) if hotel_terms is not None else []
+            tours = self.search_tours(tour_terms) if tour_terms is not None else []
+
+        return self.finish_search(hotels, tours, current_tour_type)
+
+    async def search_database_async(self, keywords, intent, conversation_id=None):
+        """search_database 비동기 버전 - 호텔 / 투어 검색을 동시에 실행"""
+        context, current_tour_type, previous = self.begin_search(keywords, intent, conversation_id)
+        if previous is not None:
+            return previous
+
+        current_tour_type = self.apply_search_context(keywords, context, current_tour_type)
+
+        hotel_terms, tour_terms, reused = self.plan_search(keywords, intent)
+        if reused is not None:
+            hotels, tours = reused
+        else:
+            hotels, tours = await asyncio.gather(
+                self.search_hotels_async(hotel_terms) if hotel_terms is not None else asyncio.sleep(0, []),
+                self.search_tours_async(tour_terms) if tour_terms is not None else asyncio.sleep(0, [])
+            )
+
+        return self.finish_search(hotels, tours, current_tour_type)
+
     def format_hotel_info(self, hotel):
         """호텔 정보 포맷팅"""
         info = f"🏨 **{hotel['hotel_name']}** ({hotel['hotel_region']})\n"
@@ -618,103 +729,108 @@ class TravelAI:
 
         return info
 
-    def extract_relevant_description(self, description, user_message):
-        """사용자 질문에 따라 상세내용에서 관련 부분만 추출"""
+    def extract_relevant_description(self, description, user_message, query_types=None):
+        """사용자 질문에 따라 상세내용에서 관련 부분만 추출 (설명별 섹션 색인 조회)"""
         if not description:
             return ""
-
-        user_msg_lower = user_message.lower()
-        lines = description.split('\n')
-        relevant_lines = []
-
-        # 질문 유형별 키워드 정의
-        query_keywords = {
-            'price': ['가격', '얼마', '비용', '요금', '돈', '금액', '값', '$', '만원', '원', '유아', '아동', '성인', '어른'],
-            'schedule': ['일정', '스케줄', '시간', '몇시', '언제', '일차', '날짜'],
-            'content': ['내용', '구성', '포함', '활동', '체험', '프로그램'],
-            'location': ['위치', '장소', '어디', '지역', '주소'],
-            'criteria': ['기준', '나이', '몇살', '연령', '조건']
-        }
-
-        # 사용자 질문이 어떤 유형인지 판단
-        detected_types = []
-        for query_type, keywords in query_keywords.items():
-            if any(keyword in user_msg_lower for keyword in keywords):
-                detected_types.append(query_type)
-
-        # 관련 키워드가 포함된 줄 추출
-        if detected_types:
-            for line in lines:
-                line_lower = line.lower()
-                for query_type in detected_types:
-                    if any(keyword in line_lower for keyword in query_keywords[query_type]):
-                        relevant_lines.append(line.strip())
-                        break
-
-        # 관련 정보를 찾지 못했으면 전체 설명의 앞부분 반환
-        if not relevant_lines:
-            return description[:300] + ('...' if len(description) > 300 else '')
-
-        # 관련 정보만 반환 (최대 500자)
-        result = '\n'.join(relevant_lines)
-        return result[:500] + ('...' if len(result) > 500 else '')
+        if query_types is None:
+            query_types = detect_query_types(user_message)
+        return get_description_sections(description).extract(query_types)
 
     def get_conversation_context(self, conversation_id):
-        """대화 컨텍스트 조회"""
-        return self.conversation_history.get(conversation_id, {
-            'messages': [],
-            'current_topic': None,
-            'mentioned_tours': [],
-            'mentioned_hotels': [],
-            'greeted': False
-        })
-    
-    def update_conversation_context(self, conversation_id, user_message, ai_response, hotels, tours):
-        """대화 컨텍스트 업데이트"""
-        if conversation_id not in self.conversation_history:
-            self.conversation_history[conversation_id] = {
-                'messages': [],
-                'current_topic': None,
-                'mentioned_tours': [],
-                'mentioned_hotels': [],
-                'greeted': False
-            }
-        
-        context = self.conversation_history[conversation_id]
-        context['messages'].append({'user': user_message, 'ai': ai_response})
-        
-        # 현재 주제 업데이트 - 구체적인 투어 종류도 저장
-        if tours:
-            context['current_topic'] = 'tour'
-            context['mentioned_tours'] = tours
-
-            # 현재 투어의 구체적인 종류 파악
-            current_tour_type = None
-            tour_type_keywords = ['패밀리', '베스트', '라이트', '골프', '래프팅', '바나힐', '호이안']
-            for tour in tours:
-                tour_name = tour.get('tour_name', '').lower()
-                for tour_type in tour_type_keywords:
-                    if tour_type in tour_name:
-                        current_tour_type = tour_type
-                        break
-                if current_tour_type:
-                    break
+        """대화 컨텍스트 조회 (없으면 저장되지 않은 빈 레코드)"""
+        return self.conversations.get(conversation_id) or ConversationRecord()
+
+    def rehydrate_conversation(self, conversation_id):
+        """messages 테이블의 최근 턴을 대화 상태 추적으로 다시 재생 (기록이 없으면 None)
+
+        검색 결과는 남아 있지 않으므로 턴에서 이름이 나온 투어를 결과로 본다
+        (고객 메시지 우선, 없으면 응답에 하나만 나온 투어).
+        """
+        turns = self.conversation_history.recent_turns(conversation_id)
+        if not turns:
+            return None
+        tour_index = self.get_tour_name_index()
+        record = ConversationRecord()
+        for user_message, ai_response in turns:
+            tour_ids = tour_index.match(user_message)
+            if not tour_ids:
+                tour_ids = tour_index.match(ai_response)[:2]
+                if len(tour_ids) > 1:
+                    tour_ids = []
+            tours = [tour_index.tours[tour_id] for tour_id in tour_ids]
+            record.add_turn(user_message, ai_response, None, tours, self.scan_message(user_message).keywords('region'))
+        try:
+            print(f"Rehydrated conversation {conversation_id}: {len(turns)} turns, tour type {record.state.tour_type or record.state.mentioned_type}")
+        except UnicodeEncodeError:
+            print(f"Rehydrated conversation {conversation_id}: {len(turns)} turns")
+        return record
+
+    def update_conversation_context(self, conversation_id, user_message, ai_response, hotels, tours, features=None):
+        """대화 컨텍스트 업데이트 (엔티티 상태는 여기서 턴마다 한 번만 갱신)"""
+        context = self.get_conversation_context(conversation_id)
+        hits = features.hits if features is not None else self.scan_message(user_message)
+        previous_tour_type = context.state.tour_type
+        context.add_turn(user_message, ai_response, hotels, tours, hits.keywords('region'))
+        self.conversations.save(conversation_id, context)
+        if tours and context.state.tour_type and context.state.tour_type != previous_tour_type:
+            try:
+                print(f"Updated context with tour type: {context.state.tour_type}")
+            except UnicodeEncodeError:
+                print("Updated context with tour type")
+
+    def conversation_party(self, user_message, conversation_id):
+        """대화에서 누적한 인원 + 이번 메시지 (PartySlots, 대화가 없으면 None)"""
+        context = self.conversations.get(conversation_id)
+        return context.state.party_for(user_message) if context else None
+
+    def answer_price(self, user_message, tours, features=None, conversation_id=None):
+        """가격표로 바로 계산할 수 있는 가격 질문이면 (견적 응답, [투어]), 아니면 None (LLM 응답)
+
+        투어가 하나로 정해지고, 인원과 가격표가 모두 애매하지 않을 때만 답한다.
+        인원은 이번 메시지에 없으면 대화에서 누적한 인원 슬롯을 사용한다 ("그럼 가격은?", "아이 1명 추가하면?").
+        """
+        if features is None:
+            features = self.analyze_message(user_message)
+        if not tours or not features.is_quote_question:
+            return None
+
+        slots = self.conversation_party(user_message, conversation_id)
+        if slots is not None and slots.known and not any(keyword in user_message for keyword in UNTRACKED_KEYWORDS):
+            party = slots.as_party()
+        elif features.adults is not None:
+            party = {'adults': features.adults, 'children': list(features.children), 'infants': features.infants}
+        else:
+            return None
+
+        # tours 는 다른 대화의 이전 검색 결과(last_search_results)일 수 있으므로
+        # 이번 메시지에서 말한 투어이거나 이 대화에서 정해진 투어일 때만 계산
+        named = [t for t in tours if t.get('tour_name') and
+                 t['tour_name'].lower().replace(' ', '').replace('-', '') in features.compact]
+        if not named and features.tour_type:
+            named = [t for t in tours if features.tour_type in (t.get('tour_name') or '')]
+        context = self.conversations.get(conversation_id) if not named else None
+        if context is not None:
+            # 투어명을 생략한 후속 질문이면 대화에서 정해진 현재 투어
+            current_id = context.state.tour_id
+            named = [t for t in tours if current_id is not None and t.get('id') == current_id]
+        if len(named) != 1:
+            return None
+        tour = named[0]
+
+        table = self.catalog.price_table(tour) if self.catalog else get_price_table(tour.get('description'))
+        if table is None:
+            return None
+        result = quote(table, party)
+        if result is None:
+            return None
 
-            if current_tour_type:
-                context['current_tour_type'] = current_tour_type
-                try:
-                    print(f"Updated context with tour type: {current_tour_type}")
-                except UnicodeEncodeError:
-                    print("Updated context with tour type")
+        try:
+            print(f"Price quote from price table: {tour['tour_name']}")
+        except UnicodeEncodeError:
+            print("Price quote from price table")
+        return format_quote(tour['tour_name'], result), [tour]
 
-        elif hotels:
-            context['current_topic'] = 'hotel'
-            context['mentioned_hotels'] = hotels
-        
-        # 최근 10개 메시지만 유지
-        if len(context['messages']) > 10:
-            context['messages'] = context['messages'][-10:]
-    
     def get_cache_key(self, user_message, hotels, tours, conversation_id=None):
         """캐시 키 생성"""
         import hashlib
@@ -727,338 +843,303 @@ class TravelAI:
             'hotel_names': [h['hotel_name'] for h in hotels[:2]] if hotels else [],
             'tour_names': [t['tour_name'] for t in tours[:2]] if tours else []
         }
+        # 프롬프트에 들어가는 누적 인원이 다르면 다른 응답
+        party = self.conversation_party(user_message, conversation_id)
+        if party is not None and party.known:
+            cache_data['party'] = party.summary()
         
         cache_str = json.dumps(cache_data, sort_keys=True, ensure_ascii=False)
         return hashlib.md5(cache_str.encode('utf-8')).hexdigest()
     
-    def generate_response(self, user_message, hotels, tours, conversation_id=None):
-        """AI 응답 생성 (캐시 적용)"""
-        try:
-            # 캐시 확인
-            cache_key = self.get_cache_key(user_message, hotels, tours, conversation_id)
-            if cache_key in self.response_cache:
-                print(f"Using cached response for key: {cache_key[:8]}...")
-                cached_response = self.response_cache[cache_key]
-
-                # 🚨 캐시된 응답도 필터링 적용
-                conversation_history = self.get_conversation_context(conversation_id) if conversation_id else []
-                filtered_response = self.validate_and_fix_response(cached_response, user_message, conversation_history)
-                return filtered_response
-            # 대화 컨텍스트 조회
-            context = self.get_conversation_context(conversation_id) if conversation_id else None
-            
-            # 인사말 처리 (처음 인사인 경우에만)
-            if self.is_greeting(user_message):
-                return "네, 안녕하세요! 어떤 도움이 필요하신가요?"
+    def prepare_response(self, user_message, hotels, tours, conversation_id=None, features=None):
+        """응답 준비 (LLM 호출 전 단계)
+
+        캐시 / 규칙으로 답할 수 있으면 (응답, None),
+        LLM 호출이 필요하면 (None, 요청 정보) 를 반환한다.
+        """
+        if features is None:
+            features = self.analyze_message(user_message)
+
+        # 캐시 확인
+        cache_key = self.get_cache_key(user_message, hotels, tours, conversation_id)
+        cached_response = self.response_cache.get(cache_key)
+        if cached_response is not None:
+            print(f"Using cached response for key: {cache_key[:8]}...")
+
+            # 🚨 캐시된 응답도 필터링 적용
+            conversation_history = self.get_conversation_context(conversation_id) if conversation_id else []
+            filtered_response = self.validate_and_fix_response(cached_response, user_message, conversation_history, features=features)
+            return filtered_response, None
+        # 대화 컨텍스트 조회
+        context = self.get_conversation_context(conversation_id) if conversation_id else None
+        
+        # 인사말 처리 (처음 인사인 경우에만)
+        if features.is_greeting:
+            return "네, 안녕하세요! 어떤 도움이 필요하신가요?", None
 
-            # 특정 투어명 또는 투어 유형 언급 감지
-            specific_tour_mentioned = False
-            mentioned_tour = None
-            tour_type_mentioned = False
+        # 특정 투어명 또는 투어 유형 언급 감지
+        specific_tour_mentioned = False
+        mentioned_tour = None
+        tour_type_mentioned = False
 
-            # 투어 유형별 키워드 체크
-            golf_keywords = ['골프', 'golf', '골프투어']
-            rafting_keywords = ['래프팅', 'rafting', '래프팅투어']
-            banahil_keywords = ['바나힐', 'banahil', '바나힐투어']
-            family_keywords = ['패밀리', 'family', '패밀리팩', 'pack']
+        # 투어 유형별 키워드 체크
+        hits = features.hits
+        user_message_lower = features.normalized
 
-            user_message_lower = user_message.lower()
+        if tours:
+            # 1. 정확한 투어명 매칭
+            for tour in tours:
+                tour_name_keywords = tour['tour_name'].lower().replace(' ', '').replace('-', '')
+                user_message_clean = user_message.lower().replace(' ', '').replace('-', '')
+                if tour_name_keywords in user_message_clean or any(keyword in tour_name_keywords for keyword in user_message_clean.split()):
+                    specific_tour_mentioned = True
+                    mentioned_tour = tour
+                    break
 
-            if tours:
-                # 1. 정확한 투어명 매칭
-                for tour in tours:
-                    tour_name_keywords = tour['tour_name'].lower().replace(' ', '').replace('-', '')
-                    user_message_clean = user_message.lower().replace(' ', '').replace('-', '')
-                    if tour_name_keywords in user_message_clean or any(keyword in tour_name_keywords for keyword in user_message_clean.split()):
-                        specific_tour_mentioned = True
-                        mentioned_tour = tour
-                        break
-
-                # 🚨 중요: 이전 대화 컨텍스트가 있으면 투어 타입 매칭을 하지 않음 (컨텍스트 유지)
-                has_previous_context = (conversation_id and
-                                      conversation_id in self.conversation_history and
-                                      len(self.conversation_history[conversation_id]) > 0)
-
-                # 2. 투어 유형별 매칭 (정확한 매칭이 없고 이전 컨텍스트도 없을 때만)
-                if not specific_tour_mentioned and not has_previous_context:
-                    try:
-                        print(f"Checking golf keywords: {golf_keywords} in message: {user_message_lower}")
-                    except UnicodeEncodeError:
-                        print(f"Checking golf keywords in Korean message")
+            # 🚨 중요: 이전 대화 컨텍스트가 있으면 투어 타입 매칭을 하지 않음 (컨텍스트 유지)
+            has_previous_context = (conversation_id and
+                                  conversation_id in self.conversations)
 
-                    if any(keyword in user_message_lower for keyword in golf_keywords):
-                        print(f"Golf keyword found! Searching in tours...")
-                        for tour in tours:
+            # 2. 투어 유형별 매칭 (정확한 매칭이 없고 이전 컨텍스트도 없을 때만)
+            if not specific_tour_mentioned and not has_previous_context:
+                try:
+                    print(f"Checking golf keywords: {GOLF_KEYWORDS} in message: {user_message_lower}")
+                except UnicodeEncodeError:
+                    print(f"Checking golf keywords in Korean message")
+
+                if hits.has('golf'):
+                    print(f"Golf keyword found! Searching in tours...")
+                    for tour in tours:
+                        try:
+                            print(f"Checking tour: {tour['tour_name']}")
+                        except UnicodeEncodeError:
+                            print("Checking tour: [Korean tour name]")
+                        if '골프' in tour['tour_name'].lower() or 'golf' in tour['tour_name'].lower():
+                            tour_type_mentioned = True
+                            specific_tour_mentioned = True
+                            mentioned_tour = tour
                             try:
-                                print(f"Checking tour: {tour['tour_name']}")
+                                print(f"Golf tour matched: {tour['tour_name']}")
                             except UnicodeEncodeError:
-                                print("Checking tour: [Korean tour name]")
-                            if '골프' in tour['tour_name'].lower() or 'golf' in tour['tour_name'].lower():
-                                tour_type_mentioned = True
-                                specific_tour_mentioned = True
-                                mentioned_tour = tour
-                                try:
-                                    print(f"Golf tour matched: {tour['tour_name']}")
-                                except UnicodeEncodeError:
-                                    print("Golf tour matched: [Korean tour name]")
-                                break
-                    elif any(keyword in user_message_lower for keyword in rafting_keywords):
-                        for tour in tours:
-                            if '래프팅' in tour['tour_name'].lower() or 'rafting' in tour['tour_name'].lower():
-                                tour_type_mentioned = True
-                                specific_tour_mentioned = True
-                                mentioned_tour = tour
-                                break
-                    elif any(keyword in user_message_lower for keyword in family_keywords):
-                        for tour in tours:
-                            if '패밀리' in tour['tour_name'].lower() or 'family' in tour['tour_name'].lower():
-                                tour_type_mentioned = True
-                                specific_tour_mentioned = True
-                                mentioned_tour = tour
-                                try:
-                                    print(f"Family tour matched: {tour['tour_name']}")
-                                except UnicodeEncodeError:
-                                    print("Family tour matched: [Korean tour name]")
-                                break
-
-            # 특정 투어 언급시 AI를 통해 정리된 설명 제공 (그대로 복붙 방지)
-            if specific_tour_mentioned and mentioned_tour:
-                # AI를 통해 투어 정보를 정리해서 설명하도록 함
-                tours = [mentioned_tour]  # AI 프롬프트로 넘어가서 정리된 설명을 생성
-
-            # 정보 요청 감지 - 바로 정보 보여주기
-            info_request_keywords = ['내용', '정보', '자세한', '구체적인', '보여줘', '알려줘', '설명', '상세', '뭐에요', '뭐야', '무엇', '어떤', '구성', '포함', 'details', 'information']
-            is_info_request = any(keyword in user_message.lower() for keyword in info_request_keywords)
+                                print("Golf tour matched: [Korean tour name]")
+                            break
+                elif hits.has('rafting'):
+                    for tour in tours:
+                        if '래프팅' in tour['tour_name'].lower() or 'rafting' in tour['tour_name'].lower():
+                            tour_type_mentioned = True
+                            specific_tour_mentioned = True
+                            mentioned_tour = tour
+                            break
+                elif hits.has('family'):
+                    for tour in tours:
+                        if '패밀리' in tour['tour_name'].lower() or 'family' in tour['tour_name'].lower():
+                            tour_type_mentioned = True
+                            specific_tour_mentioned = True
+                            mentioned_tour = tour
+                            try:
+                                print(f"Family tour matched: {tour['tour_name']}")
+                            except UnicodeEncodeError:
+                                print("Family tour matched: [Korean tour name]")
+                            break
+
+        # 특정 투어 언급시 AI를 통해 정리된 설명 제공 (그대로 복붙 방지)
+        if specific_tour_mentioned and mentioned_tour:
+            # AI를 통해 투어 정보를 정리해서 설명하도록 함
+            tours = [mentioned_tour]  # AI 프롬프트로 넘어가서 정리된 설명을 생성
+
+        # 정보 요청 감지 - 바로 정보 보여주기
+        is_info_request = features.is_info_request
 
+        try:
+            print(f"Info request check: {is_info_request}, hotels: {len(hotels) if hotels else 0}, tours: {len(tours) if tours else 0}")
             try:
-                print(f"Info request check: {is_info_request}, hotels: {len(hotels) if hotels else 0}, tours: {len(tours) if tours else 0}")
-                try:
-                    print(f"Message: {user_message}, Keywords found: {[k for k in info_request_keywords if k in user_message.lower()]}")
-                except UnicodeEncodeError:
-                    print("Message: [Korean text], Keywords found: [list]")
+                print(f"Message: {user_message}, Keywords found: {hits.keywords('info_request')}")
             except UnicodeEncodeError:
-                print(f"Info request check: {is_info_request}, hotels: {len(hotels) if hotels else 0}, tours: {len(tours) if tours else 0}")
+                print("Message: [Korean text], Keywords found: [list]")
+        except UnicodeEncodeError:
+            print(f"Info request check: {is_info_request}, hotels: {len(hotels) if hotels else 0}, tours: {len(tours) if tours else 0}")
 
-            # 투어 유형별 필터링 처리
-            if tour_type_mentioned and mentioned_tour:
-                # 특정 투어 유형이 언급된 경우 해당 투어만 표시하고 AI로 넘김
-                tours = [mentioned_tour]
-                try:
-                    print(f"Filtered to specific tour type: {mentioned_tour['tour_name']}")
-                except UnicodeEncodeError:
-                    print("Filtered to specific tour type: [Korean tour name]")
+        # 투어 유형별 필터링 처리
+        if tour_type_mentioned and mentioned_tour:
+            # 특정 투어 유형이 언급된 경우 해당 투어만 표시하고 AI로 넘김
+            tours = [mentioned_tour]
+            try:
+                print(f"Filtered to specific tour type: {mentioned_tour['tour_name']}")
+            except UnicodeEncodeError:
+                print("Filtered to specific tour type: [Korean tour name]")
 
-            # 🚨 중요: 이전 대화 컨텍스트가 있을 때는 투어 목록을 보여주지 않음 (컨텍스트 유지)
-            has_conversation_context = (conversation_id and
-                                      conversation_id in self.conversation_history and
-                                      len(self.conversation_history[conversation_id]) > 0)
+        # 🚨 중요: 이전 대화 컨텍스트가 있을 때는 투어 목록을 보여주지 않음 (컨텍스트 유지)
+        has_conversation_context = (conversation_id and
+                                  conversation_id in self.conversations)
 
-            # 특정 투어 유형이 언급되지 않은 일반적인 정보 요청인 경우에만 목록 표시 (컨텍스트가 없을 때만)
-            if is_info_request and (hotels or tours) and not (specific_tour_mentioned or tour_type_mentioned) and not has_conversation_context:
-                response_parts = []
+        # 특정 투어 유형이 언급되지 않은 일반적인 정보 요청인 경우에만 목록 표시 (컨텍스트가 없을 때만)
+        if is_info_request and (hotels or tours) and not (specific_tour_mentioned or tour_type_mentioned) and not has_conversation_context:
+            response_parts = []
 
-                if tours:
-                    response_parts.append("🎯 **투어 패키지:**")
-                    for tour in tours:  # 모든 투어 표시
-                        response_parts.append(f"• {tour['tour_name']}")
-                    response_parts.append("")
+            if tours:
+                response_parts.append("🎯 **투어 패키지:**")
+                for tour in tours:  # 모든 투어 표시
+                    response_parts.append(f"• {tour['tour_name']}")
+                response_parts.append("")
 
-                response_parts.append("어떤 패키지가 궁금하신가요?")
-                return "\n".join(response_parts)
-            
-            # 컨텍스트 준비
-            prompt_context = f"사용자 질문: {user_message}\n\n"
-            
-            # 대화 히스토리 추가 및 맥락 분석
-            conversation_context = ""
+            response_parts.append("어떤 패키지가 궁금하신가요?")
+            return "\n".join(response_parts), None
+        
+        # 컨텍스트 준비
+        prompt_context = f"사용자 질문: {user_message}\n\n"
+        
+        # 대화 히스토리 추가 및 맥락 분석
+        conversation_context = ""
+        context_hint = ""
+        if context and context.messages:
+            conversation_context = "이전 대화:\n"
+            recent_messages = context.messages[-3:]  # 최근 3개 대화만
+
+            # 최근 대화에서 언급된 투어 유형 / 구체적인 투어명 (대화 상태에서 바로 조회)
+            state = context.state
+            last_tour_type = state.recent_tour_type()
+
+            # 맥락 힌트 및 생략된 정보 보완
             context_hint = ""
-            if context and context.get('messages'):
-                conversation_context = "이전 대화:\n"
-                recent_messages = context['messages'][-3:]  # 최근 3개 대화만
-
-                # 가장 최근 대화에서 투어 유형 파악
-                last_tour_type = None
-                for msg in reversed(recent_messages):
-                    user_msg = msg.get('user', '').lower()
-                    ai_msg = msg.get('ai', '').lower()
-
-                    if '골프' in user_msg or 'golf' in user_msg or '골프' in ai_msg:
-                        last_tour_type = '골프'
-                        break
-                    elif '래프팅' in user_msg or 'rafting' in user_msg or '래프팅' in ai_msg:
-                        last_tour_type = '래프팅'
-                        break
-                    elif '패밀리' in user_msg or 'family' in user_msg or '패밀리' in ai_msg:
-                        last_tour_type = '패밀리'
-                        break
-                    elif '라이트' in user_msg or 'light' in user_msg or '라이트' in ai_msg:
-                        last_tour_type = '라이트'
-                        break
-                    elif '베스트' in user_msg or 'best' in user_msg or '베스트' in ai_msg:
-                        last_tour_type = '베스트'
-                        break
-
-                # 맥락 힌트 및 생략된 정보 보완
-                context_hint = ""
-                if last_tour_type:
-                    # 최근 대화에서 구체적인 투어명 추출
-                    last_specific_tour = None
-                    for msg in reversed(recent_messages):
-                        user_msg = msg.get('user', '')
-                        ai_msg = msg.get('ai', '')
-
-                        # 구체적인 투어명 패턴 찾기
-                        if last_tour_type == '골프':
-                            if '골프투어54' in user_msg or '골프투어 54' in user_msg or '54홀' in user_msg or '54' in ai_msg:
-                                last_specific_tour = '골프투어54홀'
-                                break
-                            elif '골프투어72' in user_msg or '골프투어 72' in user_msg or '72홀' in user_msg or '72' in ai_msg:
-                                last_specific_tour = '골프투어72홀'
-                                break
-                        elif last_tour_type == '래프팅':
-                            if '래프팅' in user_msg or '래프팅' in ai_msg:
-                                last_specific_tour = '래프팅투어'
-                                break
-                        elif last_tour_type == '패밀리':
-                            if '패밀리' in user_msg or '패밀리' in ai_msg:
-                                last_specific_tour = '패밀리팩투어'
-                                break
-
-                    # 맥락 힌트 생성
-                    if last_specific_tour:
-                        context_hint = f"**중요: 고객이 계속 {last_specific_tour}에 대해 문의 중입니다. 현재 질문은 {last_specific_tour}에 관한 것으로 해석하고 답변하세요.**\n\n"
-                    else:
-                        context_hint = f"**중요: 고객이 계속 {last_tour_type} 투어에 대해 문의 중입니다. 다른 투어가 아닌 {last_tour_type} 투어 정보만 제공하세요.**\n\n"
+            if last_tour_type:
+                last_specific_tour = state.recent_specific_tour()
 
+                # 맥락 힌트 생성
+                if last_specific_tour:
+                    context_hint = f"**중요: 고객이 계속 {last_specific_tour}에 대해 문의 중입니다. 현재 질문은 {last_specific_tour}에 관한 것으로 해석하고 답변하세요.**\n\n"
+                else:
+                    context_hint = f"**중요: 고객이 계속 {last_tour_type} 투어에 대해 문의 중입니다. 다른 투어가 아닌 {last_tour_type} 투어 정보만 제공하세요.**\n\n"
+
+            # 인원을 추적 중이면 이전 대화 대신 인원 요약 한 줄 + 직전 대화만
+            party = state.party_for(user_message)
+            if party.known:
+                conversation_context += f"**현재 인원 (대화 누적, 이 인원으로 계산하세요)**: {party.summary()}\n\n"
+            else:
                 # 이전 대화를 강조하여 표시
                 conversation_context += "**이전 대화 (반드시 참고하세요):**\n"
-                for i, msg in enumerate(recent_messages):
-                    conversation_context += f"{i+1}. 고객: {msg['user']}\n   상담사: {msg['ai']}\n\n"
+                for i, (user_msg, ai_msg) in enumerate(recent_messages):
+                    conversation_context += f"{i+1}. 고객: {user_msg}\n   상담사: {ai_msg}\n\n"
+
+            # 가장 최근 대화를 별도 강조
+            if recent_messages:
+                last_user_msg, last_ai_msg = recent_messages[-1]
+                conversation_context += f"**직전 대화 (가장 중요):**\n고객: {last_user_msg}\n상담사: {last_ai_msg}\n\n"
+
+        if hotels:
+            prompt_context += "호텔 정보:\n"
+            for hotel in hotels[:3]:  # 최대 3개만
+                prompt_context += self.format_hotel_info(hotel) + "\n"
+        
+        # 가격만 묻는 질문인지 확인
+        is_price_only_question = features.is_price_only
 
-                # 가장 최근 대화를 별도 강조
-                if recent_messages:
-                    last_msg = recent_messages[-1]
-                    conversation_context += f"**직전 대화 (가장 중요):**\n고객: {last_msg['user']}\n상담사: {last_msg['ai']}\n\n"
-            
-            if hotels:
-                prompt_context += "호텔 정보:\n"
-                for hotel in hotels[:3]:  # 최대 3개만
-                    prompt_context += self.format_hotel_info(hotel) + "\n"
-            
-            # 가격만 묻는 질문인지 확인
-            is_price_only_question = any(keyword in user_message for keyword in ['가격', '얼마', '비용', '요금', '돈', '만원', '$'])
+        if tours:
+            prompt_context += "투어 정보:\n"
+            query_types = detect_query_types(user_message)
+            for tour in tours:  # 모든 투어
+                prompt_context += self.format_tour_info(tour)
+                # 사용자 질문에 맞는 상세내용만 추출
+                if tour.get('description'):
+                    relevant_description = self.extract_relevant_description(tour['description'], user_message, query_types)
+                    if relevant_description:
+                        prompt_context += f"📝 관련정보: {relevant_description}\n"
+                prompt_context += "\n"
+        
+        if not hotels and not tours:
+            # 이전 대화 컨텍스트 확인
+            has_previous_context = (conversation_id and
+                                  conversation_id in self.conversations)
+
+            if not has_previous_context:
+                # 주어가 생략된 애매한 질문이면 명확화 요청
+                ambiguous_patterns = ['가격', '얼마', '비용', '요금', '아이', '성인', '호텔', '포함']
+                is_ambiguous = any(pattern in user_message for pattern in ambiguous_patterns)
+
+                if is_ambiguous:
+                    return {
+                        'response': "어떤 투어에 대해 문의하시는 건가요? 🤔\n\n현재 이용 가능한 투어:\n• 호이안 투어\n• 베스트팩 투어\n• 래프팅 투어\n• 패밀리팩 투어\n• 골프 투어\n\n구체적인 투어명을 말씀해 주시면 정확한 정보를 안내해드리겠습니다! 😊",
+                        'tours_found': 0,
+                        'hotels_found': 0
+                    }, None
+
+            # 검색 결과가 없을 때 이전 검색 결과 재사용 (연속 대화 지원)
+            if hasattr(self, 'last_search_results') and self.last_search_results:
+                hotels = self.last_search_results.get('hotels', [])
+                tours = self.last_search_results.get('tours', [])
+                try:
+                    print("No search results found, using previous search results for continuity")
+                except UnicodeEncodeError:
+                    print("Using previous search results for continuity")
 
-            if tours:
-                prompt_context += "투어 정보:\n"
-                for tour in tours:  # 모든 투어
-                    prompt_context += self.format_tour_info(tour)
-                    # 사용자 질문에 맞는 상세내용만 추출
-                    if tour.get('description'):
-                        relevant_description = self.extract_relevant_description(tour['description'], user_message)
-                        if relevant_description:
-                            prompt_context += f"📝 관련정보: {relevant_description}\n"
-                    prompt_context += "\n"
-            
+            # 여전히 결과가 없으면 기본 안내
             if not hotels and not tours:
-                # 이전 대화 컨텍스트 확인
-                has_previous_context = (conversation_id and
-                                      conversation_id in self.conversation_history and
-                                      len(self.conversation_history[conversation_id]) > 0)
-
-                if not has_previous_context:
-                    # 주어가 생략된 애매한 질문이면 명확화 요청
-                    ambiguous_patterns = ['가격', '얼마', '비용', '요금', '아이', '성인', '호텔', '포함']
-                    is_ambiguous = any(pattern in user_message for pattern in ambiguous_patterns)
-
-                    if is_ambiguous:
-                        return {
-                            'response': "어떤 투어에 대해 문의하시는 건가요? 🤔\n\n현재 이용 가능한 투어:\n• 호이안 투어\n• 베스트팩 투어\n• 래프팅 투어\n• 패밀리팩 투어\n• 골프 투어\n\n구체적인 투어명을 말씀해 주시면 정확한 정보를 안내해드리겠습니다! 😊",
-                            'tours_found': 0,
-                            'hotels_found': 0
-                        }
-
-                # 검색 결과가 없을 때 이전 검색 결과 재사용 (연속 대화 지원)
-                if hasattr(self, 'last_search_results') and self.last_search_results:
-                    hotels = self.last_search_results.get('hotels', [])
-                    tours = self.last_search_results.get('tours', [])
-                    try:
-                        print("No search results found, using previous search results for continuity")
-                    except UnicodeEncodeError:
-                        print("Using previous search results for continuity")
-
-                # 여전히 결과가 없으면 기본 안내
-                if not hotels and not tours:
-                    available_regions = self.get_available_regions()
-                    region_mentioned = any(region in user_message for region in available_regions)
-                    tour_mentioned = any(keyword in user_message.lower() for keyword in ['투어', '관광', '체험', '액티비티', '투어가'])
-                    hotel_mentioned = any(keyword in user_message.lower() for keyword in ['호텔', '숙박', '리조트', '펜션'])
-                    general_travel = any(keyword in user_message.lower() for keyword in ['여행지', '여행', '어디'])
-
-                    if general_travel and not region_mentioned:
-                        if available_regions:
-                            region_list = ", ".join(available_regions[:3])  # 최대 3개 지역만 표시
-                            return f"저희는 {region_list} 여행 상품을 다루고 있습니다. 어느 지역에 관심 있으시나요?"
-                        else:
-                            return "죄송합니다. 현재 이용 가능한 여행 상품이 없습니다."
-                    elif tour_mentioned and not region_mentioned:
-                        if available_regions:
-                            region_list = ", ".join(available_regions[:3])
-                            return f"어느 지역 투어를 찾으시나요? ({region_list} 등)"
-                        else:
-                            return "어느 지역 투어를 찾으시나요?"
-                    elif hotel_mentioned and not region_mentioned:
-                        if available_regions:
-                            region_list = ", ".join(available_regions[:3])
-                            return f"어느 지역 호텔을 찾으시나요? ({region_list} 등)"
-                        else:
-                            return "어느 지역 호텔을 찾으시나요?"
-                    elif region_mentioned and not tour_mentioned and not hotel_mentioned:
-                        # 지역이 언급되면 해당 지역의 호텔과 투어 정보를 모두 제공
-                        response_parts = []
-                        if hotels:
-                            response_parts.append("🏨 **호텔 정보:**")
-                            for hotel in hotels[:2]:
-                                response_parts.append(self.format_hotel_info(hotel))
-                        if tours:
-                            response_parts.append("🎯 **투어 정보:**")
-                            for tour in tours[:2]:
-                                response_parts.append(self.format_tour_info(tour))
-
-                        if response_parts:
-                            return "\n".join(response_parts) + "\n\n더 자세한 정보가 필요하시거나 예약을 원하시면 말씀해주세요!"
-                        else:
-                            return "숙소가 필요하신가요? 아니면 투어를 찾으시나요?"
+                available_regions = self.get_available_regions()
+                region_mentioned = hits.has('region')
+                tour_mentioned = hits.has('intent_tour')
+                hotel_mentioned = hits.has('intent_hotel')
+                general_travel = hits.has('general_travel')
+
+                if general_travel and not region_mentioned:
+                    if available_regions:
+                        region_list = ", ".join(available_regions[:3])  # 최대 3개 지역만 표시
+                        return f"저희는 {region_list} 여행 상품을 다루고 있습니다. 어느 지역에 관심 있으시나요?", None
                     else:
-                        return "죄송합니다. 해당 검색 조건에 맞는 상품을 찾을 수 없습니다. 다른 지역이나 조건으로 검색해 보시겠어요?"
-            
-            # 복잡한 응답만 AI 호출
-            tour_type_hint = ""
-            if tour_type_mentioned:
-                if any(keyword in user_message_lower for keyword in golf_keywords):
-                    tour_type_hint = "고객이 골프 투어에 관심을 보이고 있습니다. 골프 투어 정보를 상세히 제공하세요."
-                elif any(keyword in user_message_lower for keyword in rafting_keywords):
-                    tour_type_hint = "고객이 래프팅 투어에 관심을 보이고 있습니다. 래프팅 투어 정보를 상세히 제공하세요."
-                elif any(keyword in user_message_lower for keyword in family_keywords):
-                    tour_type_hint = "고객이 패밀리팩 투어에 관심을 보이고 있습니다. 패밀리팩 구성과 내용을 상세히 설명하세요."
-
-            # 현재 투어 종류가 명시적으로 지정된 경우 특별 처리
-            current_tour_context = ""
-
-            # 대화 히스토리에서 마지막 투어명 추출
-            conversation_history_text = ""
-            if conversation_id and conversation_id in self.conversation_history:
-                history = self.conversation_history[conversation_id]
-                if history:
-                    messages = history.get('messages', [])
-                    last_message = messages[-1] if len(messages) > 0 else None
-                    if last_message:
-                        conversation_history_text = f"**📋 이전 대화 내용**: {last_message.get('user', '')}"
-
-            if context and context.get('current_tour_type'):
-                stored_tour_type = context['current_tour_type']
-                if tours:
-                    specific_tour = tours[0]  # 필터링된 투어의 첫 번째
-                    current_tour_context = f"""
+                        return "죄송합니다. 현재 이용 가능한 여행 상품이 없습니다.", None
+                elif tour_mentioned and not region_mentioned:
+                    if available_regions:
+                        region_list = ", ".join(available_regions[:3])
+                        return f"어느 지역 투어를 찾으시나요? ({region_list} 등)", None
+                    else:
+                        return "어느 지역 투어를 찾으시나요?", None
+                elif hotel_mentioned and not region_mentioned:
+                    if available_regions:
+                        region_list = ", ".join(available_regions[:3])
+                        return f"어느 지역 호텔을 찾으시나요? ({region_list} 등)", None
+                    else:
+                        return "어느 지역 호텔을 찾으시나요?", None
+                elif region_mentioned and not tour_mentioned and not hotel_mentioned:
+                    # 지역이 언급되면 해당 지역의 호텔과 투어 정보를 모두 제공
+                    response_parts = []
+                    if hotels:
+                        response_parts.append("🏨 **호텔 정보:**")
+                        for hotel in hotels[:2]:
+                            response_parts.append(self.format_hotel_info(hotel))
+                    if tours:
+                        response_parts.append("🎯 **투어 정보:**")
+                        for tour in tours[:2]:
+                            response_parts.append(self.format_tour_info(tour))
+
+                    if response_parts:
+                        return "\n".join(response_parts) + "\n\n더 자세한 정보가 필요하시거나 예약을 원하시면 말씀해주세요!", None
+                    else:
+                        return "숙소가 필요하신가요? 아니면 투어를 찾으시나요?", None
+                else:
+                    return "죄송합니다. 해당 검색 조건에 맞는 상품을 찾을 수 없습니다. 다른 지역이나 조건으로 검색해 보시겠어요?", None
+        
+        # 복잡한 응답만 AI 호출
+        tour_type_hint = ""
+        if tour_type_mentioned:
+            if hits.has('golf'):
+                tour_type_hint = "고객이 골프 투어에 관심을 보이고 있습니다. 골프 투어 정보를 상세히 제공하세요."
+            elif hits.has('rafting'):
+                tour_type_hint = "고객이 래프팅 투어에 관심을 보이고 있습니다. 래프팅 투어 정보를 상세히 제공하세요."
+            elif hits.has('family'):
+                tour_type_hint = "고객이 패밀리팩 투어에 관심을 보이고 있습니다. 패밀리팩 구성과 내용을 상세히 설명하세요."
+
+        # 현재 투어 종류가 명시적으로 지정된 경우 특별 처리
+        current_tour_context = ""
+
+        # 대화 히스토리에서 마지막 투어명 추출
+        conversation_history_text = ""
+        history = self.conversations.get(conversation_id)
+        if history is not None and history.messages:
+            conversation_history_text = f"**📋 이전 대화 내용**: {history.messages[-1][0]}"
+
+        if context and context.state.tour_type:
+            stored_tour_type = context.state.tour_type
+            if tours:
+                specific_tour = tours[0]  # 필터링된 투어의 첫 번째
+                current_tour_context = f"""
 {conversation_history_text}
 
 🚨🚨🚨 **절대 엄수 - 이전 대화 투어 유지!** 🚨🚨🚨
@@ -1078,9 +1159,9 @@ class TravelAI:
 - **현재 투어**: {specific_tour.get('tour_name', '')} - 이 투어의 정보만 사용하세요!
 """
 
-            # 가격 질문에 대한 간단한 프롬프트
-            if is_price_only_question:
-                prompt = f"""당신은 이여행사 직원입니다. 각 투어상품, 호텔, 기타 서비스를 헷갈리지 않게 정확히 답변하세요.
+        # 가격 질문에 대한 간단한 프롬프트
+        if is_price_only_question:
+            prompt = f"""당신은 이여행사 직원입니다. 각 투어상품, 호텔, 기타 서비스를 헷갈리지 않게 정확히 답변하세요.
 
 고객이 "{user_message}"라고 가격을 문의했습니다.
 
@@ -1093,8 +1174,8 @@ class TravelAI:
 {current_tour_context}
 {conversation_context if len(conversation_context) < 200 else ''}
 {prompt_context}"""
-            else:
-                prompt = f"""당신은 똑똑한 여행 상담사입니다.
+        else:
+            prompt = f"""당신은 똑똑한 여행 상담사입니다.
 
 **문맥 추적 (매우 중요):**
 - 이전 대화에서 어떤 투어를 논의했는지 반드시 확인하세요
@@ -1123,271 +1204,148 @@ class TravelAI:
 
 이전 대화: {conversation_context if len(conversation_context) < 300 else ''}
 {prompt_context}"""
-                
-            # 프롬프트 디버그 출력
-            try:
-                print(f"=== PROMPT DEBUG ===")
-                print(f"User message: {user_message}")
-                print(f"Tours found: {len(tours) if tours else 0}")
-                if tours:
-                    print(f"Tour names: {[tour.get('tour_name', 'Unknown') for tour in tours]}")
-                print(f"Prompt length: {len(prompt)}")
-                print(f"Prompt preview: {prompt[:500]}...")
-                print(f"=== END DEBUG ===")
-            except:
-                print("Debug info (Korean text)")
-
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "당신은 똑똑한 여행 상담사입니다.\n\n**계산 룰 (최우선):**\n- 성인 + 아동(있을 시에만) = 총 인원\n- 가격은 예약금(있을 시) + 잔금으로 구성\n- 성인 숫자와 아동 숫자를 정확히 파악해서 그에 맞는 금액을 정확히 계산\n- 2명인데 3명으로 계산하거나 다른 금액을 계산하면 안됨\n- 어린이가 키 140cm 이상인 경우 성인으로 계산\n- 예시: 성인 2명 + 아이 2명인데 아이 두 명이 모두 140cm 이상이면 합계 총 성인 4명으로 계산\n\n**지속적 추적:**\n- 이전에 어떤 투어를 얘기하고 있는지 계속 추적\n- 생략이 잘 되기 때문에 투어명을 기억해야 함\n- 성인/아이 숫자도 말하다 생략되기 때문에 성인 숫자, 아이 숫자를 계속 추적\n- 궁극적으로 정확한 금액 안내가 목표\n\n**문맥 추적:** \n- 같은 투어에 대한 연속 질문은 이전 대화를 참조\n- 새로운 투어 질문이면 이전 대화 정보를 적용하지 마세요\n- 주어 생략 시에만 같은 투어로 계속 진행\n\n**인원수 누적 계산:** \n- 같은 투어에 대한 추가 질문만 이전 인원수를 기억\n- 새로운 투어 질문이면 처음부터 계산\n- 추가 인원이 있으면 누적 ('아동 1명 추가' → 기본 인원 + 1명)\n\n**키 기준 가격 처리:**\n- 키 정보가 명시된 경우에만 140cm 기준으로 성인/아동 분류\n- 키 정보가 없으면 아동은 아동 가격으로 계산\n- 절대로 이전 대화의 키 정보를 새로운 질문에 적용하지 마세요\n\n**정확한 데이터 사용:**\n- 반드시 제공된 데이터베이스 가격만 사용\n- 없는 가격을 만들어내지 마세요\n- 데이터에 없는 정보는 '확인 후 안내드리겠습니다'\n\n**완전한 답변:** 성인과 아동 가격을 각각 계산하여 총액을 제시\n\n**정보 제한:** 확실하지 않으면 '그에 대한 정보는 카카오톡 상담을 이용해주세요'"},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            response_text = response.choices[0].message.content.strip()
-            try:
-                print(f"AI Response generated: {response_text[:100]}...")
-            except UnicodeEncodeError:
-                print("AI Response generated: [Korean response text]")
-            
-            # 응답 캐시 저장 (24시간)
-            import time
-            self.response_cache[cache_key] = response_text
-            
-            # 캐시 크기 제한 (최대 100개)
-            if len(self.response_cache) > 100:
-                # 가장 오래된 캐시 20개 삭제
-                old_keys = list(self.response_cache.keys())[:20]
-                for key in old_keys:
-                    del self.response_cache[key]
             
-            return response_text
-            
-        except Exception as e:
-            error_str = str(e)
-            error_type = type(e).__name__
-            print(f"OpenAI API Error: {error_type}: {error_str}")
-            print(f"Full error details: {repr(e)}")
-            import traceback
-            traceback.print_exc()
+        # 프롬프트 디버그 출력
+        try:
+            print(f"=== PROMPT DEBUG ===")
+            print(f"User message: {user_message}")
+            print(f"Tours found: {len(tours) if tours else 0}")
             if tours:
-                print(f"Available tours: {[t.get('tour_name', 'Unknown') for t in tours]}")
-
-            # 특정 오류에 따른 대응
-            if "429" in error_str or "quota" in error_str.lower():
-                # API 할당량 초과 시 간단한 응답
-                if hotels:
-                    hotel_names = [h['hotel_name'] for h in hotels[:2]]
-                    return f"다낭에 {', '.join(hotel_names)} 등의 호텔이 있습니다. 자세한 정보는 잠시 후 다시 문의해 주세요."
-                elif tours:
-                    tour_names = [t['tour_name'] for t in tours[:2]]
-                    return f"다낭에 {', '.join(tour_names)} 등의 투어가 있습니다. 자세한 정보는 잠시 후 다시 문의해 주세요."
-                else:
-                    return "죄송합니다. 현재 서비스 이용량이 많아 잠시 후 다시 시도해 주세요."
-            elif "-1" in error_str or "invalid" in error_str.lower():
-                # -1 오류나 invalid request 시 간단한 답변 시도
-                if tours and ('가격' in user_message or '얼마' in user_message):
-                    tour = tours[0]
-                    tour_name = tour.get('tour_name', '')
-                    if '어린이' in user_message or '아동' in user_message:
-                        return f"{tour_name} 아동 가격은 확인 후 안내드리겠습니다."
-                    else:
-                        return f"{tour_name} 투어 가격 정보가 준비되어 있습니다. 구체적인 인원을 말씀해 주시면 정확한 가격을 안내해드리겠습니다."
-                return "죄송합니다. 좀 더 구체적으로 질문해 주시거나, 잠시 후 다시 시도해 주세요."
-            return f"AI 응답 생성 중 오류가 발생했습니다: {str(e)}"
-
-    def validate_and_fix_response(self, response, user_message="", conversation_history=None, conversation_id=None):
-        """응답 내용 검증 및 잘못된 표현 수정"""
-        # 금지된 표현들 (더 포괄적으로)
-        forbidden_phrases = [
-            '1인 기준', '성인 1인 기준', '기본 패키지', '포함 사항', '일반적으로',
-            '보통', '대체로', '추정', '예상', '대략', '기준으로', '기준:',
-            '1인당', '인당', '개인당', '1명당', '명당'
-        ]
-
-        # 투어별 잘못된 가격 정보 감지 (다른 투어 가격 혼용 방지)
-        price_confusion_patterns = [
-            # 더 이상 하드코딩된 가격 패턴 사용하지 않음 - 컨텍스트 기반 검증으로 대체
-        ]
-
-        original_response = response
+                print(f"Tour names: {[tour.get('tour_name', 'Unknown') for tour in tours]}")
+            print(f"Prompt length: {len(prompt)}")
+            print(f"Prompt preview: {prompt[:500]}...")
+            print(f"=== END DEBUG ===")
+        except:
+            print("Debug info (Korean text)")
+
+        return None, {
+            'cache_key': cache_key,
+            'hotels': hotels,
+            'tours': tours,
+            'messages': [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+        }
 
-        # 사용자 질문 분석 - 정확히 물어본 것만 답변하도록 필터링
-        if user_message:
-            # 아이/아동만 물어봤는데 성인 정보가 포함된 경우
-            child_only_keywords = ['아이', '아동', '애기', '애', '유아', '소아']
-            adult_keywords = ['성인', '어른', '성인 3명', '성인3명']
-
-            user_msg_lower = user_message.lower()
-            has_child_keyword = any(keyword in user_msg_lower for keyword in child_only_keywords)
-            has_no_adult_keyword = not any(keyword in user_msg_lower for keyword in adult_keywords)
-
-            # "아이3명"만 물어봤는데 성인 정보가 포함되어 있으면 제거
-            if has_child_keyword and has_no_adult_keyword:
-                adult_patterns_to_remove = [
-                    '성인 3명:', '성인3명:', '성인 \\d+명:',
-                    '예약금 18만원', '18만원', '$1,092', '$1,587',
-                    '총합은:', '총 가격은', '를 포함한 총'
-                ]
-
-                import re
-                for pattern in adult_patterns_to_remove:
-                    # 해당 패턴이 포함된 문장 전체를 제거
-                    lines = response.split('\n')
-                    filtered_lines = []
-
-                    for line in lines:
-                        if not re.search(pattern, line):
-                            filtered_lines.append(line)
-                        else:
-                            try:
-                                print(f"Warning: Removing adult info from child-only question: {pattern}")
-                            except UnicodeEncodeError:
-                                print("Warning: Removing adult info from child-only question")
+    def finish_response(self, request, completion):
+        """LLM 응답 텍스트 추출 + 캐시 저장"""
+        response_text = completion.choices[0].message.content.strip()
+        try:
+            print(f"AI Response generated: {response_text[:100]}...")
+        except UnicodeEncodeError:
+            print("AI Response generated: [Korean response text]")
 
-                    response = '\n'.join(filtered_lines)
+        # 응답 캐시 저장 (24시간, 최대 100개 LRU)
+        self.response_cache.set(request['cache_key'], response_text)
 
-                # 성인 관련 문장 제거
-                response = re.sub(r'[^\n]*성인[^\n]*\n?', '', response)
-                response = re.sub(r'[^\n]*총합[^\n]*\n?', '', response)
-                response = re.sub(r'[^\n]*총 가격[^\n]*\n?', '', response)
+        return response_text
 
-        # 래프팅 가격 오염 감지 및 차단 (에러 처리 추가)
-        try:
-            has_previous_context = conversation_history and len(conversation_history) > 0
+    def handle_response_error(self, e, user_message, hotels, tours):
+        """응답 생성 오류 시 대체 응답"""
+        error_str = str(e)
+        error_type = type(e).__name__
+        print(f"OpenAI API Error: {error_type}: {error_str}")
+        print(f"Full error details: {repr(e)}")
+        import traceback
+        traceback.print_exc()
+        if tours:
+            print(f"Available tours: {[t.get('tour_name', 'Unknown') for t in tours]}")
 
-            if has_previous_context:
-                # 이전 대화에서 호이안이 언급되었는지 확인 (강화된 로직)
-                previous_messages = ' '.join([
-                    msg.get('content', '') if isinstance(msg, dict) else str(msg)
-                    for msg in conversation_history
-                ])
+        # 특정 오류에 따른 대응
+        if "429" in error_str or "quota" in error_str.lower():
+            # API 할당량 초과 시 간단한 응답
+            if hotels:
+                hotel_names = [h['hotel_name'] for h in hotels[:2]]
+                return f"다낭에 {', '.join(hotel_names)} 등의 호텔이 있습니다. 자세한 정보는 잠시 후 다시 문의해 주세요."
+            elif tours:
+                tour_names = [t['tour_name'] for t in tours[:2]]
+                return f"다낭에 {', '.join(tour_names)} 등의 투어가 있습니다. 자세한 정보는 잠시 후 다시 문의해 주세요."
+            else:
+                return "죄송합니다. 현재 서비스 이용량이 많아 잠시 후 다시 시도해 주세요."
+        elif "-1" in error_str or "invalid" in error_str.lower():
+            # -1 오류나 invalid request 시 간단한 답변 시도
+            if tours and ('가격' in user_message or '얼마' in user_message):
+                tour = tours[0]
+                tour_name = tour.get('tour_name', '')
+                if '어린이' in user_message or '아동' in user_message:
+                    return f"{tour_name} 아동 가격은 확인 후 안내드리겠습니다."
+                else:
+                    return f"{tour_name} 투어 가격 정보가 준비되어 있습니다. 구체적인 인원을 말씀해 주시면 정확한 가격을 안내해드리겠습니다."
+            return "죄송합니다. 좀 더 구체적으로 질문해 주시거나, 잠시 후 다시 시도해 주세요."
+        return f"AI 응답 생성 중 오류가 발생했습니다: {str(e)}"
 
-                # 전체 맥락을 고려한 투어 컨텍스트 감지 (특정 이름이 아닌 전체 맥락)
-                current_tour_type = None
-                if conversation_id and conversation_id in self.conversation_history:
-                    context_data = self.conversation_history[conversation_id]
-                    current_tour_type = context_data.get('current_tour_type', '')
+    def generate_response(self, user_message, hotels, tours, conversation_id=None, features=None):
+        """AI 응답 생성 (캐시 적용)"""
+        try:
+            response, request = self.prepare_response(user_message, hotels, tours, conversation_id, features)
+            if request is None:
+                return response
+            hotels, tours = request['hotels'], request['tours']
+            completion = self.client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=request['messages'],
+                max_tokens=500,
+                temperature=0.7
+            )
+            return self.finish_response(request, completion)
+        except Exception as e:
+            return self.handle_response_error(e, user_message, hotels, tours)
 
-                # 컨텍스트 기반 오염 방지: 현재 투어 타입과 다른 가격 정보 감지
-                is_non_rafting_context = current_tour_type and current_tour_type != 'rafting'
+    async def generate_response_async(self, user_message, hotels, tours, conversation_id=None, features=None):
+        """generate_response 비동기 버전 (LLM 호출 동안 이벤트 루프를 막지 않음)"""
+        try:
+            if self.catalog and self.catalog.is_ready():
+                response, request = self.prepare_response(user_message, hotels, tours, conversation_id, features)
+            else:
+                # 지역 목록 등 동기 DB 조회가 있을 수 있으므로 스레드에서 실행
+                response, request = await asyncio.to_thread(self.prepare_response, user_message, hotels, tours, conversation_id, features)
+            if request is None:
+                return response
+            hotels, tours = request['hotels'], request['tours']
+            completion = await self.async_client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=request['messages'],
+                max_tokens=500,
+                temperature=0.7
+            )
+            return self.finish_response(request, completion)
+        except Exception as e:
+            return self.handle_response_error(e, user_message, hotels, tours)
 
-                # 호이안 투어 컨텍스트에서만 래프팅 가격 오염 차단
-                is_hoi_an_context = current_tour_type == 'hoi_an'
+    def is_hoi_an_context(self, conversation_history, conversation_id):
+        """호이안 투어 맥락인지 (래프팅 가격 오염 차단 대상)"""
+        has_previous_context = bool(conversation_history)
+        if not has_previous_context:
+            return False
 
-                # 현재 응답에 래프팅 가격이 포함되어 있는지 확인
-                has_rafting_contamination = (
-                    '$340' in response or '340달러' in response or
-                    '$49' in response or '49달러' in response or
-                    ('$438' in response and '$340' in response)  # 래프팅 계산 결과
-                )
+        # 전체 맥락을 고려한 투어 컨텍스트 감지 (특정 이름이 아닌 전체 맥락)
+        current_tour_type = None
+        context = self.conversations.get(conversation_id)
+        if context is not None:
+            current_tour_type = context.state.tour_type
 
-                if is_hoi_an_context and has_rafting_contamination:
-                    print("CRITICAL: Detected rafting price contamination in Hoi An context!")
-                    print(f"Previous context: Hoi An, Current response contains rafting prices")
-                    # 래프팅 가격 정보가 포함된 문장들을 제거
-                    lines = response.split('\n')
-                    filtered_lines = []
-                    for line in lines:
-                        if not any(price in line for price in ['$340', '$49', '$438', '340달러', '49달러']):
-                            filtered_lines.append(line)
-                        else:
-                            print(f"Removing contaminated line (length: {len(line)})")
+        # 호이안 투어 컨텍스트에서만 래프팅 가격 오염 차단
+        return current_tour_type == 'hoi_an'
 
-                    response = '\n'.join(filtered_lines).strip()
+    def validate_and_fix_response(self, response, user_message="", conversation_history=None, conversation_id=None, features=None):
+        """응답 내용 검증 및 잘못된 표현 수정 (규칙은 response_filter 와 공유)"""
+        original_response = response
 
-                    if not response.strip():
-                        response = "죄송합니다. 호이안 투어 관련 정확한 정보를 다시 확인하여 안내해드리겠습니다."
+        hits = None
+        if features is not None:
+            hits = features.hits
+        elif user_message:
+            hits = self.scan_message(user_message)
 
+        try:
+            hoi_an_context = self.is_hoi_an_context(conversation_history, conversation_id)
         except Exception as contamination_error:
-            print(f"Error in contamination detection: {contamination_error}")
             # 오염 감지에서 오류가 발생하면 원본 응답을 그대로 사용
+            print(f"Error in contamination detection: {contamination_error}")
+            hoi_an_context = False
 
-        # 질문 컨텍스트 확인 - 비슷한 단어와 동의어까지 포함
-        user_msg_lower = user_message.lower()
-
-        # 어린이 관련 동의어들
-        children_keywords = ['아이', '아동', '애기', '어린이', '소아', '유아', '애들', '꼬마', '꼬마들', '애', '어린애', '작은애', '꼬맹이', '애기들']
-        is_children_question = any(keyword in user_msg_lower for keyword in children_keywords)
-
-        # 성인 관련 동의어들
-        adult_keywords = ['성인', '어른', '어른들', '어른분', '성인분', '성년', '대인', '어른분들', '성인들']
-        is_adult_question = any(keyword in user_msg_lower for keyword in adult_keywords)
-
-        # 인원수 관련 표현들 (숫자 + 단위)
-        people_patterns = [
-            # 기본 명수
-            *[str(i) + '명' for i in range(1, 21)],
-            # 한글 숫자
-            '한명', '두명', '세명', '네명', '다섯명', '여섯명', '일곱명', '여덟명', '아홉명', '열명',
-            # 기타 표현
-            '몇명', '몇 명', '몇분', '몇 분', '인원', '사람', '명수', '1인', '2인', '3인', '4인', '5인'
-        ]
-        is_people_count_question = any(pattern in user_msg_lower for pattern in people_patterns)
-
-        # 가격 관련 동의어들
-        price_keywords = [
-            '얼마', '가격', '비용', '요금', '돈', '값', '금액', '경비', '료금', '비',
-            '추가', '더하면', '플러스', '더해서', '포함해서', '합치면', '총', '전체',
-            '얼만', '얼마나', '얼마정도', '얼마쯤', '가격이', '비용이', '요금이',
-            '계산', '정산', '지불', '결제', '페이', '지불해야', '내야'
-        ]
-        is_price_question = any(keyword in user_msg_lower for keyword in price_keywords)
-
-        # 금지된 표현 제거 (모든 가격 질문에서는 완화 - 어린이, 성인, 인원수 관련)
-        for phrase in forbidden_phrases:
-            if phrase in response:
-                # 가격 관련 질문에서는 일부 금지 표현 허용 (모든 투어/호텔/표에 적용)
-                if is_price_question and (is_children_question or is_adult_question or is_people_count_question):
-                    # 가격 질문에서 허용되는 표현들
-                    price_allowed_phrases = [
-                        '1인당', '인당', '개인당', '1명당', '명당',  # 인원 관련
-                        '기본 패키지', '일반적으로', '보통', '대체로',  # 설명 표현
-                        '추정', '예상', '대략', '기준으로', '기준:'  # 가격 설명
-                    ]
-                    if phrase in price_allowed_phrases:
-                        continue  # 이 표현들은 제거하지 않음
-
-                try:
-                    print(f"Warning: Removing forbidden phrase '{phrase}' from response")
-                except UnicodeEncodeError:
-                    print("Warning: Removing forbidden phrase from response")
-
-                # 직접적으로 금지된 표현을 제거
-                response = response.replace(phrase, '').strip()
-
-                # 연속된 공백이나 구두점 정리
-                response = response.replace('  ', ' ').replace(' :', ':').replace(' -', ' ')
-                response = response.replace('- ', '').replace(': ', ' ')
-
-                # 문장 시작 부분의 잘못된 구두점 제거
-                while response.startswith((':', '-', ' ', ',')):
-                    response = response[1:].strip()
-
-        # 자동 줄바꿈 처리 - 번호가 있는 리스트나 정렬된 정보
-        import re
-
-        # 1. 숫자 + 점 + 공백 패턴 (1. 2. 3.)
-        response = re.sub(r'(\d+\.\s)', r'\n\1', response)
-
-        # 2. 숫자 + 괄호 + 공백 패턴 (1) 2) 3))
-        response = re.sub(r'(\d+\)\s)', r'\n\1', response)
-
-        # 3. **내용**: 패턴 (볼드체로 구분된 항목들)
-        response = re.sub(r'(\*\*[^*]+\*\*:)', r'\n\1', response)
-
-        # 4. - 항목들 (대시로 시작하는 리스트)
-        response = re.sub(r'(\s-\s)', r'\n- ', response)
-
-        # 5. 첫 줄 빈줄 제거 및 연속 줄바꿈 정리
-        response = response.strip()
-        response = re.sub(r'\n\n+', '\n\n', response)  # 3개 이상 연속 줄바꿈을 2개로
-        response = re.sub(r'^\n', '', response)  # 맨 앞 줄바꿈 제거
-
-        # 빈 문장 정리
-        response = response.replace('..', '.').replace('  ', ' ').strip()
+        response = filter_response(response, user_message, hoi_an_context, hits)
 
         if response != original_response:
             try:
@@ -1397,34 +1355,196 @@ class TravelAI:
 
         return response
 
+    def analyze_message(self, user_message):
+        """메시지 분석 (요청당 한 번, 이후 단계는 이 결과를 사용)"""
+        return build_message_features(user_message, self.scan_message(user_message))
+
+    def read_message(self, user_message):
+        """1~2단계: 메시지 분석 + 키워드 추출 -> (features, keywords)"""
+        with STAGE_TIMINGS.measure('features'):
+            features = self.analyze_message(user_message)
+        with STAGE_TIMINGS.measure('keywords'):
+            keywords = self.extract_keywords(user_message, features)
+        print(f"Determined intent: {features.intent}")
+        try:
+            print(f"Keywords: {keywords}")
+        except UnicodeEncodeError:
+            print("Keywords: [Korean keywords]")
+        return features, keywords
+
+    async def read_message_async(self, user_message):
+        """read_message 비동기 버전 (카탈로그 준비 전이면 지역/투어 목록을 DB 에서 읽으므로 스레드에서)"""
+        if self.catalog and self.catalog.is_ready():
+            return self.read_message(user_message)
+        return await asyncio.to_thread(self.read_message, user_message)
+
     def process_message(self, user_message, conversation_id=None):
         """메시지 처리 메인 함수"""
         try:
-            try:
-                print(f"Processing message: {user_message} (conversation: {conversation_id})")
-            except UnicodeEncodeError:
-                print(f"Processing message: [Korean text] (conversation: {conversation_id})")
+            print(f"Processing message: {user_message} (conversation: {conversation_id})")
         except UnicodeEncodeError:
             print(f"Processing message: [Korean text] (conversation: {conversation_id})")
-        
-        # 1. 키워드 추출
-        keywords = self.extract_keywords(user_message)
-        # print(f"Extracted keywords: {keywords}")
-        
-        # 2. 의도 파악
-        intent = self.determine_intent(user_message)
-        print(f"Determined intent: {intent}")
+
+        # 대화 컨텍스트는 이 턴 동안 한 번만 읽고 턴이 끝날 때 한 번 저장
+        with self.conversations.turn():
+            # 1~2. 메시지 분석 (의도 / 인원 / 키워드 매칭) + 키워드 추출
+            features, keywords = self.read_message(user_message)
+            intent = features.intent
+
+            # 3. 데이터베이스 검색
+            with STAGE_TIMINGS.measure('search'):
+                hotels, tours = self.search_database(keywords, intent, conversation_id)
+            print(f"Found hotels: {len(hotels)}, tours: {len(tours)}")
+
+            # 가격표로 계산되는 가격 질문은 LLM 없이 견적 응답
+            with STAGE_TIMINGS.measure('price_quote'):
+                price_answer = self.answer_price(user_message, tours, features, conversation_id)
+            if price_answer is not None:
+                response, tours = price_answer
+                with STAGE_TIMINGS.measure('finish'):
+                    return self.finish_message(user_message, conversation_id, intent, keywords, hotels, tours, response,
+                                               filtered_response=response, features=features)
+
+            # 4. AI 응답 생성
+            with STAGE_TIMINGS.measure('response'):
+                response = self.generate_response(user_message, hotels, tours, conversation_id, features)
+
+            with STAGE_TIMINGS.measure('finish'):
+                return self.finish_message(user_message, conversation_id, intent, keywords, hotels, tours, response, features=features)
+
+    async def process_message_async(self, user_message, conversation_id=None):
+        """process_message 비동기 버전 (DB 검색 / LLM 호출 동안 이벤트 루프를 막지 않음)"""
         try:
-            print(f"Keywords: {keywords}")
+            print(f"Processing message: {user_message} (conversation: {conversation_id})")
         except UnicodeEncodeError:
-            print("Keywords: [Korean keywords]")
+            print(f"Processing message: [Korean text] (conversation: {conversation_id})")
 
-        # 3. 데이터베이스 검색
-        hotels, tours = self.search_database(keywords, intent, conversation_id)
-        print(f"Found hotels: {len(hotels)}, tours: {len(tours)}")
-        
-        # 4. AI 응답 생성
-        response = self.generate_response(user_message, hotels, tours, conversation_id)
+        # 대화 컨텍스트는 턴 시작 시 한 번 읽고 (저장소 I/O 는 스레드에서) 턴이 끝날 때 한 번 저장
+        async with self.conversations.turn_async(conversation_id):
+            # 1~2. 메시지 분석 + 키워드 추출
+            features, keywords = await self.read_message_async(user_message)
+            intent = features.intent
+
+            # 3. 데이터베이스 검색 (호텔 / 투어 동시)
+            with STAGE_TIMINGS.measure('search'):
+                hotels, tours = await self.search_database_async(keywords, intent, conversation_id)
+            print(f"Found hotels: {len(hotels)}, tours: {len(tours)}")
+
+            # 가격표로 계산되는 가격 질문은 LLM 없이 견적 응답
+            with STAGE_TIMINGS.measure('price_quote'):
+                price_answer = self.answer_price(user_message, tours, features, conversation_id)
+            if price_answer is not None:
+                response, tours = price_answer
+                with STAGE_TIMINGS.measure('finish'):
+                    return self.finish_message(user_message, conversation_id, intent, keywords, hotels, tours, response,
+                                               filtered_response=response, features=features)
+
+            # 4. AI 응답 생성
+            with STAGE_TIMINGS.measure('response'):
+                response = await self.generate_response_async(user_message, hotels, tours, conversation_id, features)
+
+            with STAGE_TIMINGS.measure('finish'):
+                return self.finish_message(user_message, conversation_id, intent, keywords, hotels, tours, response, features=features)
+
+    async def process_message_stream(self, user_message, conversation_id=None):
+        """process_message 스트리밍 버전
+
+        ('delta', 텍스트) 를 LLM 토큰이 도착하는 대로 내보내고 (응답 필터 적용),
+        마지막에 ('done', process_message 와 같은 결과 dict) 를 내보낸다.
+        """
+        try:
+            print(f"Processing message (stream): {user_message} (conversation: {conversation_id})")
+        except UnicodeEncodeError:
+            print(f"Processing message (stream): [Korean text] (conversation: {conversation_id})")
+
+        # 대화 컨텍스트는 턴 시작 시 한 번 읽고 (저장소 I/O 는 스레드에서) 턴이 끝날 때 한 번 저장
+        async with self.conversations.turn_async(conversation_id):
+            features, keywords = await self.read_message_async(user_message)
+            intent = features.intent
+            with STAGE_TIMINGS.measure('search'):
+                hotels, tours = await self.search_database_async(keywords, intent, conversation_id)
+            print(f"Found hotels: {len(hotels)}, tours: {len(tours)}")
+
+            with STAGE_TIMINGS.measure('price_quote'):
+                price_answer = self.answer_price(user_message, tours, features, conversation_id)
+            if price_answer is not None:
+                response, tours = price_answer
+                result = self.finish_message(user_message, conversation_id, intent, keywords, hotels, tours, response,
+                                             filtered_response=response, features=features)
+                yield 'delta', result['response']
+                yield 'done', result
+                return
+
+            try:
+                with STAGE_TIMINGS.measure('prepare'):
+                    if self.catalog and self.catalog.is_ready():
+                        response, request = self.prepare_response(user_message, hotels, tours, conversation_id, features)
+                    else:
+                        response, request = await asyncio.to_thread(self.prepare_response, user_message, hotels, tours, conversation_id, features)
+            except Exception as e:
+                response, request = self.handle_response_error(e, user_message, hotels, tours), None
+
+            # 캐시 / 규칙 응답은 한 번에
+            if request is None:
+                result = self.finish_message(user_message, conversation_id, intent, keywords, hotels, tours, response, features=features)
+                yield 'delta', result['response']
+                yield 'done', result
+                return
+
+            conversation_history = self.get_conversation_context(conversation_id) if conversation_id else []
+            stream_filter = StreamingResponseFilter(user_message, self.is_hoi_an_context(conversation_history, conversation_id),
+                                                    hits=features.hits)
+            completed = False
+            started = time.perf_counter()
+            try:
+                stream = await self.async_client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=request['messages'],
+                    max_tokens=500,
+                    temperature=0.7,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = stream_filter.feed(chunk.choices[0].delta.content or '')
+                    if delta:
+                        yield 'delta', delta
+                completed = True
+            except Exception as e:
+                if not stream_filter.raw:
+                    # 아직 아무것도 보내지 않았으면 기존 오류 대체 응답
+                    fallback = self.handle_response_error(e, user_message, request['hotels'], request['tours'])
+                    delta = stream_filter.feed(fallback)
+                    if delta:
+                        yield 'delta', delta
+                else:
+                    print(f"Streaming interrupted: {type(e).__name__}: {e}")
+            STAGE_TIMINGS.record('llm_stream', time.perf_counter() - started)
+
+            delta = stream_filter.flush()
+            if delta:
+                yield 'delta', delta
+
+            raw_text = stream_filter.raw.strip()
+            if completed and raw_text:
+                # 응답 캐시 저장 (필터 전 원문, 재사용 시 다시 필터링)
+                self.response_cache.set(request['cache_key'], raw_text)
+
+            with STAGE_TIMINGS.measure('finish'):
+                result = self.finish_message(user_message, conversation_id, intent, keywords,
+                                             request['hotels'], request['tours'], raw_text,
+                                             filtered_response=stream_filter.text.strip(), features=features)
+            yield 'done', result
+
+    def finish_message(self, user_message, conversation_id, intent, keywords, hotels, tours, response, filtered_response=None, features=None):
+        """응답 생성 이후 단계: 컨텍스트 업데이트, 응답 검증, 자가 검증
+
+        filtered_response: 스트리밍 중 이미 필터를 거친 응답 (있으면 다시 검증하지 않음)
+        features: process_message 에서 계산한 MessageFeatures (없으면 다시 분석)
+        """
+        if features is None:
+            features = self.analyze_message(user_message)
 
         # 응답이 dict 형태인 경우 (명확화 요청) 바로 반환
         if isinstance(response, dict):
@@ -1432,49 +1552,25 @@ class TravelAI:
 
         # 5. 대화 컨텍스트 업데이트
         if conversation_id:
-            self.update_conversation_context(conversation_id, user_message, response, hotels, tours)
+            self.update_conversation_context(conversation_id, user_message, response, hotels, tours, features)
 
         # 6. 응답 내용 검증 및 수정
         conversation_history = self.get_conversation_context(conversation_id) if conversation_id else []
         original_response = response
-        response = self.validate_and_fix_response(response, user_message, conversation_history, conversation_id)
+        if filtered_response is not None:
+            response = filtered_response
+        else:
+            response = self.validate_and_fix_response(response, user_message, conversation_history, conversation_id, features)
 
         # 응답이 필터링으로 인해 너무 짧아졌거나 무효해진 경우 상세 오류 정보 및 안내 제공
         if not response or len(response.strip()) < 10:
             # 사용자 질문 분석하여 맞춤형 안내 제공
-            user_msg_lower = user_message.lower()
-
-            # 어린이 관련 동의어들
-            children_keywords = ['아이', '아동', '애기', '어린이', '소아', '유아', '애들', '꼬마', '꼬마들', '애', '어린애', '작은애', '꼬맹이', '애기들']
-            is_children_question = any(keyword in user_msg_lower for keyword in children_keywords)
-
-            # 가격 관련 동의어들
-            price_keywords = [
-                '얼마', '가격', '비용', '요금', '돈', '값', '금액', '경비', '료금', '비',
-                '추가', '더하면', '플러스', '더해서', '포함해서', '합치면', '총', '전체',
-                '얼만', '얼마나', '얼마정도', '얼마쯤', '가격이', '비용이', '요금이',
-                '계산', '정산', '지불', '결제', '페이', '지불해야', '내야'
-            ]
-            is_price_question = any(keyword in user_msg_lower for keyword in price_keywords)
-
-            tour_keywords = ['베스트팩', 'bestpack', '호이안', '다낭', '나트랑', '푸꾸옥', '사파', '하롱베이', '칸토', '메콩', '래프팅']
-            hotel_keywords = ['호텔', '숙소', '리조트', '펜션']
-
-            detected_tour = None
-            detected_service = None
-
-            for keyword in tour_keywords:
-                if keyword in user_message.lower():
-                    detected_tour = keyword
-                    break
-
-            for keyword in hotel_keywords:
-                if keyword in user_message.lower():
-                    detected_service = '숙박'
-                    break
+            is_children_question = features.is_children_question
+            is_price_question = features.is_price_question
 
-            if not detected_service:
-                detected_service = '투어'
+            guidance_tours = features.hits.keywords('guidance_tour')
+            detected_tour = guidance_tours[0] if guidance_tours else None
+            detected_service = '숙박' if features.hits.has('guidance_hotel') else '투어'
 
             # 구체적인 안내 메시지 생성
             helpful_guidance = []
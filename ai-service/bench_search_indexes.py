@@ -0,0 +1,128 @@
+"""검색 인덱스 EXPLAIN 벤치마크
+
+임시 스키마에 합성 호텔/투어 카탈로그(기본 각 20,000행)를 만들고
+database/search_indexes.sql 적용 전/후의 실행 계획과 실행 시간을 비교한다.
+
+    python bench_search_indexes.py [행 수]
+
+실행이 끝나면 임시 스키마는 삭제된다.
+"""
+import os
+import random
+import sys
+import time
+
+from database import get_db_connection, build_ranked_search, HOTEL_COLUMNS, TOUR_COLUMNS
+
+BENCH_SCHEMA = 'bench_search'
+MIGRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database', 'search_indexes.sql')
+
+REGIONS = ['다낭', '호이안', '나트랑', '푸꾸옥', '하노이', '호치민', '사파', '달랏']
+WORDS = ['래프팅', '패밀리팩', '베스트팩', '라이트팩', '골프투어', '바나힐', '리조트', '오션뷰', '스파',
+         '조식', '픽업', '가이드', '야시장', '쿠킹클래스', '스노클링', '시티투어', 'family', 'golf', 'resort']
+QUERIES = [['래프팅', '다낭'], ['골프투어'], ['family', '패밀리팩', '가족'], ['오션뷰', '리조트', '호텔']]
+
+
+def synthetic_rows(count):
+    rng = random.Random(42)
+    for i in range(count):
+        name = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}"
+        region = rng.choice(REGIONS)
+        description = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+        yield name, region, description
+
+
+def create_tables(cursor, count):
+    cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+    cursor.execute(f"SET search_path TO {BENCH_SCHEMA}, public")
+    cursor.execute("""
+        CREATE TABLE hotels (
+            id SERIAL PRIMARY KEY, hotel_name VARCHAR(200) NOT NULL, hotel_region VARCHAR(100) NOT NULL,
+            promotion_start DATE DEFAULT CURRENT_DATE, promotion_end DATE, is_unlimited BOOLEAN DEFAULT false,
+            adult_price INTEGER, child_price INTEGER, child_criteria VARCHAR(100), description TEXT,
+            is_active BOOLEAN DEFAULT true, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE tours (
+            id SERIAL PRIMARY KEY, tour_name VARCHAR(200) NOT NULL, tour_region VARCHAR(100) NOT NULL,
+            description TEXT, duration VARCHAR(50), is_active BOOLEAN DEFAULT true,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    rows = list(synthetic_rows(count))
+    cursor.executemany("INSERT INTO hotels (hotel_name, hotel_region, description) VALUES (%s, %s, %s)", rows)
+    cursor.executemany("INSERT INTO tours (tour_name, tour_region, description) VALUES (%s, %s, %s)", rows)
+    cursor.execute("ANALYZE hotels")
+    cursor.execute("ANALYZE tours")
+
+
+def legacy_query(table, name_col, region_col, terms):
+    patterns = [f'%{term.lower()}%' for term in terms]
+    search_sql = f"""
+        SELECT * FROM {table}
+        WHERE is_active = true
+        AND (LOWER({name_col}) LIKE ANY(%s) OR LOWER({region_col}) LIKE ANY(%s) OR LOWER(description) LIKE ANY(%s))
+        ORDER BY {region_col}, {name_col}
+        LIMIT 10
+    """
+    return search_sql, (patterns, patterns, patterns)
+
+
+def explain(cursor, search_sql, params):
+    started = time.perf_counter()
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + search_sql, params)
+    elapsed = (time.perf_counter() - started) * 1000
+    plan = [row['QUERY PLAN'] for row in cursor.fetchall()]
+    return plan, elapsed
+
+
+def print_plan(title, plan, elapsed):
+    print(f"--- {title} ({elapsed:.1f} ms)")
+    for line in plan:
+        print(f"    {line}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    conn = get_db_connection()
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    try:
+        print(f"=== Creating synthetic catalog: {count} hotels, {count} tours ===")
+        create_tables(cursor, count)
+
+        print("\n=== BEFORE: LIKE ANY over name / region / description ===")
+        before = {}
+        for terms in QUERIES:
+            search_sql, params = legacy_query('tours', 'tour_name', 'tour_region', terms)
+            plan, elapsed = explain(cursor, search_sql, params)
+            before[tuple(terms)] = elapsed
+            print_plan(f"tours {terms}", plan, elapsed)
+
+        print("\n=== Applying database/search_indexes.sql ===")
+        with open(MIGRATION_PATH, encoding='utf-8') as f:
+            cursor.execute(f.read())
+        cursor.execute("ANALYZE hotels")
+        cursor.execute("ANALYZE tours")
+
+        print("\n=== AFTER: trigram / tsvector indexed, ranked by similarity ===")
+        for terms in QUERIES:
+            search_sql, params = build_ranked_search('tours', TOUR_COLUMNS, 'tour_region, tour_name', terms)
+            plan, elapsed = explain(cursor, search_sql, params)
+            print_plan(f"tours {terms}", plan, elapsed)
+            print(f"    speedup vs LIKE ANY: {before[tuple(terms)] / elapsed:.1f}x")
+
+        search_sql, params = build_ranked_search('hotels', HOTEL_COLUMNS, 'hotel_region, hotel_name', QUERIES[-1])
+        plan, elapsed = explain(cursor, search_sql, params)
+        print_plan(f"hotels {QUERIES[-1]}", plan, elapsed)
+    finally:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
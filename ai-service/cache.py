@@ -0,0 +1,134 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """캐시 값의 대략적인 메모리 크기 (바이트) - 검색 결과(list[dict]) / 문자열 기준"""
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class TTLCache:
+    """스레드 안전 LRU + TTL 캐시
+
+    - OrderedDict 로 O(1) 조회/갱신/LRU 제거
+    - 항목별 TTL (set 시 지정, 없으면 기본 ttl)
+    - stale_ttl: 만료 후에도 이 시간 동안은 항목을 보관 (get_with_state 로 stale 값 조회 가능)
+    - max_entries 개수 제한 + max_bytes 메모리 제한 (넘으면 가장 오래 안 쓴 항목부터 제거)
+    - hits / misses / evictions / expirations 카운터
+    """
+
+    def __init__(self, max_entries=128, ttl=300, max_bytes=None, sizeof=estimate_size, name='cache', stale_ttl=0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (value, expires_at, stale_until, size)
+        self._bytes = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[1] > time.time()
+
+    def _remove(self, key):
+        entry = self._data.pop(key)
+        self._bytes -= entry[3]
+
+    def get_with_state(self, key):
+        """(값, 상태) 반환. 상태: 'fresh' / 'stale' (만료됐지만 stale_ttl 이내) / 'miss'"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, 'miss'
+            now = time.time()
+            if entry[2] <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None, 'miss'
+            self._data.move_to_end(key)
+            if entry[1] <= now:
+                self.stale_hits += 1
+                return entry[0], 'stale'
+            self.hits += 1
+            return entry[0], 'fresh'
+
+    def get(self, key, default=None):
+        """유효한(만료 전) 값을 반환, 없으면 default"""
+        value, state = self.get_with_state(key)
+        return value if state == 'fresh' else default
+
+    def peek(self, key, default=None):
+        """get 과 같지만 hits / misses 와 LRU 순서를 바꾸지 않음 (이미 집계한 조회의 재확인용)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= time.time():
+                return default
+            return entry[0]
+
+    def set(self, key, value, ttl=None, stale_ttl=None):
+        """ttl / stale_ttl 을 생략하면 기본값 (stale_ttl=0 이면 만료 즉시 제거)"""
+        size = self.sizeof(value) if self.max_bytes else 0
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        stale_until = expires_at + (self.stale_ttl if stale_ttl is None else stale_ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, stale_until, size)
+            self._bytes += size
+
+            while self._data and (len(self._data) > self.max_entries or
+                                  (self.max_bytes and self._bytes > self.max_bytes)):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._remove(key)
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+
+from search_index import InvertedIndex
+from pricing import get_price_table
+from description_index import get_description_sections
+from vector_index import VectorIndex, VECTOR_SEARCH_AVAILABLE, blend_rankings
+
+HOTEL_FIELDS = ('hotel_name', 'hotel_region', 'description')
+TOUR_FIELDS = ('tour_name', 'tour_region', 'description')
+# 이름/지역 매칭이 설명 매칭보다 높은 점수를 받도록 가중치
+FIELD_WEIGHTS = {'hotel_name': 3.0, 'tour_name': 3.0, 'hotel_region': 2.0, 'tour_region': 2.0}
+
+# 유사도 검색 (numpy 가 없으면 꺼짐)
+VECTOR_SEARCH = os.getenv('VECTOR_SEARCH', 'true').lower() == 'true' and VECTOR_SEARCH_AVAILABLE
+VECTOR_MIN_SCORE = float(os.getenv('VECTOR_MIN_SCORE', '0.25'))  # 이보다 낮은 유사도는 버림 (tour_info.json 기준: 바꿔 말하기 0.36 이상, 공통 지역/가격만 겹치면 0.21 이하)
+VECTOR_WEIGHT = float(os.getenv('VECTOR_WEIGHT', '0.5'))  # 순위 합칠 때 키워드 순위 대비 가중치
+
+
+class Catalog:
+    """호텔/투어 카탈로그 메모리 스냅샷
+
+    - 시작 시 활성 호텔/투어를 한 번에 읽어오고
+    - 백그라운드 스레드가 updated_at 워터마크 이후 변경된 행만 가져와 반영
+    - 삭제된 행은 full_reload_every 번째 갱신마다 전체 재적재로 정리
+    검색/지역 조회는 모두 메모리에서 처리하므로 요청 경로에서 DB 왕복이 없음
+    검색은 역색인(BM25)으로 관련도 순 정렬 + 벡터 유사도 순위를 합침 (VECTOR_SEARCH)
+    투어 설명의 가격표 / 섹션 색인은 적재 시 만들어 둠 (price_table, get_description_sections)
+    """
+
+    def __init__(self, fetch_hotels, fetch_tours, refresh_interval=60, full_reload_every=30, limit=10):
+        # fetch_*(since) -> 행 목록. since=None 이면 활성 행 전체,
+        # since 가 있으면 updated_at >= since 인 행 전체 (비활성 포함)
+        self.fetch_hotels = fetch_hotels
+        self.fetch_tours = fetch_tours
+        self.refresh_interval = refresh_interval
+        self.full_reload_every = full_reload_every
+        self.limit = limit
+
+        self._lock = threading.Lock()
+        self._hotels = {}  # id -> row
+        self._tours = {}
+        self._hotel_list = []  # 지역, 이름 순 정렬
+        self._tour_list = []
+        self._regions = []
+        self._price_tables = {}  # 투어 id -> PriceTable 또는 None
+        self._hotel_index = InvertedIndex(HOTEL_FIELDS, FIELD_WEIGHTS)
+        self._tour_index = InvertedIndex(TOUR_FIELDS, FIELD_WEIGHTS)
+        self._hotel_vectors = VectorIndex(HOTEL_FIELDS, FIELD_WEIGHTS) if VECTOR_SEARCH else None
+        self._tour_vectors = VectorIndex(TOUR_FIELDS, FIELD_WEIGHTS) if VECTOR_SEARCH else None
+        self._watermark = None
+        self._ready = False
+        self._refresh_count = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self.version = 0
+        self.last_refresh = None
+
+    # ========== 적재 / 갱신 ==========
+    def _max_updated_at(self, rows, current):
+        for row in rows:
+            updated_at = row.get('updated_at')
+            if updated_at is not None and (current is None or updated_at > current):
+                current = updated_at
+        return current
+
+    def _hotel_key(self, hotel):
+        return (hotel.get('hotel_region') or '', hotel.get('hotel_name') or '')
+
+    def _tour_key(self, tour):
+        return (tour.get('tour_region') or '', tour.get('tour_name') or '')
+
+    def _build_index(self, fields, rows, order_key, index_class=InvertedIndex):
+        index = index_class(fields, FIELD_WEIGHTS)
+        for row_id, row in rows.items():
+            index.add(row_id, row, order_key(row))
+        return index
+
+    def _update_index(self, index, old_rows, new_rows, order_key):
+        """바뀐 행만 역색인 / 벡터 색인에 반영"""
+        if index is None:
+            return
+        for row_id in old_rows.keys() - new_rows.keys():
+            index.remove(row_id)
+        for row_id, row in new_rows.items():
+            if old_rows.get(row_id) != row:
+                index.add(row_id, row, order_key(row))
+
+    def _publish(self, hotels, tours, watermark, hotel_index=None, tour_index=None, hotel_vectors=None, tour_vectors=None):
+        """새 스냅샷으로 교체 (읽는 쪽은 락 없이 이전/새 스냅샷 중 하나를 봄)"""
+        hotel_list = sorted(hotels.values(), key=self._hotel_key)
+        tour_list = sorted(tours.values(), key=self._tour_key)
+        regions = sorted(set(
+            [h['hotel_region'] for h in hotel_list if h.get('hotel_region')] +
+            [t['tour_region'] for t in tour_list if t.get('tour_region')]
+        ))
+        price_tables = {tour_id: get_price_table(tour.get('description')) for tour_id, tour in tours.items()}
+        for tour in tours.values():
+            if tour.get('description'):
+                get_description_sections(tour['description'])
+        with self._lock:
+            self._hotels = hotels
+            self._tours = tours
+            self._hotel_list = hotel_list
+            self._tour_list = tour_list
+            self._regions = regions
+            self._price_tables = price_tables
+            if hotel_index is not None:
+                self._hotel_index = hotel_index
+            if tour_index is not None:
+                self._tour_index = tour_index
+            if hotel_vectors is not None:
+                self._hotel_vectors = hotel_vectors
+            if tour_vectors is not None:
+                self._tour_vectors = tour_vectors
+            self._watermark = watermark
+            self._ready = True
+            self.version += 1
+            self.last_refresh = time.time()
+
+    def load(self):
+        """활성 호텔/투어 전체 적재"""
+        hotel_rows = self.fetch_hotels(None)
+        tour_rows = self.fetch_tours(None)
+        hotels = {row['id']: row for row in hotel_rows}
+        tours = {row['id']: row for row in tour_rows}
+        watermark = self._max_updated_at(hotel_rows, self._max_updated_at(tour_rows, None))
+        hotel_vectors = tour_vectors = None
+        if VECTOR_SEARCH:
+            hotel_vectors = self._build_index(HOTEL_FIELDS, hotels, self._hotel_key, VectorIndex)
+            tour_vectors = self._build_index(TOUR_FIELDS, tours, self._tour_key, VectorIndex)
+        self._publish(hotels, tours, watermark,
+                      self._build_index(HOTEL_FIELDS, hotels, self._hotel_key),
+                      self._build_index(TOUR_FIELDS, tours, self._tour_key),
+                      hotel_vectors, tour_vectors)
+        print(f"Catalog loaded: hotels {len(hotels)}, tours {len(tours)}")
+
+    def refresh(self):
+        """워터마크 이후 변경된 행만 반영"""
+        self._refresh_count += 1
+        if not self._ready or self._watermark is None or self._refresh_count % self.full_reload_every == 0:
+            self.load()
+            return
+
+        since = self._watermark
+        hotel_rows = self.fetch_hotels(since)
+        tour_rows = self.fetch_tours(since)
+        if not hotel_rows and not tour_rows:
+            return
+
+        hotels = dict(self._hotels)
+        tours = dict(self._tours)
+        for rows, target in ((hotel_rows, hotels), (tour_rows, tours)):
+            for row in rows:
+                if row.get('is_active', True):
+                    target[row['id']] = row
+                else:
+                    target.pop(row['id'], None)
+
+        # >= 비교로 같은 시각의 행을 다시 받더라도 id 기준으로 덮어쓰므로 문제 없음
+        if hotels == self._hotels and tours == self._tours:
+            return
+
+        self._update_index(self._hotel_index, self._hotels, hotels, self._hotel_key)
+        self._update_index(self._tour_index, self._tours, tours, self._tour_key)
+        self._update_index(self._hotel_vectors, self._hotels, hotels, self._hotel_key)
+        self._update_index(self._tour_vectors, self._tours, tours, self._tour_key)
+
+        watermark = self._max_updated_at(hotel_rows, self._max_updated_at(tour_rows, since))
+        self._publish(hotels, tours, watermark)
+        print(f"Catalog refreshed: {len(hotel_rows)} hotel rows, {len(tour_rows)} tour rows changed")
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Catalog refresh error: {e}")
+
+    def start(self):
+        """최초 적재 후 백그라운드 갱신 시작 (적재 실패 시 갱신 스레드가 재시도)"""
+        try:
+            self.load()
+        except Exception as e:
+            print(f"Catalog load error: {e}")
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='catalog-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_ready(self):
+        return self._ready
+
+    # ========== 조회 ==========
+    def all_hotels(self):
+        return list(self._hotel_list)
+
+    def all_tours(self):
+        return list(self._tour_list)
+
+    def get_regions(self):
+        return list(self._regions)
+
+    def price_table(self, tour):
+        """투어 가격표 (적재 시 파싱한 값, 스냅샷에 없는 행이면 바로 파싱)"""
+        if tour.get('id') in self._price_tables:
+            return self._price_tables[tour['id']]
+        return get_price_table(tour.get('description'))
+
+    def _search(self, index, vectors, rows_by_id, rows, query_terms):
+        """역색인 검색 (BM25 점수순) + 벡터 유사도 순위를 합친 상위 limit 개"""
+        if not query_terms or (len(query_terms) == 1 and query_terms[0] == ''):
+            return rows[:self.limit]
+        ranked = [row_id for row_id, _ in index.search(query_terms, self.limit)]
+        if vectors is not None:
+            similar = vectors.search(' '.join(query_terms), self.limit, VECTOR_MIN_SCORE)
+            ranked = blend_rankings(ranked, [row_id for row_id, _ in similar], VECTOR_WEIGHT)[:self.limit]
+        return [rows_by_id[row_id] for row_id in ranked if row_id in rows_by_id]
+
+    def search_hotels(self, query_terms):
+        return self._search(self._hotel_index, self._hotel_vectors, self._hotels, self._hotel_list, query_terms)
+
+    def search_tours(self, query_terms):
+        return self._search(self._tour_index, self._tour_vectors, self._tours, self._tour_list, query_terms)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog(fetch_hotels, fetch_tours, refresh_interval=60):
+    """프로세스 전역 카탈로그 (최초 호출 시 적재 + 백그라운드 갱신 시작)"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                catalog = Catalog(fetch_hotels, fetch_tours, refresh_interval=refresh_interval)
+                catalog.start()
+                _catalog = catalog
+    return _catalog
@@ -0,0 +1,67 @@
+"""messages 테이블에서 대화 컨텍스트 복원
+
+재시작 / 배포 후 저장소에 없는 대화(cold)는 처음 접근할 때 한 번만
+최근 N 턴을 인덱스 쿼리 하나로 읽어 온다 (messages(conversation_id, created_at) 인덱스).
+읽은 턴은 TravelAI 가 대화 상태 추적(ConversationRecord.add_turn)으로 다시 재생한다.
+
+조회 결과(빈 결과 / 조회 실패 포함)는 크기 제한 캐시에 RECHECK_TTL 동안만 둔다.
+같은 턴 / 저장소 쓰기 실패로 반복되는 조회만 막고, 나중에 저장소에서 밀려난 대화는
+그 사이 쌓인 턴까지 다시 조회한다.
+"""
+from cache import TTLCache
+
+RECHECK_TTL = 30  # 같은 대화를 다시 조회하기까지 (초)
+REPLY_SENDERS = ('ai', 'admin')  # 상담 응답으로 보는 sender_type (system 등은 건너뜀)
+
+
+def turns_from_rows(rows):
+    """최신순 메시지 행 -> [(고객 메시지, 상담사 응답)] (오래된 순)
+
+    연속된 고객 메시지는 한 턴으로 합치고, 아직 응답이 없는 마지막 고객 메시지
+    (지금 처리 중인 메시지) 는 뺀다.
+    """
+    turns = []
+    pending = []
+    for row in reversed(rows):
+        text = row.get('message_text') or ''
+        sender = row.get('sender_type')
+        if sender == 'customer':
+            pending.append(text)
+        elif sender in REPLY_SENDERS and pending:
+            turns.append(('\n'.join(pending), text))
+            pending = []
+    return turns
+
+
+class ConversationHistory:
+    """cold 대화의 최근 턴 조회 (fetch_messages(conversation_id, limit) -> 최신순 행)"""
+
+    def __init__(self, fetch_messages, max_turns=10, cache_size=1024):
+        self.fetch_messages = fetch_messages
+        self.max_turns = max_turns
+        self.cache = TTLCache(max_entries=cache_size, ttl=RECHECK_TTL, name='conversation_history')
+        self.queries = 0
+        self.errors = 0
+
+    def recent_turns(self, conversation_id):
+        """최근 max_turns 턴 (기록이 없으면 빈 목록, 조회 실패도 빈 목록)"""
+        turns = self.cache.get(conversation_id)
+        if turns is not None:
+            return turns
+        self.queries += 1
+        try:
+            # 턴당 고객 / 응답 두 행 + 지금 처리 중인 고객 메시지
+            rows = self.fetch_messages(conversation_id, self.max_turns * 2 + 1)
+        except Exception as e:
+            self.errors += 1
+            print(f"Conversation history error: {e}")
+            self.cache.set(conversation_id, [])
+            return []
+        turns = turns_from_rows(rows)[-self.max_turns:]
+        self.cache.set(conversation_id, turns)
+        return turns
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats.update({'queries': self.queries, 'errors': self.errors})
+        return stats
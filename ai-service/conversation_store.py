@@ -0,0 +1,521 @@
+"""대화 컨텍스트 저장소
+
+대화마다 최근 메시지, 대화 상태(DialogueState), 언급된 투어/호텔 id 만 담은 작은 레코드를 둔다
+(행 전체가 아니라 id 만 저장 - 설명 원문은 카탈로그에 한 벌만 있음).
+
+백엔드 (CONVERSATION_STORE):
+- memory            : 프로세스 메모리 (idle TTL + 전체 크기 상한 LRU), 워커 1개일 때
+- sqlite:///경로     : SQLite (WAL), 한 호스트의 여러 워커가 공유
+- redis://호스트:포트/db : Redis 프로토콜(RESP) 서버, 여러 호스트가 공유 (로컬 점검은 resp_stub.py)
+
+turn() 안에서는 대화 레코드를 한 번만 읽고 (이후 get 은 같은 레코드), save 한 레코드는 턴이 끝날 때 한 번 쓴다.
+비동기 처리(/chat, /chat/stream)는 turn_async() 를 써서 sqlite / redis 읽기와 쓰기를 스레드에서 실행한다
+(턴 시작 시 대화를 미리 읽어 두므로 턴 안의 get 은 이벤트 루프를 막지 않음).
+저장소에 없는 대화는 loader 가 있으면 그걸로 복원해 저장한다 (재시작 후 messages 테이블에서 - conversation_history.py).
+살아 있는 대화 수 / 읽기 / 쓰기 / 오류 수 등은 stats() 로 제공 (GET /metrics).
+"""
+import asyncio
+import contextvars
+import json
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlparse
+
+from dialogue_state import DialogueState
+
+MAX_MESSAGES = 10  # 대화별로 보관하는 최근 턴 수
+RECORD_OVERHEAD = 1024  # 레코드 / 대화 상태 객체의 대략적인 고정 크기 (바이트)
+SQLITE_PURGE_EVERY = 100  # SQLite: 저장 N 번마다 만료된 대화 삭제
+RESP_MAX_IDLE = 16  # Redis: 보관할 유휴 커넥션 수
+
+
+class ConversationRecord:
+    """대화 하나의 컨텍스트 (messages: [(고객 메시지, 상담사 응답)])"""
+
+    __slots__ = ('messages', 'state', 'last_access', 'size')
+
+    def __init__(self):
+        self.messages = []
+        self.state = DialogueState()
+        self.last_access = time.time()
+        self.size = 0
+
+    def add_turn(self, user_message, ai_response, hotels=None, tours=None, regions=()):
+        """턴 하나 반영 (메시지 보관 + 대화 상태 갱신)"""
+        self.messages.append((user_message, ai_response))
+        if len(self.messages) > MAX_MESSAGES:
+            del self.messages[:-MAX_MESSAGES]
+        self.state.update(user_message, ai_response, hotels, tours, regions)
+
+    def estimate_size(self):
+        return RECORD_OVERHEAD + sum(sys.getsizeof(user) + sys.getsizeof(ai) for user, ai in self.messages)
+
+    def to_json(self):
+        return json.dumps({
+            'messages': self.messages,
+            'state': self.state.to_dict(),
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        record = cls()
+        record.messages = [tuple(message) for message in data.get('messages', [])]
+        record.state = DialogueState.from_dict(data.get('state') or {})
+        record.size = len(text)
+        return record
+
+
+class _Turn:
+    """한 턴 동안 읽은 레코드와 턴 끝에 쓸 대화 id"""
+
+    __slots__ = ('records', 'dirty')
+
+    def __init__(self):
+        self.records = {}
+        self.dirty = set()
+
+
+class ConversationStore:
+    """대화 저장소 인터페이스 (백엔드는 load / store / delete / backend_stats 구현)
+
+    백엔드 오류는 로그만 남기고 빈 대화로 취급한다 (대화 맥락이 없어도 응답은 계속).
+    """
+
+    backend = 'base'
+    blocking = True  # load / store 가 파일 / 네트워크 I/O 라 비동기 턴에서는 스레드에서 실행
+
+    def __init__(self, ttl=3600, name='conversations'):
+        self.ttl = ttl
+        self.name = name
+        self._turn = contextvars.ContextVar(f'{name}_turn', default=None)
+        self.loader = None  # 저장소에 없는 대화 복원 (conversation_id -> ConversationRecord 또는 None)
+        self.reads = 0
+        self.writes = 0
+        self.errors = 0
+        self.rehydrated = 0
+
+    # ========== 백엔드 ==========
+    def load(self, conversation_id):
+        raise NotImplementedError
+
+    def store(self, conversation_id, record):
+        raise NotImplementedError
+
+    def delete(self, conversation_id):
+        raise NotImplementedError
+
+    def backend_stats(self):
+        return {}
+
+    # ========== 공통 ==========
+    @contextmanager
+    def turn(self):
+        """메시지 한 턴 범위: 이 안에서 같은 대화는 한 번만 읽고, save 한 레코드는 끝날 때 씀"""
+        previous = self._turn.get()
+        state = _Turn()
+        self._turn.set(state)
+        try:
+            yield
+        finally:
+            self._turn.set(previous)
+            self._write_dirty(state)
+
+    @asynccontextmanager
+    async def turn_async(self, conversation_id=None):
+        """turn() 비동기 버전: 시작할 때 conversation_id 를 미리 읽고, 끝날 때 쓰기 (I/O 는 스레드에서)"""
+        previous = self._turn.get()
+        state = _Turn()
+        self._turn.set(state)
+        try:
+            if conversation_id is not None:
+                await self.get_async(conversation_id)
+            yield
+        finally:
+            self._turn.set(previous)
+            if state.dirty:
+                if self.blocking:
+                    await asyncio.to_thread(self._write_dirty, state)
+                else:
+                    self._write_dirty(state)
+
+    def __contains__(self, conversation_id):
+        return self.get(conversation_id) is not None
+
+    def _read(self, conversation_id):
+        self.reads += 1
+        try:
+            return self.load(conversation_id)
+        except Exception as e:
+            self.errors += 1
+            print(f"Conversation store read error ({self.backend}): {e}")
+            return None
+
+    def get(self, conversation_id):
+        """대화 레코드 (없거나 만료됐으면 None)"""
+        if conversation_id is None:
+            return None
+        state = self._turn.get()
+        if state is not None and conversation_id in state.records:
+            return state.records[conversation_id]
+        record = self._read(conversation_id)
+        if record is None and self.loader is not None:
+            record = self.rehydrate(conversation_id)
+        if state is not None:
+            state.records[conversation_id] = record
+        return record
+
+    async def get_async(self, conversation_id):
+        """get 비동기 버전 (블로킹 백엔드는 스레드에서 읽음)"""
+        if conversation_id is None:
+            return None
+        state = self._turn.get()
+        if state is not None and conversation_id in state.records:
+            return state.records[conversation_id]
+        if self.blocking:
+            # to_thread 는 현재 컨텍스트를 복사하므로 같은 턴 레코드에 기록됨
+            return await asyncio.to_thread(self.get, conversation_id)
+        record = self._read(conversation_id)
+        if record is None and self.loader is not None:
+            # 복원은 DB 조회라 메모리 저장소여도 스레드에서
+            record = await asyncio.to_thread(self.rehydrate, conversation_id)
+        if state is not None:
+            state.records[conversation_id] = record
+        return record
+
+    def rehydrate(self, conversation_id):
+        """loader 로 대화 복원 후 저장 (복원할 내용이 없으면 None)"""
+        try:
+            record = self.loader(conversation_id)
+        except Exception as e:
+            self.errors += 1
+            print(f"Conversation rehydrate error: {e}")
+            return None
+        if record is not None:
+            self.rehydrated += 1
+            self.save(conversation_id, record)
+        return record
+
+    def save(self, conversation_id, record):
+        """턴이 끝난 레코드 저장 (턴 안이면 턴이 끝날 때 씀)"""
+        state = self._turn.get()
+        if state is not None:
+            state.records[conversation_id] = record
+            state.dirty.add(conversation_id)
+            return
+        self._write(conversation_id, record)
+
+    def _write(self, conversation_id, record):
+        self.writes += 1
+        try:
+            self.store(conversation_id, record)
+        except Exception as e:
+            self.errors += 1
+            print(f"Conversation store write error ({self.backend}): {e}")
+
+    def _write_dirty(self, state):
+        for conversation_id in state.dirty:
+            record = state.records.get(conversation_id)
+            if record is not None:
+                self._write(conversation_id, record)
+        state.dirty.clear()
+
+    def pop(self, conversation_id):
+        record = self.get(conversation_id)
+        state = self._turn.get()
+        if state is not None:
+            state.records.pop(conversation_id, None)
+            state.dirty.discard(conversation_id)
+        try:
+            self.delete(conversation_id)
+        except Exception as e:
+            self.errors += 1
+            print(f"Conversation store delete error ({self.backend}): {e}")
+        return record
+
+    def stats(self):
+        stats = {'name': self.name, 'backend': self.backend, 'ttl': self.ttl,
+                 'reads': self.reads, 'writes': self.writes, 'errors': self.errors,
+                 'rehydrated': self.rehydrated}
+        try:
+            stats.update(self.backend_stats())
+        except Exception as e:
+            stats['error'] = str(e)
+        return stats
+
+
+class MemoryConversationStore(ConversationStore):
+    """프로세스 메모리 저장소 (idle TTL + 전체 메모리 상한 LRU)"""
+
+    backend = 'memory'
+    blocking = False
+
+    def __init__(self, ttl=3600, max_bytes=32 * 1024 * 1024, name='conversations'):
+        super().__init__(ttl, name)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._records = OrderedDict()  # conversation_id -> ConversationRecord (오래 안 쓴 순)
+        self._bytes = 0
+
+        self.expirations = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def _remove(self, conversation_id):
+        record = self._records.pop(conversation_id)
+        self._bytes -= record.size
+
+    def _expire(self, now):
+        # 앞쪽이 가장 오래 안 쓴 대화이므로 만료되지 않은 대화를 만나면 중단
+        while self._records:
+            conversation_id, record = next(iter(self._records.items()))
+            if record.last_access + self.ttl > now:
+                break
+            self._remove(conversation_id)
+            self.expirations += 1
+
+    def load(self, conversation_id):
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            record = self._records.get(conversation_id)
+            if record is None:
+                return None
+            record.last_access = now
+            self._records.move_to_end(conversation_id)
+            return record
+
+    def store(self, conversation_id, record):
+        """크기 다시 계산, 상한을 넘으면 LRU 제거"""
+        with self._lock:
+            now = time.time()
+            if conversation_id in self._records:
+                self._remove(conversation_id)
+            record.last_access = now
+            record.size = record.estimate_size()
+            self._records[conversation_id] = record
+            self._bytes += record.size
+            self._expire(now)
+            while len(self._records) > 1 and self.max_bytes and self._bytes > self.max_bytes:
+                self._remove(next(iter(self._records)))
+                self.evictions += 1
+
+    def delete(self, conversation_id):
+        with self._lock:
+            if conversation_id in self._records:
+                self._remove(conversation_id)
+
+    def backend_stats(self):
+        with self._lock:
+            self._expire(time.time())
+            return {
+                'conversations': len(self._records),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'expirations': self.expirations,
+                'evictions': self.evictions,
+            }
+
+
+class SQLiteConversationStore(ConversationStore):
+    """SQLite(WAL) 저장소 - 같은 호스트의 여러 워커 프로세스가 한 파일을 공유"""
+
+    backend = 'sqlite'
+
+    def __init__(self, path, ttl=3600, name='conversations'):
+        super().__init__(ttl, name)
+        self.path = path
+        self._local = threading.local()  # sqlite3 커넥션은 스레드별로
+        self._saves = 0
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # isolation_level=None: 문장마다 자동 커밋 (턴당 쓰기 1번)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def load(self, conversation_id):
+        row = self._connect().execute(
+            "SELECT data FROM conversations WHERE id = ? AND updated_at > ?",
+            (str(conversation_id), time.time() - self.ttl)
+        ).fetchone()
+        return ConversationRecord.from_json(row[0]) if row else None
+
+    def store(self, conversation_id, record):
+        now = time.time()
+        connection = self._connect()
+        connection.execute(
+            "INSERT OR REPLACE INTO conversations (id, data, updated_at) VALUES (?, ?, ?)",
+            (str(conversation_id), record.to_json(), now)
+        )
+        self._saves += 1
+        if self._saves % SQLITE_PURGE_EVERY == 0:
+            connection.execute("DELETE FROM conversations WHERE updated_at <= ?", (now - self.ttl,))
+
+    def delete(self, conversation_id):
+        self._connect().execute("DELETE FROM conversations WHERE id = ?", (str(conversation_id),))
+
+    def backend_stats(self):
+        count, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM conversations WHERE updated_at > ?",
+            (time.time() - self.ttl,)
+        ).fetchone()
+        return {'conversations': count, 'bytes': size, 'path': self.path}
+
+
+class RespError(Exception):
+    pass
+
+
+class RespConnection:
+    """RESP2 커넥션 하나"""
+
+    def __init__(self, host, port, timeout):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+
+    def close(self):
+        try:
+            self.reader.close()
+        finally:
+            self.sock.close()
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("connection closed")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b'+':
+            return payload.decode('utf-8')
+        if prefix == b'-':
+            raise RespError(payload.decode('utf-8'))
+        if prefix == b':':
+            return int(payload)
+        if prefix == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if prefix == b'*':
+            length = int(payload)
+            return None if length < 0 else [self.read_reply() for _ in range(length)]
+        raise RespError(f"unexpected reply: {line!r}")
+
+    def call(self, *args):
+        parts = [f'*{len(args)}\r\n'.encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        self.sock.sendall(b''.join(parts))
+        return self.read_reply()
+
+
+class RespClient:
+    """최소 Redis 프로토콜(RESP2) 클라이언트
+
+    명령마다 유휴 커넥션을 빌려 쓰고 돌려놓는다 (동시 요청은 각자 커넥션 사용, 유휴는 max_idle 개까지 보관).
+    오류가 난 커넥션은 닫고 버린다.
+    """
+
+    def __init__(self, host='127.0.0.1', port=6379, db=0, password=None, timeout=2.0, max_idle=RESP_MAX_IDLE):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def _open(self):
+        connection = RespConnection(self.host, self.port, self.timeout)
+        try:
+            if self.password:
+                connection.call('AUTH', self.password)
+            if self.db:
+                connection.call('SELECT', self.db)
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def execute(self, *args):
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._open()
+        try:
+            reply = connection.call(*args)
+        except (OSError, ConnectionError):
+            connection.close()
+            raise
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(connection)
+                connection = None
+        if connection is not None:
+            connection.close()
+        return reply
+
+
+class RedisConversationStore(ConversationStore):
+    """Redis 프로토콜 저장소 - 여러 호스트의 워커가 공유 (키: prefix + 대화 id, 턴마다 TTL 갱신)"""
+
+    backend = 'redis'
+
+    def __init__(self, url, ttl=3600, prefix='conversation:', name='conversations'):
+        super().__init__(ttl, name)
+        parsed = urlparse(url)
+        db = parsed.path.strip('/')
+        self.prefix = prefix
+        self.client = RespClient(parsed.hostname or '127.0.0.1', parsed.port or 6379,
+                                 int(db) if db else 0, parsed.password)
+
+    def load(self, conversation_id):
+        data = self.client.execute('GET', f'{self.prefix}{conversation_id}')
+        return ConversationRecord.from_json(data.decode('utf-8')) if data is not None else None
+
+    def store(self, conversation_id, record):
+        self.client.execute('SET', f'{self.prefix}{conversation_id}', record.to_json(), 'EX', int(self.ttl))
+
+    def delete(self, conversation_id):
+        self.client.execute('DEL', f'{self.prefix}{conversation_id}')
+
+    def backend_stats(self):
+        # 같은 db 를 다른 용도로 쓰면 그 키도 포함됨
+        return {'keys': self.client.execute('DBSIZE'), 'server': f'{self.client.host}:{self.client.port}/{self.client.db}'}
+
+
+def create_conversation_store(url='memory', ttl=3600, max_bytes=32 * 1024 * 1024):
+    """CONVERSATION_STORE 값 -> 저장소 (memory / sqlite:///경로 / redis://호스트:포트/db)"""
+    if not url or url == 'memory':
+        return MemoryConversationStore(ttl, max_bytes)
+    if url.startswith('sqlite:///'):
+        return SQLiteConversationStore(url[len('sqlite:///'):], ttl)
+    if url.startswith('redis://'):
+        return RedisConversationStore(url, ttl)
+    raise ValueError(f"unsupported conversation store: {url}")
@@ -1,196 +1,298 @@
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import RealDictCursor
 import os
+import re
 import hashlib
-import time
+import threading
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from db_pool import ConnectionPool
+from cache import TTLCache
+from search_cache import SearchCache
 
 load_dotenv()
 
-# 데이터베이스 캐시 (메모리)
-DB_CACHE = {}
+# 데이터베이스 캐시 (메모리, LRU + TTL)
 CACHE_EXPIRY = 300  # 5분
+CACHE_STALE_TTL = int(os.getenv('DB_CACHE_STALE_TTL', '3600'))  # 만료 후 stale 값을 쓸 수 있는 시간 (초)
+NEGATIVE_CACHE_TTL = int(os.getenv('DB_CACHE_NEGATIVE_TTL', '30'))  # 빈 결과 캐시 시간 (초)
+DB_CACHE = TTLCache(
+    max_entries=int(os.getenv('DB_CACHE_MAX_ENTRIES', '200')),
+    ttl=CACHE_EXPIRY,
+    stale_ttl=CACHE_STALE_TTL,
+    max_bytes=int(os.getenv('DB_CACHE_MAX_BYTES', str(8 * 1024 * 1024))),
+    name='db'
+)
+SEARCH_CACHE = SearchCache(DB_CACHE, negative_ttl=NEGATIVE_CACHE_TTL)
 
-def get_db_connection():
-    return psycopg2.connect(
+# 커넥션 풀 설정
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))  # 커넥션 대기 (초)
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))  # 접속 (초)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '5000'))  # 쿼리 (ms)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# 검색 인덱스 마이그레이션(database/search_indexes.sql)이 적용되지 않은 DB 는 기존 LIKE 검색 사용
+_ranked_search_supported = True
+
+HOTEL_COLUMNS = """hotel_name, hotel_region, adult_price, child_price,
+               TO_CHAR(promotion_start, 'YYYY-MM-DD') as promotion_start,
+               TO_CHAR(promotion_end, 'YYYY-MM-DD') as promotion_end,
+               is_unlimited, child_criteria, description"""
+TOUR_COLUMNS = "tour_name, tour_region, description, duration"
+
+def get_connect_kwargs():
+    """psycopg2 접속 파라미터"""
+    return dict(
         host=os.getenv('DB_HOST', 'localhost'),
         port=os.getenv('DB_PORT', '5432'),
         database=os.getenv('DB_NAME', 'chat_consulting'),
         user=os.getenv('DB_USER', 'postgres'),
         password=os.getenv('DB_PASS', 'admin123'),
-        cursor_factory=RealDictCursor
+        cursor_factory=RealDictCursor,
+        connect_timeout=DB_CONNECT_TIMEOUT,
+        options=f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
     )
 
-def get_cache_key(table_name, query_terms):
-    """캐시 키 생성"""
-    comma = ","
-    key_data = f"{table_name}:{comma.join(sorted(query_terms))}"
-    return hashlib.md5(key_data.encode('utf-8')).hexdigest()
+def get_db_connection():
+    """풀을 거치지 않는 단독 커넥션 (점검 스크립트용)"""
+    return psycopg2.connect(**get_connect_kwargs())
 
-def is_cache_valid(timestamp):
-    """캐시 유효성 확인"""
-    return time.time() - timestamp < CACHE_EXPIRY
+def get_pool():
+    """프로세스 전역 커넥션 풀 (최초 사용 시 생성)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_connect_kwargs(),
+                    max_size=DB_POOL_SIZE,
+                    wait_timeout=DB_POOL_TIMEOUT
+                )
+    return _pool
 
-def search_hotels(query_terms):
-    """호텔 데이터에서 검색 (캐시 적용)"""
-    # 캐시 확인
-    cache_key = get_cache_key('hotels', query_terms)
-    if cache_key in DB_CACHE and is_cache_valid(DB_CACHE[cache_key]['timestamp']):
+@contextmanager
+def db_cursor():
+    """풀에서 커넥션을 빌려 커서를 제공하고, 블록이 끝나면 반환"""
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
         try:
-            print(f"Using cached hotel results for: {', '.join(query_terms[:2])}")
-        except UnicodeEncodeError:
-            print("Using cached hotel results")
-        return DB_CACHE[cache_key]['data']
+            yield cursor
+        finally:
+            cursor.close()
 
-    # 빈 검색어 처리 - 모든 호텔 반환
-    if not query_terms or (len(query_terms) == 1 and query_terms[0] == ''):
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-
-            search_sql = """
-                SELECT hotel_name, hotel_region, adult_price, child_price,
-                       TO_CHAR(promotion_start, 'YYYY-MM-DD') as promotion_start,
-                       TO_CHAR(promotion_end, 'YYYY-MM-DD') as promotion_end,
-                       is_unlimited, child_criteria, description
-                FROM hotels
-                WHERE is_active = true
-                ORDER BY hotel_region, hotel_name
-                LIMIT 10
-            """
+def get_pool_stats():
+    """커넥션 풀 지표"""
+    if _pool is None:
+        return {'max_size': DB_POOL_SIZE, 'size': 0, 'in_use': 0, 'idle': 0}
+    return _pool.stats()
+
+def fetch_hotels(since=None):
+    """카탈로그 적재용 호텔 조회 (since 가 있으면 그 이후 변경분, 비활성 포함)"""
+    search_sql = """
+        SELECT id, hotel_name, hotel_region, adult_price, child_price,
+               TO_CHAR(promotion_start, 'YYYY-MM-DD') as promotion_start,
+               TO_CHAR(promotion_end, 'YYYY-MM-DD') as promotion_end,
+               is_unlimited, child_criteria, description, is_active, updated_at
+        FROM hotels
+    """
+    with db_cursor() as cursor:
+        if since is None:
+            cursor.execute(search_sql + " WHERE is_active = true")
+        else:
+            cursor.execute(search_sql + " WHERE updated_at >= %s", (since,))
+        return [dict(row) for row in cursor.fetchall()]
+
+def fetch_tours(since=None):
+    """카탈로그 적재용 투어 조회 (since 가 있으면 그 이후 변경분, 비활성 포함)"""
+    search_sql = """
+        SELECT id, tour_name, tour_region, description, duration, is_active, updated_at
+        FROM tours
+    """
+    with db_cursor() as cursor:
+        if since is None:
+            cursor.execute(search_sql + " WHERE is_active = true")
+        else:
+            cursor.execute(search_sql + " WHERE updated_at >= %s", (since,))
+        return [dict(row) for row in cursor.fetchall()]
+
+def fetch_recent_messages(conversation_id, limit):
+    """대화의 최근 메시지 limit 개 (최신순, idx_messages_conversation_created 인덱스 사용)"""
+    search_sql = """
+        SELECT sender_type, message_text
+        FROM messages
+        WHERE conversation_id = %s
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s
+    """
+    with db_cursor() as cursor:
+        cursor.execute(search_sql, (conversation_id, limit))
+        return [dict(row) for row in cursor.fetchall()]
+
+def build_ranked_search(table, columns, order_by, query_terms, limit=10):
+    """search_text / search_tsv 인덱스를 타는 검색 쿼리와 파라미터 생성
+
+    - 3글자 이상 검색어: search_text LIKE '%검색어%' (GIN 트라이그램 인덱스)
+    - 2글자 이하 검색어: strpos(search_text, 검색어) > 0 (기존 LIKE 와 같은 부분 문자열 매칭 -
+      '베스트호텔' 안의 '호텔'도 찾음. 트라이그램이 없어 활성 행을 직접 확인하지만 카탈로그 크기라 작음)
+    - 점수: 검색어와 텍스트의 word_similarity / ts_rank(단어 접두어 매칭 가산) 중 큰 값
+    """
+    # 검색어 순서와 관계없이 같은 쿼리 (캐시 키와 같은 기준)
+    terms = sorted(set(t.lower().strip() for t in query_terms if t and t.strip()))
+    conditions = []
+    params = {'query': ' '.join(terms)}
+
+    for i, term in enumerate(t for t in terms if len(t) >= 3):
+        conditions.append(f"search_text LIKE %(like_{i})s")
+        params[f'like_{i}'] = f'%{term}%'
+
+    prefix_terms = []
+    for i, term in enumerate(t for t in terms if len(t) < 3):
+        conditions.append(f"strpos(search_text, %(short_{i})s) > 0")
+        params[f'short_{i}'] = term
+        prefix_terms.extend(f"{word}:*" for word in re.findall(r'[가-힣a-z0-9]+', term))
+
+    score = "word_similarity(%(query)s, search_text)"
+    if prefix_terms:
+        params['tsquery'] = ' | '.join(dict.fromkeys(prefix_terms))
+        score = f"GREATEST({score}, ts_rank(search_tsv, to_tsquery('simple', %(tsquery)s)))"
+
+    if not conditions:
+        return None, None
+
+    search_sql = f"""
+        SELECT {columns}, {score} AS score
+        FROM {table}
+        WHERE is_active = true
+        AND ({' OR '.join(conditions)})
+        ORDER BY score DESC, {order_by}
+        LIMIT {int(limit)}
+    """
+    return search_sql, params
+
+def run_ranked_search(table, columns, order_by, query_terms):
+    """인덱스 검색 실행. 마이그레이션 미적용이면 None 을 반환해 기존 검색으로 넘김"""
+    global _ranked_search_supported
+    if not _ranked_search_supported:
+        return None
+
+    search_sql, params = build_ranked_search(table, columns, order_by, query_terms)
+    if search_sql is None:
+        return []
 
-            cursor.execute(search_sql)
-            results = [dict(row) for row in cursor.fetchall()]
-            cursor.close()
-            conn.close()
-
-            # 캐시 저장
-            DB_CACHE[cache_key] = {
-                'data': results,
-                'timestamp': time.time()
-            }
-
-            return results
-        except Exception as e:
-            print(f"Hotel search error: {e}")
-            return []
-    
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 최적화된 검색 쿼리 (LIMIT 추가)
+        with db_cursor() as cursor:
+            cursor.execute(search_sql, params)
+            return [dict(row) for row in cursor.fetchall()]
+    except (psycopg2.errors.UndefinedColumn, psycopg2.errors.UndefinedFunction) as e:
+        print(f"Search indexes not installed, falling back to LIKE search: {e}")
+        _ranked_search_supported = False
+        return None
+
+def get_cache_key(table_name, query_terms):
+    """캐시 키 생성 (실제로 조회하는 검색어 그대로 - 동의어끼리 키를 합치면 먼저 조회한 검색어 결과가 나감)"""
+    key_data = f"{table_name}:{','.join(sorted(set(term.lower().strip() for term in query_terms)))}"
+    return hashlib.md5(key_data.encode('utf-8')).hexdigest()
+
+def query_hotels(query_terms):
+    """호텔 DB 조회 (캐시 없음, 오류는 호출자에게 전달)"""
+    # 빈 검색어 처리 - 모든 호텔 반환
+    if not query_terms or (len(query_terms) == 1 and query_terms[0] == ''):
         search_sql = """
-            SELECT hotel_name, hotel_region, adult_price, child_price, 
+            SELECT hotel_name, hotel_region, adult_price, child_price,
                    TO_CHAR(promotion_start, 'YYYY-MM-DD') as promotion_start,
                    TO_CHAR(promotion_end, 'YYYY-MM-DD') as promotion_end,
                    is_unlimited, child_criteria, description
-            FROM hotels 
-            WHERE is_active = true 
-            AND (LOWER(hotel_name) LIKE ANY(%s) 
-                 OR LOWER(hotel_region) LIKE ANY(%s)
-                 OR LOWER(description) LIKE ANY(%s))
+            FROM hotels
+            WHERE is_active = true
             ORDER BY hotel_region, hotel_name
             LIMIT 10
         """
-        
-        search_patterns = [f'%{term.lower()}%' for term in query_terms]
-        cursor.execute(search_sql, (search_patterns, search_patterns, search_patterns))
-        
-        results = [dict(row) for row in cursor.fetchall()]
-        cursor.close()
-        conn.close()
-        
-        # 캐시 저장
-        DB_CACHE[cache_key] = {
-            'data': results,
-            'timestamp': time.time()
-        }
-        
-        # 캐시 크기 제한 (최대 50개)
-        if len(DB_CACHE) > 50:
-            oldest_keys = sorted(DB_CACHE.keys(), key=lambda k: DB_CACHE[k]['timestamp'])[:10]
-            for key in oldest_keys:
-                del DB_CACHE[key]
-        
+
+        with db_cursor() as cursor:
+            cursor.execute(search_sql)
+            return [dict(row) for row in cursor.fetchall()]
+
+    # 검색 인덱스(트라이그램/tsvector) 기반 관련도 순 검색
+    results = run_ranked_search('hotels', HOTEL_COLUMNS, 'hotel_region, hotel_name', query_terms)
+    if results is not None:
         return results
-        
-    except Exception as e:
-        print(f"Hotel search error: {e}")
-        return []
 
-def search_tours(query_terms):
-    """투어 데이터에서 검색 (캐시 적용)"""
-    # 캐시 확인
-    cache_key = get_cache_key('tours', query_terms)
-    if cache_key in DB_CACHE and is_cache_valid(DB_CACHE[cache_key]['timestamp']):
-        try:
-            print(f"Using cached tour results for: {', '.join(query_terms[:2])}")
-        except UnicodeEncodeError:
-            print("Using cached tour results")
-        return DB_CACHE[cache_key]['data']
-    
-    # 빈 검색어 처리 - 모든 투어 반환
-    if not query_terms or (len(query_terms) == 1 and query_terms[0] == ''):
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
+    search_sql = """
+        SELECT hotel_name, hotel_region, adult_price, child_price,
+               TO_CHAR(promotion_start, 'YYYY-MM-DD') as promotion_start,
+               TO_CHAR(promotion_end, 'YYYY-MM-DD') as promotion_end,
+               is_unlimited, child_criteria, description
+        FROM hotels
+        WHERE is_active = true
+        AND (LOWER(hotel_name) LIKE ANY(%s)
+             OR LOWER(hotel_region) LIKE ANY(%s)
+             OR LOWER(description) LIKE ANY(%s))
+        ORDER BY hotel_region, hotel_name
+        LIMIT 10
+    """
 
-            search_sql = """
-                SELECT tour_name, tour_region, description, duration
-                FROM tours
-                WHERE is_active = true
-                ORDER BY tour_region, tour_name
-                LIMIT 10
-            """
+    search_patterns = [f'%{term.lower()}%' for term in query_terms]
+    with db_cursor() as cursor:
+        cursor.execute(search_sql, (search_patterns, search_patterns, search_patterns))
+        return [dict(row) for row in cursor.fetchall()]
 
-            cursor.execute(search_sql)
-            results = [dict(row) for row in cursor.fetchall()]
-            cursor.close()
-            conn.close()
-
-            # 캐시 저장
-            DB_CACHE[cache_key] = {
-                'data': results,
-                'timestamp': time.time()
-            }
-
-            return results
-        except Exception as e:
-            print(f"Tour search error: {e}")
-            return []
-    
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 최적화된 검색 쿼리 (LIMIT 추가)
+def query_tours(query_terms):
+    """투어 DB 조회 (캐시 없음, 오류는 호출자에게 전달)"""
+    # 빈 검색어 처리 - 모든 투어 반환
+    if not query_terms or (len(query_terms) == 1 and query_terms[0] == ''):
         search_sql = """
             SELECT tour_name, tour_region, description, duration
             FROM tours
             WHERE is_active = true
-            AND (LOWER(tour_name) LIKE ANY(%s)
-                 OR LOWER(tour_region) LIKE ANY(%s)
-                 OR LOWER(description) LIKE ANY(%s))
             ORDER BY tour_region, tour_name
             LIMIT 10
         """
 
-        search_patterns = [f'%{term.lower()}%' for term in query_terms]
-        cursor.execute(search_sql, (search_patterns, search_patterns, search_patterns))
-        
-        results = [dict(row) for row in cursor.fetchall()]
-        cursor.close()
-        conn.close()
-        
-        # 캐시 저장
-        DB_CACHE[cache_key] = {
-            'data': results,
-            'timestamp': time.time()
-        }
-        
+        with db_cursor() as cursor:
+            cursor.execute(search_sql)
+            return [dict(row) for row in cursor.fetchall()]
+
+    # 검색 인덱스(트라이그램/tsvector) 기반 관련도 순 검색
+    results = run_ranked_search('tours', TOUR_COLUMNS, 'tour_region, tour_name', query_terms)
+    if results is not None:
         return results
-        
+
+    search_sql = """
+        SELECT tour_name, tour_region, description, duration
+        FROM tours
+        WHERE is_active = true
+        AND (LOWER(tour_name) LIKE ANY(%s)
+             OR LOWER(tour_region) LIKE ANY(%s)
+             OR LOWER(description) LIKE ANY(%s))
+        ORDER BY tour_region, tour_name
+        LIMIT 10
+    """
+
+    search_patterns = [f'%{term.lower()}%' for term in query_terms]
+    with db_cursor() as cursor:
+        cursor.execute(search_sql, (search_patterns, search_patterns, search_patterns))
+        return [dict(row) for row in cursor.fetchall()]
+
+def search_hotels(query_terms):
+    """호텔 데이터에서 검색 (캐시 + 동시 미스 합치기 + stale 응답)"""
+    cache_key = get_cache_key('hotels', query_terms)
+    try:
+        return SEARCH_CACHE.get_or_load(cache_key, lambda: query_hotels(query_terms),
+                                        f"hotel results for: {', '.join(query_terms[:2])}")
+    except Exception as e:
+        print(f"Hotel search error: {e}")
+        return []
+
+def search_tours(query_terms):
+    """투어 데이터에서 검색 (캐시 + 동시 미스 합치기 + stale 응답)"""
+    cache_key = get_cache_key('tours', query_terms)
+    try:
+        return SEARCH_CACHE.get_or_load(cache_key, lambda: query_tours(query_terms),
+                                        f"tour results for: {', '.join(query_terms[:2])}")
     except Exception as e:
         print(f"Tour search error: {e}")
         return []
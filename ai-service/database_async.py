@@ -0,0 +1,153 @@
+"""PostgreSQL 비동기 검색 (asyncpg)
+
+database.py 와 같은 쿼리 / 캐시(SEARCH_CACHE)를 사용하고,
+이벤트 루프를 막지 않아 호텔 / 투어 / 지역 조회를 동시에 실행할 수 있다.
+"""
+import re
+import asyncio
+import asyncpg
+from database import (
+    SEARCH_CACHE, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_CONNECT_TIMEOUT, DB_STATEMENT_TIMEOUT_MS,
+    HOTEL_COLUMNS, TOUR_COLUMNS, get_connect_kwargs, get_cache_key, build_ranked_search
+)
+
+PARAM_PATTERN = re.compile(r'%\((\w+)\)s')
+
+_pool = None
+_pool_lock = None
+
+# 검색 인덱스 마이그레이션이 없으면 기존 LIKE 검색 사용
+_ranked_search_supported = True
+
+def to_asyncpg(search_sql, params):
+    """%(name)s 형식 쿼리를 asyncpg 의 $n 형식으로 변환 -> (sql, args)"""
+    names = []
+
+    def replace(match):
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        return f'${names.index(name) + 1}'
+
+    return PARAM_PATTERN.sub(replace, search_sql), [params[name] for name in names]
+
+async def get_pool_async():
+    """프로세스 전역 asyncpg 커넥션 풀 (최초 사용 시 생성)"""
+    global _pool, _pool_lock
+    if _pool is None:
+        if _pool_lock is None:
+            _pool_lock = asyncio.Lock()
+        async with _pool_lock:
+            if _pool is None:
+                kwargs = get_connect_kwargs()
+                _pool = await asyncpg.create_pool(
+                    host=kwargs['host'],
+                    port=int(kwargs['port']),
+                    database=kwargs['database'],
+                    user=kwargs['user'],
+                    password=kwargs['password'],
+                    min_size=1,
+                    max_size=DB_POOL_SIZE,
+                    timeout=DB_CONNECT_TIMEOUT,
+                    server_settings={'statement_timeout': str(DB_STATEMENT_TIMEOUT_MS)}
+                )
+    return _pool
+
+async def close_pool_async():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+def get_pool_stats_async():
+    """asyncpg 커넥션 풀 지표"""
+    if _pool is None:
+        return {'max_size': DB_POOL_SIZE, 'size': 0, 'idle': 0}
+    return {'max_size': DB_POOL_SIZE, 'size': _pool.get_size(), 'idle': _pool.get_idle_size()}
+
+async def fetch_rows(search_sql, *args):
+    pool = await get_pool_async()
+    async with pool.acquire(timeout=DB_POOL_TIMEOUT) as conn:
+        return [dict(row) for row in await conn.fetch(search_sql, *args)]
+
+async def run_ranked_search_async(table, columns, order_by, query_terms):
+    """인덱스 검색 실행. 마이그레이션 미적용이면 None 을 반환해 기존 검색으로 넘김"""
+    global _ranked_search_supported
+    if not _ranked_search_supported:
+        return None
+
+    search_sql, params = build_ranked_search(table, columns, order_by, query_terms)
+    if search_sql is None:
+        return []
+
+    search_sql, args = to_asyncpg(search_sql, params)
+    try:
+        return await fetch_rows(search_sql, *args)
+    except (asyncpg.exceptions.UndefinedColumnError, asyncpg.exceptions.UndefinedFunctionError) as e:
+        print(f"Search indexes not installed, falling back to LIKE search: {e}")
+        _ranked_search_supported = False
+        return None
+
+async def query_table_async(table, columns, name_col, region_col, query_terms):
+    """호텔/투어 공통 조회 (캐시 없음, 오류는 호출자에게 전달)"""
+    order_by = f'{region_col}, {name_col}'
+
+    # 빈 검색어 처리 - 전체 반환
+    if not query_terms or (len(query_terms) == 1 and query_terms[0] == ''):
+        return await fetch_rows(f"""
+            SELECT {columns}
+            FROM {table}
+            WHERE is_active = true
+            ORDER BY {order_by}
+            LIMIT 10
+        """)
+
+    # 검색 인덱스(트라이그램/tsvector) 기반 관련도 순 검색
+    results = await run_ranked_search_async(table, columns, order_by, query_terms)
+    if results is not None:
+        return results
+
+    search_patterns = [f'%{term.lower()}%' for term in query_terms]
+    return await fetch_rows(f"""
+        SELECT {columns}
+        FROM {table}
+        WHERE is_active = true
+        AND (LOWER({name_col}) LIKE ANY($1::text[])
+             OR LOWER({region_col}) LIKE ANY($1::text[])
+             OR LOWER(description) LIKE ANY($1::text[]))
+        ORDER BY {order_by}
+        LIMIT 10
+    """, search_patterns)
+
+async def search_hotels_async(query_terms):
+    """호텔 데이터에서 검색 (database.search_hotels 와 같은 캐시 사용)"""
+    cache_key = get_cache_key('hotels', query_terms)
+    try:
+        return await SEARCH_CACHE.get_or_load_async(
+            cache_key,
+            lambda: query_table_async('hotels', HOTEL_COLUMNS, 'hotel_name', 'hotel_region', query_terms),
+            f"hotel results for: {', '.join(query_terms[:2])}")
+    except Exception as e:
+        print(f"Hotel search error: {e}")
+        return []
+
+async def search_tours_async(query_terms):
+    """투어 데이터에서 검색 (database.search_tours 와 같은 캐시 사용)"""
+    cache_key = get_cache_key('tours', query_terms)
+    try:
+        return await SEARCH_CACHE.get_or_load_async(
+            cache_key,
+            lambda: query_table_async('tours', TOUR_COLUMNS, 'tour_name', 'tour_region', query_terms),
+            f"tour results for: {', '.join(query_terms[:2])}")
+    except Exception as e:
+        print(f"Tour search error: {e}")
+        return []
+
+async def get_available_regions_async():
+    """호텔/투어에서 사용 가능한 지역 (한 번의 쿼리)"""
+    rows = await fetch_rows("""
+        SELECT hotel_region AS region FROM hotels WHERE is_active = true
+        UNION
+        SELECT tour_region FROM tours WHERE is_active = true
+    """)
+    return sorted(row['region'] for row in rows)
@@ -0,0 +1,259 @@
+"""Supabase(PostgREST) 경량 클라이언트
+
+supabase SDK 대신 keep-alive HTTP 세션 하나로 PostgREST REST API 를 직접 호출한다.
+- 여러 검색어를 or=(...) 필터 하나로 묶어 한 번의 요청으로 검색
+- 카탈로그 적재처럼 큰 결과는 limit/offset 으로 페이지 단위 조회
+- POSTGREST_URL 로 로컬 PostgREST 호환 서버(postgrest_stub.py 등)를 가리킬 수 있음
+"""
+import os
+import asyncio
+import hashlib
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from cache import TTLCache
+from search_cache import SearchCache
+from search_index import rank_rows
+from catalog import HOTEL_FIELDS, TOUR_FIELDS, FIELD_WEIGHTS
+from postgrest_filters import build_or_conditions
+
+load_dotenv()
+
+# 데이터베이스 캐시 (메모리, LRU + TTL)
+CACHE_EXPIRY = 300  # 5분
+CACHE_STALE_TTL = int(os.getenv('DB_CACHE_STALE_TTL', '3600'))  # 만료 후 stale 값을 쓸 수 있는 시간 (초)
+NEGATIVE_CACHE_TTL = int(os.getenv('DB_CACHE_NEGATIVE_TTL', '30'))  # 빈 결과 캐시 시간 (초)
+DB_CACHE = TTLCache(
+    max_entries=int(os.getenv('DB_CACHE_MAX_ENTRIES', '200')),
+    ttl=CACHE_EXPIRY,
+    stale_ttl=CACHE_STALE_TTL,
+    max_bytes=int(os.getenv('DB_CACHE_MAX_BYTES', str(8 * 1024 * 1024))),
+    name='postgrest'
+)
+SEARCH_CACHE = SearchCache(DB_CACHE, negative_ttl=NEGATIVE_CACHE_TTL)
+
+# PostgREST 접속 설정
+SUPABASE_URL = os.getenv('SUPABASE_URL', 'https://svztqkkmiskjfrflxyoi.supabase.co')
+SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+if not SUPABASE_KEY:
+    raise RuntimeError("SUPABASE_KEY is not set (USE_SUPABASE=true requires the PostgREST API key)")
+POSTGREST_URL = os.getenv('POSTGREST_URL', f"{SUPABASE_URL.rstrip('/')}/rest/v1")
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+HTTP_TIMEOUT = (float(os.getenv('HTTP_CONNECT_TIMEOUT', '3')), float(os.getenv('HTTP_READ_TIMEOUT', '10')))
+PAGE_SIZE = 1000
+SEARCH_CANDIDATE_LIMIT = int(os.getenv('SEARCH_CANDIDATE_LIMIT', '50'))  # 랭킹 전 후보 행 수
+
+HOTEL_SELECT = 'hotel_name,hotel_region,adult_price,child_price,promotion_start,promotion_end,is_unlimited,child_criteria,description'
+TOUR_SELECT = 'tour_name,tour_region,description,duration'
+
+
+def _auth_headers():
+    return {
+        'apikey': SUPABASE_KEY,
+        'Authorization': f'Bearer {SUPABASE_KEY}',
+        'Accept': 'application/json',
+    }
+
+def _create_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=1)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(_auth_headers())
+    return session
+
+# 프로세스 전역 keep-alive 세션
+session = _create_session()
+
+# 비동기 검색용 클라이언트 (최초 사용 시 생성)
+_async_client = None
+
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            headers=_auth_headers(),
+            timeout=httpx.Timeout(HTTP_TIMEOUT[1], connect=HTTP_TIMEOUT[0]),
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+        )
+    return _async_client
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+def get_cache_key(table_name, query_terms):
+    """캐시 키 생성 (실제로 조회하는 검색어 그대로 - 동의어끼리 키를 합치면 먼저 조회한 검색어 결과가 나감)"""
+    key_data = f"{table_name}:{','.join(sorted(set(term.lower().strip() for term in query_terms)))}"
+    return hashlib.md5(key_data.encode('utf-8')).hexdigest()
+
+def get_rows(table, params):
+    """테이블 조회 한 번 (HTTP 오류는 예외로 전달)"""
+    response = session.get(f"{POSTGREST_URL}/{table}", params=params, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+async def get_rows_async(table, params):
+    response = await get_async_client().get(f"{POSTGREST_URL}/{table}", params=params)
+    response.raise_for_status()
+    return response.json()
+
+def get_all_rows(table, params, page_size=PAGE_SIZE):
+    """limit/offset 으로 끝까지 페이지 조회"""
+    rows = []
+    offset = 0
+    while True:
+        page = get_rows(table, dict(params, limit=page_size, offset=offset))
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
+def fetch_hotels(since=None):
+    """카탈로그 적재용 호텔 조회 (since 가 있으면 그 이후 변경분, 비활성 포함)"""
+    params = {'select': f'id,{HOTEL_SELECT},is_active,updated_at', 'order': 'id.asc'}
+    if since is None:
+        params['is_active'] = 'eq.true'
+    else:
+        params['updated_at'] = f'gte.{since}'
+    return get_all_rows('hotels', params)
+
+def fetch_tours(since=None):
+    """카탈로그 적재용 투어 조회 (since 가 있으면 그 이후 변경분, 비활성 포함)"""
+    params = {'select': f'id,{TOUR_SELECT},is_active,updated_at', 'order': 'id.asc'}
+    if since is None:
+        params['is_active'] = 'eq.true'
+    else:
+        params['updated_at'] = f'gte.{since}'
+    return get_all_rows('tours', params)
+
+def fetch_recent_messages(conversation_id, limit):
+    """대화의 최근 메시지 limit 개 (최신순)"""
+    return get_rows('messages', {
+        'select': 'sender_type,message_text',
+        'conversation_id': f'eq.{conversation_id}',
+        'order': 'created_at.desc,id.desc',
+        'limit': limit,
+    })
+
+def hotel_search_params(query_terms):
+    """호텔 검색 요청 파라미터 (검색어가 모두 비어 있으면 None)"""
+    params = {
+        'select': HOTEL_SELECT,
+        'is_active': 'eq.true',
+        'order': 'hotel_region.asc,hotel_name.asc',
+        'limit': 10,
+    }
+    if query_terms and not (len(query_terms) == 1 and query_terms[0] == ''):
+        conditions = build_or_conditions(HOTEL_FIELDS, query_terms)
+        if conditions is None:
+            return None
+        params['or'] = f"({conditions})"
+        params['limit'] = SEARCH_CANDIDATE_LIMIT
+    return params
+
+def rank_hotels(rows, query_terms):
+    """후보를 검색어 매칭 점수순으로 정렬해 상위 10개 (빈 검색어는 서버 순서 그대로)"""
+    if not query_terms or (len(query_terms) == 1 and query_terms[0] == ''):
+        return rows
+    return rank_rows(rows, HOTEL_FIELDS, FIELD_WEIGHTS, query_terms, k=10)
+
+def query_hotels(query_terms):
+    """호텔 조회 - 모든 검색어를 한 번의 요청으로 (캐시 없음, 오류는 호출자에게 전달)"""
+    params = hotel_search_params(query_terms)
+    if params is None:
+        return []
+    return rank_hotels(get_rows('hotels', params), query_terms)
+
+async def query_hotels_async(query_terms):
+    params = hotel_search_params(query_terms)
+    if params is None:
+        return []
+    return rank_hotels(await get_rows_async('hotels', params), query_terms)
+
+def tour_search_params(query_terms):
+    """투어 검색 요청 파라미터 (검색어가 모두 비어 있으면 None)"""
+    params = {
+        'select': TOUR_SELECT,
+        'is_active': 'eq.true',
+        'order': 'display_order.asc,tour_name.asc',
+        'limit': 10,
+    }
+    if query_terms and not (len(query_terms) == 1 and query_terms[0] == ''):
+        conditions = build_or_conditions(TOUR_FIELDS, query_terms)
+        if conditions is None:
+            return None
+        params['or'] = f"({conditions})"
+        params['limit'] = SEARCH_CANDIDATE_LIMIT
+    return params
+
+def rank_tours(rows, query_terms):
+    """후보를 검색어 매칭 점수순으로 정렬해 상위 10개 (빈 검색어는 서버 순서 그대로)"""
+    if not query_terms or (len(query_terms) == 1 and query_terms[0] == ''):
+        return rows
+    return rank_rows(rows, TOUR_FIELDS, FIELD_WEIGHTS, query_terms, k=10)
+
+def query_tours(query_terms):
+    """투어 조회 - 모든 검색어를 한 번의 요청으로 (캐시 없음, 오류는 호출자에게 전달)"""
+    params = tour_search_params(query_terms)
+    if params is None:
+        return []
+    return rank_tours(get_rows('tours', params), query_terms)
+
+async def query_tours_async(query_terms):
+    params = tour_search_params(query_terms)
+    if params is None:
+        return []
+    return rank_tours(await get_rows_async('tours', params), query_terms)
+
+def search_hotels(query_terms):
+    """호텔 데이터에서 검색 (캐시 + 동시 미스 합치기 + stale 응답)"""
+    cache_key = get_cache_key('hotels', query_terms)
+    try:
+        return SEARCH_CACHE.get_or_load(cache_key, lambda: query_hotels(query_terms),
+                                        f"hotel results for: {', '.join(query_terms[:2])}")
+    except Exception as e:
+        print(f"Hotel search error: {e}")
+        return []
+
+def search_tours(query_terms):
+    """투어 데이터에서 검색 (캐시 + 동시 미스 합치기 + stale 응답)"""
+    cache_key = get_cache_key('tours', query_terms)
+    try:
+        return SEARCH_CACHE.get_or_load(cache_key, lambda: query_tours(query_terms),
+                                        f"tour results for: {', '.join(query_terms[:2])}")
+    except Exception as e:
+        print(f"Tour search error: {e}")
+        return []
+
+async def search_hotels_async(query_terms):
+    """호텔 검색 비동기 버전 (search_hotels 와 같은 캐시 사용)"""
+    cache_key = get_cache_key('hotels', query_terms)
+    try:
+        return await SEARCH_CACHE.get_or_load_async(cache_key, lambda: query_hotels_async(query_terms),
+                                                    f"hotel results for: {', '.join(query_terms[:2])}")
+    except Exception as e:
+        print(f"Hotel search error: {e}")
+        return []
+
+async def search_tours_async(query_terms):
+    """투어 검색 비동기 버전 (search_tours 와 같은 캐시 사용)"""
+    cache_key = get_cache_key('tours', query_terms)
+    try:
+        return await SEARCH_CACHE.get_or_load_async(cache_key, lambda: query_tours_async(query_terms),
+                                                    f"tour results for: {', '.join(query_terms[:2])}")
+    except Exception as e:
+        print(f"Tour search error: {e}")
+        return []
+
+async def get_available_regions_async():
+    """호텔/투어에서 사용 가능한 지역 (두 요청 동시 실행)"""
+    hotel_rows, tour_rows = await asyncio.gather(
+        get_rows_async('hotels', {'select': 'hotel_region', 'is_active': 'eq.true'}),
+        get_rows_async('tours', {'select': 'tour_region', 'is_active': 'eq.true'})
+    )
+    regions = {row['hotel_region'] for row in hotel_rows} | {row['tour_region'] for row in tour_rows}
+    return sorted(regions)
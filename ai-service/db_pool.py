@@ -0,0 +1,175 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+
+class PoolTimeout(Exception):
+    """커넥션 대기 시간 초과"""
+
+
+class ConnectionPool:
+    """프로세스 전역 PostgreSQL 커넥션 풀 (스레드 안전)
+
+    - 최대 max_size 개의 커넥션을 유지하고, 모두 사용 중이면 wait_timeout 까지 대기
+    - 체크아웃 시 닫힌 커넥션은 버리고, 오래 쉬었던 커넥션은 SELECT 1 로 상태 확인
+    - 풀 크기 / 대기 시간 지표 제공 (stats)
+    """
+
+    def __init__(self, connect_kwargs, max_size=10, wait_timeout=5.0,
+                 health_check_interval=30.0, max_lifetime=1800.0):
+        self.connect_kwargs = connect_kwargs
+        self.max_size = max_size
+        self.wait_timeout = wait_timeout
+        self.health_check_interval = health_check_interval
+        self.max_lifetime = max_lifetime
+
+        self._lock = threading.Condition()
+        self._idle = []  # (conn, created_at, last_used)
+        self._in_use = 0
+        self._created_at = {}  # id(conn) -> 생성 시각
+        self._closed = False
+
+        # 지표
+        self._created = 0
+        self._discarded = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def _connect(self):
+        return psycopg2.connect(**self.connect_kwargs)
+
+    def _discard(self, conn):
+        self._discarded += 1
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, created_at, last_used):
+        """체크아웃 시 커넥션 상태 확인"""
+        if conn.closed:
+            return False
+        now = time.time()
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return False
+        if now - last_used < self.health_check_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        """커넥션 체크아웃 (필요 시 대기)"""
+        started = time.time()
+        waited = False
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                if self._idle:
+                    conn, created_at, last_used = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_size:
+                    self._in_use += 1
+                    conn = None
+                    break
+                remaining = self.wait_timeout - (time.time() - started)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"no database connection available within {self.wait_timeout}s")
+                waited = True
+                self._lock.wait(remaining)
+
+            waited_for = time.time() - started
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+            self._wait_time_total += waited_for
+            self._wait_time_max = max(self._wait_time_max, waited_for)
+
+        # 커넥션 생성 / 헬스 체크는 락 밖에서 수행
+        try:
+            if conn is not None and not self._is_healthy(conn, created_at, last_used):
+                with self._lock:
+                    self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+                with self._lock:
+                    self._created += 1
+                    self._created_at[id(conn)] = time.time()
+            return conn
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+    def putconn(self, conn, discard=False):
+        """커넥션 반환"""
+        if not discard and not conn.closed:
+            try:
+                # 트랜잭션이 열린 채 반환되면 정리
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._lock:
+            self._in_use -= 1
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                created_at = self._created_at.get(id(conn), time.time())
+                self._idle.append((conn, created_at, time.time()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """with 블록 동안 커넥션을 빌려주고 반환"""
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, discard=broken)
+
+    def closeall(self):
+        with self._lock:
+            self._closed = True
+            for conn, _, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+            self._lock.notify_all()
+
+    def stats(self):
+        """풀 크기 / 대기 지표"""
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'size': self._in_use + len(self._idle),
+                'created': self._created,
+                'discarded': self._discarded,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'wait_time_avg_ms': round(self._wait_time_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'wait_time_max_ms': round(self._wait_time_max * 1000, 3),
+            }
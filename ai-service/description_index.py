@@ -0,0 +1,65 @@
+"""투어 상세설명 섹션 색인
+
+설명을 줄 단위로 나눠 질문 유형(가격/일정/내용/위치/기준)별로 미리 태깅해 두고,
+요청 시에는 질문에서 찾은 유형 조합으로 추출 결과를 조회만 한다.
+유형 조합별 추출 결과(최대 500자)는 처음 조회할 때 한 번 만들어 재사용한다.
+"""
+from functools import lru_cache
+
+# 질문 유형별 키워드
+QUERY_KEYWORDS = {
+    'price': ['가격', '얼마', '비용', '요금', '돈', '금액', '값', '$', '만원', '원', '유아', '아동', '성인', '어른'],
+    'schedule': ['일정', '스케줄', '시간', '몇시', '언제', '일차', '날짜'],
+    'content': ['내용', '구성', '포함', '활동', '체험', '프로그램'],
+    'location': ['위치', '장소', '어디', '지역', '주소'],
+    'criteria': ['기준', '나이', '몇살', '연령', '조건']
+}
+QUERY_TYPES = tuple(QUERY_KEYWORDS)
+
+FALLBACK_LENGTH = 300  # 관련 줄이 없을 때 설명 앞부분 길이
+EXTRACT_LENGTH = 500  # 관련 줄 추출 최대 길이
+
+
+def detect_query_types(user_message):
+    """사용자 질문 -> 질문 유형 튜플 (QUERY_TYPES 순서)"""
+    user_msg_lower = user_message.lower()
+    return tuple(query_type for query_type in QUERY_TYPES
+                 if any(keyword in user_msg_lower for keyword in QUERY_KEYWORDS[query_type]))
+
+def truncate(text, length):
+    return text[:length] + ('...' if len(text) > length else '')
+
+
+class DescriptionSections:
+    """설명 한 개의 줄 단위 섹션 태그 + 유형 조합별 추출 결과"""
+
+    def __init__(self, description):
+        self.lines = []
+        self.line_types = []  # 줄별 질문 유형 집합
+        for line in description.split('\n'):
+            line_lower = line.lower()
+            types = frozenset(query_type for query_type in QUERY_TYPES
+                              if any(keyword in line_lower for keyword in QUERY_KEYWORDS[query_type]))
+            if types:
+                self.lines.append(line.strip())
+                self.line_types.append(types)
+        self.fallback = truncate(description, FALLBACK_LENGTH)
+        self._extracts = {}  # 질문 유형 튜플 -> 추출 결과
+
+    def extract(self, query_types):
+        """질문 유형에 해당하는 줄만 (없으면 설명 앞부분)"""
+        if not query_types:
+            return self.fallback
+        extract = self._extracts.get(query_types)
+        if extract is None:
+            wanted = set(query_types)
+            relevant_lines = [line for line, types in zip(self.lines, self.line_types) if types & wanted]
+            extract = truncate('\n'.join(relevant_lines), EXTRACT_LENGTH) if relevant_lines else self.fallback
+            self._extracts[query_types] = extract
+        return extract
+
+
+@lru_cache(maxsize=1024)
+def get_description_sections(description):
+    """설명 -> DescriptionSections (같은 설명은 한 번만 색인)"""
+    return DescriptionSections(description)
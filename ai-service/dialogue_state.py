@@ -0,0 +1,137 @@
+"""대화별 엔티티 상태 추적
+
+턴이 끝날 때(update_conversation_context) 한 번만 메시지를 훑어
+현재 투어 / 투어 종류 / 지역 / 주제와 각각이 마지막으로 나온 턴, 인원 슬롯(party_slots)을 기록한다.
+검색과 프롬프트 구성은 최근 대화 문자열을 다시 훑지 않고 이 상태를 바로 읽는다.
+"""
+from party_slots import PartySlots
+
+# 대화에서 감지하는 투어 종류 (우선순위 순) -> 사용자 메시지에서 함께 찾는 영문 표기
+# 상담사 응답은 한글 이름만 확인 (응답에 섞인 영문 단어 오인 방지)
+CONTEXT_TOUR_TYPES = [
+    ('골프', ('golf',)),
+    ('래프팅', ('rafting',)),
+    ('패밀리', ('family',)),
+    ('라이트', ('light',)),
+    ('베스트', ('best',)),
+    ('바나힐', ()),
+    ('호이안', ()),
+]
+RECENT_TURNS = 3  # 맥락으로 이어 쓰는 최근 대화 수
+
+
+def mentioned_tour_type(user_message, ai_response=''):
+    """한 턴(고객 메시지 + 상담사 응답)에서 언급된 투어 종류 (우선순위가 가장 높은 것)"""
+    user_lower = (user_message or '').lower()
+    ai_text = ai_response or ''
+    for tour_type, aliases in CONTEXT_TOUR_TYPES:
+        if tour_type in user_lower or tour_type in ai_text or any(alias in user_lower for alias in aliases):
+            return tour_type
+    return None
+
+def specific_tour_name(tour_type, user_message, ai_response=''):
+    """투어 종류 안에서 구체적인 상품명 (골프 54/72홀 등, 알 수 없으면 None)"""
+    user_message = user_message or ''
+    ai_response = ai_response or ''
+    if tour_type == '골프':
+        if '골프투어54' in user_message or '골프투어 54' in user_message or '54홀' in user_message or '54' in ai_response:
+            return '골프투어54홀'
+        if '골프투어72' in user_message or '골프투어 72' in user_message or '72홀' in user_message or '72' in ai_response:
+            return '골프투어72홀'
+    elif tour_type == '래프팅':
+        return '래프팅투어'
+    elif tour_type == '패밀리':
+        return '패밀리팩투어'
+    return None
+
+
+class DialogueState:
+    """대화 하나의 엔티티 상태 (값 + 마지막으로 언급된 턴 번호)"""
+
+    __slots__ = ('turn', 'topic', 'tour_id', 'tour_type', 'mentioned_type', 'mentioned_turn',
+                 'specific_tour', 'specific_turn', 'region', 'region_turn', 'party', 'party_type')
+
+    def __init__(self):
+        self.turn = 0  # 끝난 턴 수
+        self.topic = None  # 'tour' / 'hotel'
+        self.tour_id = None  # 검색 결과에서 정해진 현재 투어
+        self.tour_type = None  # 검색 결과 투어명에서 정해진 투어 종류 (이후 검색을 이 종류로 제한)
+        self.mentioned_type = None  # 대화에서 마지막으로 언급된 투어 종류
+        self.mentioned_turn = 0
+        self.specific_tour = None  # 마지막으로 언급된 구체적인 상품명
+        self.specific_turn = 0
+        self.region = None  # 고객이 마지막으로 언급한 지역
+        self.region_turn = 0
+        self.party = PartySlots()  # 누적 인원
+        self.party_type = None  # 인원을 말할 때 고객이 묻던 투어 종류 (다른 투어를 물으면 인원 초기화)
+
+    def to_dict(self):
+        """공유 저장소용 직렬화 (JSON 으로 바꿀 수 있는 dict)"""
+        data = {name: getattr(self, name) for name in self.__slots__ if name != 'party'}
+        data['party'] = self.party.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        for name in cls.__slots__:
+            if name != 'party' and name in data:
+                setattr(state, name, data[name])
+        state.party = PartySlots.from_dict(data.get('party') or {})
+        return state
+
+    def _recent(self, turn, window):
+        return turn > 0 and self.turn - turn < window
+
+    def update(self, user_message, ai_response, hotels=None, tours=None, regions=()):
+        """턴 하나 반영 (regions: 고객 메시지에서 찾은 지역, 메시지 자동자 결과)"""
+        self.turn += 1
+
+        if tours:
+            self.topic = 'tour'
+            for tour in tours:
+                tour_name = (tour.get('tour_name') or '').lower()
+                tour_type = next((t for t, _ in CONTEXT_TOUR_TYPES if t in tour_name), None)
+                if tour_type:
+                    self.tour_type = tour_type
+                    self.tour_id = tour.get('id')
+                    break
+            else:
+                if len(tours) == 1:
+                    self.tour_id = tours[0].get('id')
+        elif hotels:
+            self.topic = 'hotel'
+
+        tour_type = mentioned_tour_type(user_message, ai_response)
+        if tour_type:
+            if tour_type != self.mentioned_type:
+                self.specific_tour = None
+            self.mentioned_type = tour_type
+            self.mentioned_turn = self.turn
+            specific = specific_tour_name(tour_type, user_message, ai_response)
+            if specific:
+                self.specific_tour = specific
+                self.specific_turn = self.turn
+
+        if regions:
+            self.region = regions[0]
+            self.region_turn = self.turn
+
+        self.party = self.party_for(user_message)
+        self.party_type = mentioned_tour_type(user_message) or self.party_type
+
+    def party_for(self, user_message):
+        """이번 메시지까지 반영한 인원 (상태는 바꾸지 않음, 새 투어 종류를 물으면 처음부터)"""
+        user_tour_type = mentioned_tour_type(user_message)
+        fresh = bool(user_tour_type and self.party_type and user_tour_type != self.party_type)
+        return self.party.merged(user_message, fresh)
+
+    def recent_tour_type(self, window=RECENT_TURNS):
+        """최근 window 턴 안에 언급된 투어 종류 (없으면 None)"""
+        return self.mentioned_type if self._recent(self.mentioned_turn, window) else None
+
+    def recent_specific_tour(self, window=RECENT_TURNS):
+        return self.specific_tour if self._recent(self.specific_turn, window) else None
+
+    def recent_region(self, window=RECENT_TURNS):
+        return self.region if self._recent(self.region_turn, window) else None
@@ -0,0 +1,140 @@
+"""오타 / 자모 / 초성 허용 투어명 매칭
+
+투어명과 별칭을 한글 자모로 분해해 색인하고 ("래프팅" -> "ㄹㅐㅍㅡㅌㅣㅇ"),
+메시지 단어마다 자모 3-gram 으로 후보를 최대 MAX_CANDIDATES 개 추린 뒤
+편집 거리로 확인한다 ("래프땅", "페밀리팩"). 자음만 입력한 초성("ㄹㅍㅌ")은 초성 사전으로 찾는다.
+"""
+import re
+from collections import namedtuple
+
+from tour_name_index import normalize_name
+
+CHOSUNG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+JUNGSUNG = 'ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ'
+JONGSUNG = ' ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ'
+CHOSUNG_PATTERN = re.compile(r'^[ㄱ-ㅎ]{2,}$')
+WORD_PATTERN = re.compile(r'[가-힣a-z0-9ㄱ-ㅎ]+')
+# 단어 끝 조사는 떼고도 비교 ("래프땅은" -> "래프땅")
+PARTICLES = ('은', '는', '이', '가', '을', '를', '도', '요', '에', '로', '의', '랑')
+
+NGRAM = 3
+MAX_CANDIDATES = 16  # 편집 거리로 확인할 최대 후보 수
+MAX_WORDS = 20  # 메시지에서 확인할 최대 단어 수
+MIN_JAMO_LENGTH = 6  # 이보다 짧은 단어는 오타 매칭하지 않음 (2글자 단어 오매칭 방지)
+MIN_SCORE = 0.7
+CHOSUNG_SCORE = 0.9
+
+FuzzyMatch = namedtuple('FuzzyMatch', ['tour_id', 'term', 'score'])
+
+
+def decompose(text):
+    """한글 음절을 자모로 분해 (그 외 문자는 소문자 그대로)"""
+    jamo = []
+    for char in text.lower():
+        code = ord(char) - 0xAC00
+        if 0 <= code < 11172:
+            jamo.append(CHOSUNG[code // 588])
+            jamo.append(JUNGSUNG[(code % 588) // 28])
+            if code % 28:
+                jamo.append(JONGSUNG[code % 28])
+        else:
+            jamo.append(char)
+    return ''.join(jamo)
+
+def chosung(text):
+    """한글 음절의 초성만 (초성 약어 비교용)"""
+    initials = []
+    for char in text:
+        code = ord(char) - 0xAC00
+        if 0 <= code < 11172:
+            initials.append(CHOSUNG[code // 588])
+        elif char.strip():
+            return ''
+    return ''.join(initials)
+
+def ngrams(jamo):
+    padded = f'^{jamo}$'
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+def edit_distance(a, b, limit):
+    """레벤슈타인 거리 (limit 를 넘으면 limit + 1)"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class FuzzyNameIndex:
+    """자모 분해된 투어명 / 별칭 색인"""
+
+    def __init__(self, tours, aliases=None):
+        # tours / aliases 는 TourNameIndex 와 같은 형식
+        aliases = aliases or {}
+        self._terms = []  # [(자모, 원래 이름, 투어 id)]
+        self._grams = {}  # 자모 3-gram -> [term 번호]
+        self._chosung = {}  # 초성 -> [(이름, 투어 id)]
+
+        for position, tour in enumerate(tours):
+            name = tour.get('tour_name')
+            if not name:
+                continue
+            tour_id = tour.get('id', position)
+            for term in [name] + list(aliases.get(name, ())):
+                normalized = normalize_name(term)
+                if not normalized:
+                    continue
+                jamo = decompose(normalized)
+                term_number = len(self._terms)
+                self._terms.append((jamo, term, tour_id))
+                for gram in ngrams(jamo):
+                    self._grams.setdefault(gram, []).append(term_number)
+                initials = chosung(normalized)
+                if len(initials) >= 2:
+                    self._chosung.setdefault(initials, []).append((term, tour_id))
+
+    def __len__(self):
+        return len(self._terms)
+
+    def _match_word(self, word):
+        if CHOSUNG_PATTERN.match(word):
+            matches = self._chosung.get(word)
+            if matches:
+                term, tour_id = matches[0]
+                return FuzzyMatch(tour_id, term, CHOSUNG_SCORE)
+            return None
+
+        best = None
+        for candidate in dict.fromkeys([word, word[:-1] if word.endswith(PARTICLES) else word]):
+            jamo = decompose(candidate)
+            if len(jamo) < MIN_JAMO_LENGTH:
+                continue
+            shared = {}
+            for gram in ngrams(jamo):
+                for term_number in self._grams.get(gram, ()):
+                    shared[term_number] = shared.get(term_number, 0) + 1
+            for term_number in sorted(shared, key=lambda n: -shared[n])[:MAX_CANDIDATES]:
+                term_jamo, term, tour_id = self._terms[term_number]
+                limit = max(1, max(len(jamo), len(term_jamo)) // 3)
+                distance = edit_distance(jamo, term_jamo, limit)
+                if distance > limit:
+                    continue
+                score = 1 - distance / max(len(jamo), len(term_jamo))
+                if score >= MIN_SCORE and (best is None or score > best.score):
+                    best = FuzzyMatch(tour_id, term, score)
+        return best
+
+    def best_match(self, message):
+        """메시지 단어 중 가장 비슷한 투어명/별칭 -> FuzzyMatch (없으면 None)"""
+        best = None
+        for word in WORD_PATTERN.findall((message or '').lower())[:MAX_WORDS]:
+            match = self._match_word(word)
+            if match is not None and (best is None or match.score > best.score):
+                best = match
+        return best
@@ -0,0 +1,92 @@
+"""다중 키워드 매칭 (Aho-Corasick)
+
+여러 어휘(카테고리 -> 키워드 목록)를 하나의 자동자로 컴파일해
+메시지를 한 번만 훑어 모든 카테고리의 매칭 키워드를 찾는다.
+매칭은 `keyword in text.lower()` 와 같은 부분 문자열 / 대소문자 무시 기준.
+"""
+from collections import deque
+from functools import lru_cache
+
+
+class KeywordHits:
+    """메시지 한 개의 매칭 결과 (카테고리별 매칭 키워드, 어휘 순서 유지)"""
+
+    def __init__(self, by_category):
+        self._by_category = by_category
+
+    def has(self, *categories):
+        """카테고리 중 하나라도 매칭됐는지"""
+        return any(category in self._by_category for category in categories)
+
+    def keywords(self, category):
+        return list(self._by_category.get(category, ()))
+
+    def categories(self):
+        return set(self._by_category)
+
+
+class KeywordMatcher:
+    """카테고리별 어휘를 컴파일한 Aho-Corasick 자동자"""
+
+    def __init__(self, vocabularies, scan_cache_size=256):
+        self.vocabularies = {category: list(dict.fromkeys(k for k in keywords if k))
+                             for category, keywords in vocabularies.items()}
+        self._patterns = []  # 패턴 id -> (카테고리, 어휘 내 순서, 원래 키워드)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # 상태 -> 이 상태에서 끝나는 패턴 id 목록
+
+        for category, keywords in self.vocabularies.items():
+            for position, keyword in enumerate(keywords):
+                self._add(keyword.lower(), len(self._patterns))
+                self._patterns.append((category, position, keyword))
+        self._build_failure_links()
+
+        # 같은 메시지를 여러 단계에서 확인하므로 최근 결과 재사용
+        self.scan = lru_cache(maxsize=scan_cache_size)(self._scan)
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def _add(self, keyword, pattern_id):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def _scan(self, text):
+        """텍스트를 한 번 훑어 KeywordHits 반환"""
+        found = set()
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in (text or '').lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+
+        by_category = {}
+        for pattern_id in sorted(found, key=lambda p: self._patterns[p][:2]):
+            category, _, keyword = self._patterns[pattern_id]
+            by_category.setdefault(category, []).append(keyword)
+        return KeywordHits(by_category)
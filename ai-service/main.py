@@ -2,8 +2,11 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
-from ai_service import TravelAI
+from fastapi.responses import StreamingResponse
+from ai_service import TravelAI, SEARCH_CACHE
+from message_features import STAGE_TIMINGS
 import uvicorn
+import json
 
 app = FastAPI()
 
@@ -34,31 +37,38 @@ class ChatResponse(BaseModel):
 def read_root():
     return {"message": "Travel AI Service is running"}
 
+def decode_message(message):
+    """요청 메시지 디코딩 (깨진 한글 인코딩 복구 시도)"""
+    # UTF-8 디코딩 확인
+    try:
+        print(f"Raw message received: {repr(message)}")
+    except UnicodeEncodeError:
+        print("Raw message received: [Korean text]")
+
+    # 한글 인코딩 문제 해결 시도
+    try:
+        if isinstance(message, bytes):
+            message = message.decode('utf-8')
+        elif '??' in message or len(message.encode('utf-8')) != len(message.encode('cp949', errors='ignore')):
+            # 인코딩이 깨진 경우 복구 시도
+            message = message.encode('latin1').decode('utf-8')
+    except:
+        pass
+
+    try:
+        print(f"Processed message: {message}")
+    except UnicodeEncodeError:
+        print("Processed message: [Korean text]")
+    return message
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @app.post("/chat", response_model=ChatResponse)
-def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest):
     try:
-        # UTF-8 디코딩 확인
-        message = request.message
-        try:
-            print(f"Raw message received: {repr(message)}")
-        except UnicodeEncodeError:
-            print("Raw message received: [Korean text]")
-        
-        # 한글 인코딩 문제 해결 시도
-        try:
-            if isinstance(message, bytes):
-                message = message.decode('utf-8')
-            elif '??' in message or len(message.encode('utf-8')) != len(message.encode('cp949', errors='ignore')):
-                # 인코딩이 깨진 경우 복구 시도
-                message = message.encode('latin1').decode('utf-8')
-        except:
-            pass
-        
-        try:
-            print(f"Processed message: {message}")
-        except UnicodeEncodeError:
-            print("Processed message: [Korean text]")
-        result = travel_ai.process_message(message, request.conversation_id)
+        message = decode_message(request.message)
+        result = await travel_ai.process_message_async(message, request.conversation_id)
         return ChatResponse(
             response=result['response'],
             intent=result['intent'],
@@ -72,11 +82,77 @@ def chat_endpoint(request: ChatRequest):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"AI processing error: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """SSE 스트리밍 응답
+
+    event: delta  data: {"text": "..."}   - 필터를 거친 응답 조각 (도착하는 대로)
+    event: done   data: {"response": ..., "intent": ..., ...}  - /chat 과 같은 최종 결과
+    event: error  data: {"detail": "..."}
+    """
+    message = decode_message(request.message)
+
+    async def events():
+        try:
+            async for kind, payload in travel_ai.process_message_stream(message, request.conversation_id):
+                if kind == 'delta':
+                    yield sse_event('delta', {'text': payload})
+                else:
+                    yield sse_event('done', {
+                        'response': payload['response'],
+                        'intent': payload.get('intent', 'general'),
+                        'keywords': payload.get('keywords', []),
+                        'hotels_found': payload.get('hotels_found', 0),
+                        'tours_found': payload.get('tours_found', 0)
+                    })
+        except Exception as e:
+            print(f"ERROR: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            yield sse_event('error', {'detail': f"AI processing error: {str(e)}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.on_event("shutdown")
+async def close_clients():
+    await travel_ai.async_client.close()
+    try:
+        from database_async import close_pool_async
+        await close_pool_async()
+    except ImportError:
+        pass
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+def metrics():
+    from database import get_pool_stats
+    stats = {
+        "db_pool": get_pool_stats(),
+        "caches": [SEARCH_CACHE.stats(), travel_ai.response_cache.stats()],
+        "stages": STAGE_TIMINGS.stats(),
+        "conversations": travel_ai.conversations.stats()
+    }
+    if travel_ai.conversation_history:
+        stats["conversation_history"] = travel_ai.conversation_history.stats()
+    try:
+        from database_async import get_pool_stats_async
+        stats["db_pool_async"] = get_pool_stats_async()
+    except ImportError:
+        pass
+    return stats
+
 if __name__ == "__main__":
     import os
     port = int(os.getenv("PORT", 5002))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    workers = int(os.getenv("WORKERS", 1))
+    if workers > 1:
+        # 워커마다 대화 컨텍스트가 따로 생기지 않도록 CONVERSATION_STORE 를 sqlite / redis 로 설정해야 함
+        if travel_ai.conversations.backend == 'memory':
+            print("WARNING: WORKERS > 1 with CONVERSATION_STORE=memory - follow-up questions may lose context")
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""메시지 분석 결과 (요청당 한 번 계산해 파이프라인 전체에서 공유) + 단계별 처리 시간"""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from keyword_matcher import KeywordHits
+from pricing import is_price_question, parse_party
+
+# 메시지에서 감지하는 투어 종류 (검색 맥락 전환 기준과 같은 목록)
+TOUR_TYPE_KEYWORDS = ['패밀리', '베스트', '라이트', '골프', '래프팅', '바나힐', '호이안']
+
+
+@dataclass(frozen=True)
+class MessageFeatures:
+    """사용자 메시지 한 개의 분석 결과 (불변)
+
+    hits 는 메시지 자동자(ai_service.MESSAGE_VOCABULARIES + 지역/투어명) 매칭 결과.
+    인원은 가격표 견적과 같은 규칙(pricing.parse_party)으로 읽고, 애매하면 adults 가 None.
+    """
+    text: str
+    normalized: str  # 소문자 + 앞뒤 공백 제거
+    compact: str  # 소문자 + 공백/하이픈 제거 (투어명 매칭용)
+    hits: KeywordHits
+    intent: str
+    tour_type: Optional[str]
+    region: Optional[str]
+    adults: Optional[int]
+    children: Tuple[Optional[int], ...]  # 아동별 키 (모르면 None)
+    infants: int
+    is_greeting: bool
+    is_price_question: bool  # 응답 필터 기준 가격 질문 (동의어 포함)
+    is_quote_question: bool  # 가격표 견적 대상 질문
+    is_price_only: bool
+    is_info_request: bool
+    is_children_question: bool
+    is_adult_question: bool
+    is_people_count_question: bool
+    is_child_only: bool
+
+
+def intent_from_hits(hits):
+    """키워드 매칭 결과 -> 의도 (패키지 목록 > 투어 > 호텔 > 가격 > 일반)"""
+    if hits.has('intent_package'):
+        return 'general'
+    elif hits.has('intent_tour'):
+        return 'tour'
+    elif hits.has('intent_hotel'):
+        return 'hotel'
+    elif hits.has('intent_price'):
+        return 'price'
+    return 'general'
+
+def build_message_features(user_message, hits):
+    """메시지 + 자동자 매칭 결과 -> MessageFeatures"""
+    text = user_message or ''
+    normalized = text.lower().strip()
+    tour_types = hits.keywords('tour_type')
+    regions = hits.keywords('region')
+    party = parse_party(text)
+    return MessageFeatures(
+        text=text,
+        normalized=normalized,
+        compact=normalized.replace(' ', '').replace('-', ''),
+        hits=hits,
+        intent=intent_from_hits(hits),
+        tour_type=tour_types[0] if tour_types else None,
+        region=regions[0] if regions else None,
+        adults=party['adults'] if party else None,
+        children=tuple(party['children']) if party else (),
+        infants=party['infants'] if party else 0,
+        is_greeting=hits.has('greeting'),
+        is_price_question=hits.has('price_question'),
+        is_quote_question=is_price_question(text),
+        is_price_only=hits.has('price_only'),
+        is_info_request=hits.has('info_request'),
+        is_children_question=hits.has('children'),
+        is_adult_question=hits.has('adult'),
+        is_people_count_question=hits.has('people'),
+        is_child_only=hits.has('child_only') and not hits.has('adult_mention'),
+    )
+
+
+class StageTimings:
+    """파이프라인 단계별 처리 시간 누적 (GET /metrics)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}  # 단계 -> [횟수, 합계 초, 최대 초]
+
+    def record(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.setdefault(stage, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        """with 블록 실행 시간 기록 (비동기 단계는 대기 시간 포함)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def stats(self):
+        with self._lock:
+            return {
+                stage: {
+                    'count': count,
+                    'total_ms': round(total * 1000, 3),
+                    'avg_ms': round(total * 1000 / count, 3) if count else 0.0,
+                    'max_ms': round(longest * 1000, 3)
+                }
+                for stage, (count, total, longest) in self._stages.items()
+            }
+
+
+STAGE_TIMINGS = StageTimings()
@@ -0,0 +1,129 @@
+"""대화별 인원 슬롯 (성인 / 아동 키 / 유아)
+
+"성인 4명 아이 2명", "아이 한명 추가", "애들 키 90cm, 140cm" 처럼 턴마다 나뉘어 나오는
+인원 정보를 가격표 견적과 같은 규칙(pricing.read_counts)으로 읽어 누적한다.
+프롬프트에는 이전 대화 대신 한 줄 요약(summary)을 넣고, 가격표 견적에도 그대로 쓴다.
+"""
+import re
+
+from pricing import read_counts, resolve_counts
+
+# 이전 인원에 더하는 표현 ("아동 1명 추가", "성인 2명 더하면", "아이 한명 더요")
+INCREMENT_KEYWORDS = ['추가', '더하면', '더해서', '합치면']
+INCREMENT_PATTERN = re.compile(r'(?:명|인|분)\s*더(?=$|[\s요하?.,!])')
+# 슬롯으로 표현할 수 없는 질문 (빼기 / 1인당) - 이전 인원 그대로 두고 LLM 에 맡김
+UNTRACKED_KEYWORDS = ['빼면', '제외', '인당', '명당']
+
+
+class PartySlots:
+    """인원 상태 (불변 - merged 가 새 객체를 돌려줌)
+
+    adults 가 None 이면 아직 성인 수를 모름. children 은 아동별 키 (모르면 None).
+    """
+
+    __slots__ = ('adults', 'children', 'infants')
+
+    def __init__(self, adults=None, children=(), infants=0):
+        self.adults = adults
+        self.children = tuple(children)
+        self.infants = infants
+
+    def __eq__(self, other):
+        return isinstance(other, PartySlots) and \
+            (self.adults, self.children, self.infants) == (other.adults, other.children, other.infants)
+
+    def __repr__(self):
+        return f"PartySlots(adults={self.adults}, children={self.children}, infants={self.infants})"
+
+    def to_dict(self):
+        return {'adults': self.adults, 'children': list(self.children), 'infants': self.infants}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('adults'), data.get('children', ()), data.get('infants', 0))
+
+    @property
+    def known(self):
+        return self.adults is not None
+
+    def as_party(self):
+        """pricing.quote 에 넘기는 인원 dict (성인 수를 모르면 None)"""
+        if not self.known:
+            return None
+        return {'adults': self.adults, 'children': list(self.children), 'infants': self.infants}
+
+    def summary(self):
+        """한 줄 요약 ("성인 4명 + 아동 2명(키 90cm, 키 140cm)"), 성인 수를 모르면 빈 문자열"""
+        if not self.known:
+            return ""
+        parts = [f"성인 {self.adults}명"]
+        if self.children:
+            heights = [f"키 {height}cm" if height is not None else "키 미확인" for height in self.children]
+            parts.append(f"아동 {len(self.children)}명({', '.join(heights)})")
+        if self.infants:
+            parts.append(f"유아 {self.infants}명")
+        return " + ".join(parts)
+
+    def merged(self, user_message, fresh=False):
+        """메시지의 인원 정보를 반영한 새 슬롯 (fresh 면 이전 인원을 버리고 시작, 애매하면 그대로)"""
+        base = PartySlots() if fresh else self
+        text = user_message or ''
+        if any(keyword in text for keyword in UNTRACKED_KEYWORDS):
+            return base
+        mentions = read_counts(text)
+        if mentions is None:
+            return base
+        counts, bare, totals, height_mentions = mentions
+        # 이하/미만 은 구간이라 특정 키로 볼 수 없음
+        heights = [height for height, qualifier in height_mentions if qualifier not in ('이하', '미만')]
+        if len(heights) != len(height_mentions):
+            heights = []
+
+        if any(keyword in text for keyword in INCREMENT_KEYWORDS) or INCREMENT_PATTERN.search(text):
+            return base._incremented(counts, bare, heights)
+        return base._replaced(counts, bare, totals, heights)
+
+    def _incremented(self, counts, bare, heights):
+        if not self.known:
+            return self
+        if bare and (counts or len(bare) > 1):
+            return PartySlots()  # "성인 1명 아이들 2명 추가" - 어느 종류를 더하는지 모름
+        added_adults = counts.get('adults', 0)
+        if bare:
+            added_adults = bare[0]  # "1명 추가" 는 성인
+        added_children = counts.get('children', 0)
+        new_children = heights if len(heights) == added_children else [None] * added_children
+        return PartySlots(self.adults + added_adults, self.children + tuple(new_children),
+                          self.infants + counts.get('infants', 0))
+
+    def _replaced(self, counts, bare, totals, heights):
+        # 말한 종류만 바꾸고 나머지는 이전 값 유지 ("성인 3명이면?" -> 아동은 그대로)
+        if not counts and not bare and not totals:
+            # 키만 말한 경우: 알고 있는 아동 수와 맞을 때만 키를 채움
+            if heights and len(heights) == len(self.children):
+                return PartySlots(self.adults, heights, self.infants)
+            return self
+
+        if totals and not counts and not bare:
+            # "총 N명" 만 말한 경우: 알고 있는 아동 / 유아를 뺀 나머지가 성인
+            adults = totals[0] - len(self.children) - self.infants
+            if len(set(totals)) != 1 or adults <= 0:
+                return PartySlots()
+            return PartySlots(adults, self.children, self.infants)
+
+        counts = resolve_counts(counts, bare, totals)
+        if counts is None:
+            # 인원을 다시 말했지만 종류를 알 수 없음 ("성인 2명 아이들 2명") - 이전 인원은 더 이상 맞지 않으므로
+            # 모르는 상태로 두고 프롬프트에는 이전 대화를 그대로 넣음
+            return PartySlots()
+
+        adults = counts.get('adults', self.adults)
+        if not adults:
+            return self
+        if 'children' in counts:
+            children = heights if len(heights) == counts['children'] else [None] * counts['children']
+        elif heights and len(heights) == len(self.children):
+            children = heights
+        else:
+            children = self.children
+        return PartySlots(adults, children, counts.get('infants', self.infants))
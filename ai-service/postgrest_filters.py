@@ -0,0 +1,16 @@
+"""PostgREST 필터 문자열 생성 (supabase SDK / requests 백엔드 공용)"""
+
+
+def quote_value(value):
+    """PostgREST 필터 값 인용 (쉼표, 괄호, 점 등이 들어가도 안전하게)"""
+    escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def build_or_conditions(columns, query_terms):
+    """모든 검색어 x 모든 컬럼을 ilike 로 묶은 or 조건 (괄호 없이, 검색어가 없으면 None)"""
+    conditions = []
+    for term in dict.fromkeys(t.lower().strip() for t in query_terms if t and t.strip()):
+        for column in columns:
+            conditions.append(f"{column}.ilike.{quote_value(f'*{term}*')}")
+    return ','.join(conditions) if conditions else None
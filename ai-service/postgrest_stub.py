@@ -0,0 +1,167 @@
+"""로컬 PostgREST 호환 스텁 서버 (database_requests 개발/점검용)
+
+JSON 파일의 테이블 데이터를 PostgREST 와 같은 형식으로 제공한다.
+
+    python postgrest_stub.py --data catalog.json --port 3000
+    POSTGREST_URL=http://localhost:3000 USE_SUPABASE=true python main.py
+
+데이터 파일 형식: {"hotels": [{...}, ...], "tours": [{...}, ...]}
+지원: select, 컬럼 필터(eq / neq / gt / gte / lt / lte / ilike / like), or=(...),
+order, limit, offset
+"""
+import argparse
+import json
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'or'}
+
+
+def split_top_level(text):
+    """쉼표 기준 분리 (따옴표/괄호 안의 쉼표는 무시)"""
+    parts, current, depth, quoted, escaped = [], '', 0, False, False
+    for char in text:
+        if escaped:
+            current += char
+            escaped = False
+        elif char == '\\':
+            current += char
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+            current += char
+        elif char == '(' and not quoted:
+            depth += 1
+            current += char
+        elif char == ')' and not quoted:
+            depth -= 1
+            current += char
+        elif char == ',' and not quoted and depth == 0:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def unquote_value(value):
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        value = value[1:-1]
+        value = re.sub(r'\\(.)', r'\1', value)
+    return value
+
+
+def like_to_regex(pattern, ignore_case):
+    regex = ''.join('.*' if c in '*%' else re.escape(c) for c in pattern)
+    return re.compile(f'^{regex}$', re.DOTALL | (re.IGNORECASE if ignore_case else 0))
+
+
+def compare(row_value, operator, value):
+    if operator in ('like', 'ilike'):
+        return row_value is not None and bool(like_to_regex(value, operator == 'ilike').match(str(row_value)))
+
+    if isinstance(row_value, bool):
+        value = value.lower() == 'true'
+    elif isinstance(row_value, (int, float)):
+        value = type(row_value)(value)
+    elif row_value is None:
+        return operator == 'eq' and value == 'null'
+
+    if operator == 'eq':
+        return row_value == value
+    if operator == 'neq':
+        return row_value != value
+    if operator == 'gt':
+        return row_value > value
+    if operator == 'gte':
+        return row_value >= value
+    if operator == 'lt':
+        return row_value < value
+    if operator == 'lte':
+        return row_value <= value
+    raise ValueError(f"unsupported operator: {operator}")
+
+
+def matches_condition(row, condition):
+    """'column.op.value' 형식 조건"""
+    column, operator, value = condition.split('.', 2)
+    return compare(row.get(column), operator, unquote_value(value))
+
+
+def apply_query(rows, params):
+    for key, value in params.items():
+        if key in RESERVED_PARAMS:
+            continue
+        operator, operand = value.split('.', 1)
+        rows = [row for row in rows if compare(row.get(key), operator, unquote_value(operand))]
+
+    if 'or' in params:
+        conditions = split_top_level(params['or'].strip()[1:-1])
+        rows = [row for row in rows if any(matches_condition(row, c) for c in conditions)]
+
+    if 'order' in params:
+        for spec in reversed(params['order'].split(',')):
+            column, _, direction = spec.partition('.')
+            rows = sorted(rows, key=lambda r: (r.get(column) is None, r.get(column)),
+                          reverse=direction.startswith('desc'))
+
+    offset = int(params.get('offset', 0))
+    limit = int(params['limit']) if 'limit' in params else None
+    rows = rows[offset:offset + limit if limit is not None else None]
+
+    if params.get('select', '*') != '*':
+        columns = [c.strip() for c in params['select'].split(',')]
+        rows = [{c: row.get(c) for c in columns} for row in rows]
+    return rows
+
+
+def make_handler(tables):
+    class PostgrestStubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            table = url.path.strip('/').split('/')[-1]
+            if table not in tables:
+                return self.send_json(404, {'message': f'relation "{table}" does not exist'})
+            try:
+                rows = apply_query(tables[table], dict(parse_qsl(url.query, keep_blank_values=True)))
+            except (ValueError, IndexError) as e:
+                return self.send_json(400, {'message': str(e)})
+            self.send_json(200, rows)
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return PostgrestStubHandler
+
+
+def create_server(tables, host='127.0.0.1', port=3000):
+    """스텁 서버 생성 (port=0 이면 빈 포트 자동 할당, server.server_port 로 확인)"""
+    return ThreadingHTTPServer((host, port), make_handler(tables))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PostgREST compatible stub server")
+    parser.add_argument('--data', required=True, help='JSON file: {"hotels": [...], "tours": [...]}')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    args = parser.parse_args()
+
+    with open(args.data, encoding='utf-8') as f:
+        tables = json.load(f)
+
+    server = create_server(tables, args.host, args.port)
+    print(f"PostgREST stub running on http://{args.host}:{server.server_port}")
+    server.serve_forever()
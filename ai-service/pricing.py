@@ -0,0 +1,277 @@
+"""투어 가격표 파싱 / 견적 계산
+
+tours.description 의 가격 안내 문구를 구조화한다.
+  - 성인 인원수별 총액: 예약금(원, 한국에서 결제) + 잔금(USD, 현지에서 결제)
+  - 아동/유아 키 구간별 1인 가격: 무료 / 예약금 + 잔금 / 성인 요금
+"성인 N명 + 아동 M명" 견적은 이 표로 바로 계산한다.
+문구가 예상한 형식과 다르거나 애매하면 None 을 반환하고, 호출자는 LLM 응답을 사용한다.
+"""
+import re
+from functools import lru_cache
+
+ADULT_HEIGHT_CM = 140  # 가격표에 성인 기준 키가 없을 때 (키 140cm 이상은 성인 요금)
+
+CHILD_SECTION_PATTERN = re.compile(r'아동\s*(?:가격|요금)')
+GROUP_PRICE_PATTERN = re.compile(r'(\d+)\s*[인명]\s*(\d+(?:\.\d+)?)\s*만\s*원\s*\+\s*(?:잔금\s*)?\$\s*([\d,]+)')
+MAX_PARTY_PATTERN = re.compile(r'(\d+)\s*[인명]\s*이상은?\s*(?:직원|문의|별도)')
+FREE_TIER_PATTERN = re.compile(r'키\s*(\d+)\s*cm\s*미만\s*(?:은\s*)?무료')
+PRICED_TIER_PATTERN = re.compile(
+    r'키\s*(\d+)\s*cm\s*이상\s*~\s*키\s*(\d+)\s*cm\s*미만\s*(?:은\s*)?'
+    r'예약금\s*(\d+(?:\.\d+)?)\s*만\s*원\s*\+\s*잔금\s*\$\s*([\d,]+)'
+)
+ADULT_TIER_PATTERN = re.compile(r'키\s*(\d+)\s*cm\s*이상\s*(?:은|는)?\s*성인')
+INFANT_FREE_PATTERN = re.compile(r'(\d+)\s*개월\s*미만\s*(?:은\s*)?무료')
+
+# 인원 표현 ("성인 2명", "아이 1명", "3명", "키 120cm")
+NUMBER = r'(\d+|하나|한|둘|두|셋|세|넷|네|다섯|여섯|일곱|여덟|아홉|열)'
+KOREAN_NUMBERS = {'하나': 1, '한': 1, '둘': 2, '두': 2, '셋': 3, '세': 3, '넷': 4, '네': 4,
+                  '다섯': 5, '여섯': 6, '일곱': 7, '여덟': 8, '아홉': 9, '열': 10}
+ADULT_COUNT_PATTERN = re.compile(r'(?:성인|어른|대인)\s*(?:분\s*)?' + NUMBER + r'\s*(?:명|인|분)?')
+CHILD_COUNT_PATTERN = re.compile(r'(?:아동|아이|어린이|소아|애들|애)\s*' + NUMBER + r'\s*(?:명|인)?')
+INFANT_COUNT_PATTERN = re.compile(r'(?:유아|아기|애기|영아)\s*' + NUMBER + r'\s*(?:명|인)?')
+TOTAL_COUNT_PATTERN = re.compile(r'(?:총|전체|모두)\s*' + NUMBER + r'\s*(?:명|인)(?!당)')
+BARE_COUNT_PATTERN = re.compile(r'(?<![\d가-힣])' + NUMBER + r'\s*(?:명|인)(?!당)')
+HEIGHT_PATTERN = re.compile(r'(\d{2,3})\s*(?:cm|센티|센치)\s*(이상|이하|미만|초과)?')
+
+PRICE_QUESTION_KEYWORDS = ['가격', '얼마', '비용', '요금', '금액', '총액', '견적', '명이면', '인이면']
+# 이전 대화의 인원에 더하는 질문 / 1인당 금액 질문은 LLM 으로
+LLM_ONLY_KEYWORDS = ['추가', '더하면', '더해서', '합치면', '빼면', '제외', '인당', '명당']
+
+
+class PriceTable:
+    """투어 한 개의 가격표
+
+    group_prices: 성인 인원수 -> (예약금 원, 잔금 USD) (그룹 총액)
+    child_tiers: [(키 하한 cm, 키 상한 cm, (예약금 원, 잔금 USD) 또는 None=무료)] (1인 기준)
+    """
+
+    def __init__(self, group_prices, max_party, child_tiers, adult_height, infant_free_months=None):
+        self.group_prices = group_prices
+        self.min_party = min(group_prices)
+        self.max_party = max_party
+        self.child_tiers = child_tiers
+        self.adult_height = adult_height
+        self.infant_free_months = infant_free_months
+
+    def child_price(self, height):
+        """키에 맞는 아동 구간 -> (라벨, 가격 또는 None=무료). 성인 요금이면 'adult', 알 수 없으면 None"""
+        if height is None:
+            # 키를 모르면 유료 구간이 하나뿐일 때만 그 구간으로 계산
+            priced = [tier for tier in self.child_tiers if tier[2] is not None]
+            if len(priced) != 1:
+                return None
+            low, high, price = priced[0]
+            return f'키 {low}~{high}cm', price
+        if height >= self.adult_height:
+            return 'adult'
+        for low, high, price in self.child_tiers:
+            if low <= height < high:
+                label = f'키 {high}cm 미만' if low == 0 else f'키 {low}~{high}cm'
+                return label, price
+        return None
+
+
+def to_won(man_won):
+    return int(round(float(man_won) * 10000))
+
+def to_dollars(amount):
+    return int(amount.replace(',', ''))
+
+def parse_price_table(description):
+    """가격 안내 문구 -> PriceTable (가격이 없거나 형식이 애매하면 None)"""
+    if not description or '$' not in description:
+        return None
+    text = re.sub(r'\s+', ' ', description)
+
+    match = CHILD_SECTION_PATTERN.search(text)
+    adult_text = text[:match.start()] if match else text
+    child_text = text[match.end():] if match else ''
+
+    group_prices = {}
+    group_matches = GROUP_PRICE_PATTERN.findall(adult_text)
+    for size, deposit, balance in group_matches:
+        price = (to_won(deposit), to_dollars(balance))
+        if group_prices.get(int(size), price) != price:
+            return None
+        group_prices[int(size)] = price
+    # 인식하지 못한 달러 금액이 있으면 애매한 것으로 봄
+    if not group_prices or adult_text.count('$') != len(group_matches):
+        return None
+
+    max_party = max(group_prices)
+    max_match = MAX_PARTY_PATTERN.search(adult_text)
+    if max_match:
+        max_party = min(max_party, int(max_match.group(1)) - 1)
+
+    tiers = []
+    for high in FREE_TIER_PATTERN.findall(child_text):
+        tiers.append((0, int(high), None))
+    priced_matches = PRICED_TIER_PATTERN.findall(child_text)
+    for low, high, deposit, balance in priced_matches:
+        tiers.append((int(low), int(high), (to_won(deposit), to_dollars(balance))))
+    if child_text.count('$') != len(priced_matches):
+        return None
+    tiers.sort()
+
+    adult_match = ADULT_TIER_PATTERN.search(child_text)
+    if adult_match:
+        adult_height = int(adult_match.group(1))
+    elif priced_matches:
+        adult_height = max(high for _, high, price in tiers if price is not None)
+    else:
+        adult_height = ADULT_HEIGHT_CM
+
+    # 구간이 겹치거나 비면 애매한 것으로 봄
+    bound = 0
+    for low, high, _ in tiers:
+        if low != bound or high <= low:
+            return None
+        bound = high
+    if tiers and bound != adult_height:
+        return None
+
+    infant_match = INFANT_FREE_PATTERN.search(child_text)
+    infant_free_months = int(infant_match.group(1)) if infant_match else None
+    return PriceTable(group_prices, max_party, tiers, adult_height, infant_free_months)
+
+@lru_cache(maxsize=1024)
+def get_price_table(description):
+    """parse_price_table 메모이즈 버전 (같은 설명은 한 번만 파싱)"""
+    return parse_price_table(description)
+
+def to_number(token):
+    return int(token) if token.isdigit() else KOREAN_NUMBERS[token]
+
+def is_price_question(user_message):
+    return any(keyword in user_message for keyword in PRICE_QUESTION_KEYWORDS)
+
+def read_counts(text):
+    """메시지의 인원 표현 -> (종류별 인원 {'adults', 'children', 'infants'}, 나머지 "N명" 목록, "총 N명" 목록, [(키, 한정어)])
+
+    같은 종류가 두 번 나오면 None. 판단(어느 종류인지, 키가 아동 수와 맞는지)은 호출자가 한다.
+    """
+    counts = {}
+    spans = []
+    for name, pattern in (('adults', ADULT_COUNT_PATTERN), ('children', CHILD_COUNT_PATTERN),
+                          ('infants', INFANT_COUNT_PATTERN)):
+        for match in pattern.finditer(text):
+            if any(match.start() < end and start < match.end() for start, end in spans):
+                continue
+            if name in counts:
+                return None
+            counts[name] = to_number(match.group(1))
+            spans.append(match.span())
+
+    rest = text
+    for start, end in sorted(spans, reverse=True):
+        rest = rest[:start] + ' ' + rest[end:]
+    totals = [to_number(match.group(1)) for match in TOTAL_COUNT_PATTERN.finditer(rest)]
+    rest = TOTAL_COUNT_PATTERN.sub(' ', rest)
+    bare = [to_number(match.group(1)) for match in BARE_COUNT_PATTERN.finditer(rest)]
+    heights = [(int(height), qualifier) for height, qualifier in HEIGHT_PATTERN.findall(text)]
+    return counts, bare, totals, heights
+
+def resolve_counts(counts, bare, totals):
+    """나머지 "N명" / "총 N명" 을 반영한 종류별 인원 (애매하면 None)
+
+    종류 없이 "N명" 하나만 말하면 성인 수 ("2명" = 성인 2명).
+    종류를 말한 인원 옆의 "N명" 은 ("성인 2명 아이들 2명", "성인 2명 초등학생 2명") 어느 종류인지 모르므로 None.
+    "총 N명" 은 종류별 합과 맞을 때만 허용.
+    """
+    counts = dict(counts)
+    if bare:
+        if counts or totals or len(bare) > 1:
+            return None
+        counts['adults'] = bare[0]
+    for total in totals:
+        if not counts:
+            counts['adults'] = total
+        elif total != sum(counts.values()):
+            return None
+    return counts
+
+def parse_party(user_message):
+    """메시지의 인원 -> {'adults', 'children': [키 또는 None], 'infants'} (애매하면 None)"""
+    if any(keyword in user_message for keyword in LLM_ONLY_KEYWORDS):
+        return None
+
+    mentions = read_counts(user_message)
+    if mentions is None:
+        return None
+    counts, bare, totals, height_mentions = mentions
+    counts = resolve_counts(counts, bare, totals)
+    if counts is None:
+        return None
+
+    adults = counts.get('adults', 0)
+    children = counts.get('children', 0)
+    infants = counts.get('infants', 0)
+    if adults == 0:
+        return None
+
+    heights = []
+    for height, qualifier in height_mentions:
+        if qualifier in ('이하', '미만'):
+            return None
+        heights.append(height)
+    if heights and len(heights) != children:
+        return None
+
+    return {'adults': adults, 'children': heights or [None] * children, 'infants': infants}
+
+def quote(table, party):
+    """가격표 + 인원 -> 견적 dict (가격표로 계산할 수 없으면 None)"""
+    adults = party['adults']
+    adult_height_count = 0
+    child_lines = {}  # 라벨 -> [인원, 가격, 아동/유아]
+    for height in party['children']:
+        tier = table.child_price(height)
+        if tier is None:
+            return None
+        if tier == 'adult':
+            adults += 1
+            adult_height_count += 1
+            continue
+        label, price = tier
+        child_lines.setdefault(label, [0, price, '아동'])[0] += 1
+
+    if party['infants']:
+        if table.infant_free_months is None:
+            return None
+        child_lines[f'{table.infant_free_months}개월 미만'] = [party['infants'], None, '유아']
+
+    if adults < table.min_party or adults > table.max_party or adults not in table.group_prices:
+        return None
+
+    deposit, balance = table.group_prices[adults]
+    adult_label = f'키 {table.adult_height}cm 이상 아동 {adult_height_count}명 포함' if adult_height_count else None
+    lines = [('성인', adult_label, adults, (deposit, balance))]
+    for label, (count, price, kind) in child_lines.items():
+        if price is None:
+            lines.append((kind, label, count, None))
+            continue
+        line_price = (price[0] * count, price[1] * count)
+        lines.append((kind, label, count, line_price))
+        deposit += line_price[0]
+        balance += line_price[1]
+    return {'lines': lines, 'deposit': deposit, 'balance': balance}
+
+def format_won(won):
+    if won % 10000 == 0:
+        return f'{won // 10000}만원'
+    if won % 1000 == 0:
+        return f'{won / 10000:g}만원'
+    return f'{won:,}원'
+
+def format_price(price):
+    return f'예약금 {format_won(price[0])} + 잔금 ${price[1]:,}'
+
+def format_quote(tour_name, result):
+    """견적 dict -> 안내 문구 (lines: [(성인/아동/유아, 구간 라벨, 인원, 가격 또는 None=무료)])"""
+    lines = [f'{tour_name} 가격 안내입니다.', '']
+    for kind, label, count, price in result['lines']:
+        name = f'{kind} {count}명' if label is None else f'{kind} {count}명 ({label})'
+        lines.append(f"• {name}: {format_price(price) if price is not None else '무료'}")
+    lines.append('')
+    lines.append(f"💰 **총액: 예약금 {format_won(result['deposit'])} (한국에서 결제) + 잔금 ${result['balance']:,} (현지에서 결제)**")
+    return '\n'.join(lines)
@@ -0,0 +1,126 @@
+"""로컬 Redis 프로토콜(RESP) 스텁 서버 (RedisConversationStore 개발/점검용)
+
+메모리 dict 로 동작하는 최소 RESP2 서버.
+
+    python resp_stub.py --port 6380
+    CONVERSATION_STORE=redis://127.0.0.1:6380/0 python main.py
+
+지원: PING, GET, SET (EX / PX), DEL, EXPIRE, TTL, DBSIZE, FLUSHDB, SELECT, AUTH (db / 비밀번호는 무시)
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class RespStore:
+    """키 -> (값, 만료 시각 또는 None)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def _get(self, key):
+        entry = self.data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, command, args):
+        with self.lock:
+            if command == 'PING':
+                return ('simple', 'PONG')
+            if command in ('SELECT', 'AUTH'):
+                return ('simple', 'OK')
+            if command == 'GET':
+                entry = self._get(args[0])
+                return entry[0] if entry else None
+            if command == 'SET':
+                key, value, options = args[0], args[1], [a.decode().upper() for a in args[2:]]
+                expires_at = None
+                if 'EX' in options:
+                    expires_at = time.time() + int(options[options.index('EX') + 1])
+                elif 'PX' in options:
+                    expires_at = time.time() + int(options[options.index('PX') + 1]) / 1000
+                self.data[key] = (value, expires_at)
+                return ('simple', 'OK')
+            if command == 'DEL':
+                return sum(1 for key in args if self._get(key) is not None and self.data.pop(key))
+            if command == 'EXPIRE':
+                entry = self._get(args[0])
+                if entry is None:
+                    return 0
+                self.data[args[0]] = (entry[0], time.time() + int(args[1]))
+                return 1
+            if command == 'TTL':
+                entry = self._get(args[0])
+                if entry is None:
+                    return -2
+                return -1 if entry[1] is None else int(entry[1] - time.time())
+            if command == 'DBSIZE':
+                return sum(1 for key in list(self.data) if self._get(key) is not None)
+            if command == 'FLUSHDB':
+                self.data.clear()
+                return ('simple', 'OK')
+            return ('error', f"ERR unknown command '{command}'")
+
+
+def encode_reply(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, tuple):
+        kind, text = reply
+        return (b'+' if kind == 'simple' else b'-') + text.encode('utf-8') + b'\r\n'
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+def read_command(reader):
+    """'*N' 배열 명령 읽기 (연결이 끊기면 None)"""
+    line = reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        return line.strip().split()  # 인라인 명령 (redis-cli / telnet)
+    args = []
+    for _ in range(int(line[1:])):
+        length = int(reader.readline()[1:])
+        args.append(reader.read(length + 2)[:-2])
+    return args
+
+
+def make_handler(store):
+    class RespStubHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            while True:
+                args = read_command(self.rfile)
+                if not args:
+                    return
+                reply = store.execute(args[0].decode('utf-8').upper(), args[1:])
+                self.wfile.write(encode_reply(reply))
+                self.wfile.flush()
+
+    return RespStubHandler
+
+
+class ThreadingRespServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def create_server(host='127.0.0.1', port=6380):
+    """스텁 서버 생성 (port=0 이면 빈 포트 자동 할당, server.server_address 로 확인)"""
+    return ThreadingRespServer((host, port), make_handler(RespStore()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Redis protocol stub server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6380)
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port)
+    print(f"RESP stub running on {args.host}:{server.server_address[1]}")
+    server.serve_forever()
@@ -0,0 +1,378 @@
+"""AI 응답 필터 규칙 (전체 응답: filter_response / 스트리밍 응답: StreamingResponseFilter)
+
+규칙은 모두 줄 단위로 적용된다.
+- 금지 표현 제거 (가격/인원 질문에서는 일부 허용)
+- 아이만 물어본 질문이면 성인/총액 줄 제거
+- 호이안 투어 맥락에서 래프팅 가격이 섞인 줄 제거
+- 번호/대시/볼드 항목 앞 줄바꿈
+"""
+import re
+from keyword_matcher import KeywordMatcher
+
+# 금지된 표현들 (더 포괄적으로)
+FORBIDDEN_PHRASES = [
+    '1인 기준', '성인 1인 기준', '기본 패키지', '포함 사항', '일반적으로',
+    '보통', '대체로', '추정', '예상', '대략', '기준으로', '기준:',
+    '1인당', '인당', '개인당', '1명당', '명당'
+]
+
+# 가격 질문에서 허용되는 표현들
+PRICE_ALLOWED_PHRASES = [
+    '1인당', '인당', '개인당', '1명당', '명당',  # 인원 관련
+    '기본 패키지', '일반적으로', '보통', '대체로',  # 설명 표현
+    '추정', '예상', '대략', '기준으로', '기준:'  # 가격 설명
+]
+
+# 아이/아동만 물어본 질문 판단용
+CHILD_ONLY_KEYWORDS = ['아이', '아동', '애기', '애', '유아', '소아']
+ADULT_MENTION_KEYWORDS = ['성인', '어른', '성인 3명', '성인3명']
+
+# 아이만 물어봤을 때 제거할 줄 패턴
+ADULT_LINE_PATTERNS = [
+    '성인 3명:', '성인3명:', '성인 \\d+명:',
+    '예약금 18만원', '18만원', '$1,092', '$1,587',
+    '총합은:', '총 가격은', '를 포함한 총'
+]
+# 성인 관련 문장 (줄바꿈까지 제거)
+ADULT_LINE_WORDS = ['성인', '총합', '총 가격']
+
+# 래프팅 가격 (호이안 맥락 오염 감지)
+RAFTING_PRICES = ['$340', '$49', '$438', '340달러', '49달러']
+
+# 어린이 관련 동의어들
+CHILDREN_KEYWORDS = ['아이', '아동', '애기', '어린이', '소아', '유아', '애들', '꼬마', '꼬마들', '애', '어린애', '작은애', '꼬맹이', '애기들']
+
+# 성인 관련 동의어들
+ADULT_KEYWORDS = ['성인', '어른', '어른들', '어른분', '성인분', '성년', '대인', '어른분들', '성인들']
+
+# 인원수 관련 표현들 (숫자 + 단위)
+PEOPLE_PATTERNS = [
+    # 기본 명수
+    *[str(i) + '명' for i in range(1, 21)],
+    # 한글 숫자
+    '한명', '두명', '세명', '네명', '다섯명', '여섯명', '일곱명', '여덟명', '아홉명', '열명',
+    # 기타 표현
+    '몇명', '몇 명', '몇분', '몇 분', '인원', '사람', '명수', '1인', '2인', '3인', '4인', '5인'
+]
+
+# 가격 관련 동의어들
+PRICE_KEYWORDS = [
+    '얼마', '가격', '비용', '요금', '돈', '값', '금액', '경비', '료금', '비',
+    '추가', '더하면', '플러스', '더해서', '포함해서', '합치면', '총', '전체',
+    '얼만', '얼마나', '얼마정도', '얼마쯤', '가격이', '비용이', '요금이',
+    '계산', '정산', '지불', '결제', '페이', '지불해야', '내야'
+]
+
+HOI_AN_FALLBACK = "죄송합니다. 호이안 투어 관련 정확한 정보를 다시 확인하여 안내해드리겠습니다."
+
+# 질문 분석용 어휘 (ai_service 의 메시지 자동자에도 포함됨)
+FILTER_VOCABULARIES = {
+    'child_only': CHILD_ONLY_KEYWORDS,
+    'adult_mention': ADULT_MENTION_KEYWORDS,
+    'children': CHILDREN_KEYWORDS,
+    'adult': ADULT_KEYWORDS,
+    'people': PEOPLE_PATTERNS,
+    'price_question': PRICE_KEYWORDS,
+}
+FILTER_MATCHER = KeywordMatcher(FILTER_VOCABULARIES)
+
+
+def is_child_only_question(user_message, hits=None):
+    """아이/아동만 물어보고 성인은 언급하지 않은 질문인지 (hits: FILTER_VOCABULARIES 를 포함한 매칭 결과)"""
+    if hits is None:
+        hits = FILTER_MATCHER.scan(user_message)
+    return hits.has('child_only') and not hits.has('adult_mention')
+
+
+def phrases_to_remove(user_message, hits=None):
+    """이 질문의 응답에서 제거할 금지 표현 목록"""
+    if hits is None:
+        hits = FILTER_MATCHER.scan(user_message)
+    is_children_question = hits.has('children')
+    is_adult_question = hits.has('adult')
+    is_people_count_question = hits.has('people')
+    is_price_question = hits.has('price_question')
+
+    # 가격 관련 질문에서는 일부 금지 표현 허용 (모든 투어/호텔/표에 적용)
+    if is_price_question and (is_children_question or is_adult_question or is_people_count_question):
+        return [phrase for phrase in FORBIDDEN_PHRASES if phrase not in PRICE_ALLOWED_PHRASES]
+    return list(FORBIDDEN_PHRASES)
+
+
+def is_adult_line(line):
+    """아이만 물어본 질문에서 제거할 줄 (성인 가격 / 총액)"""
+    return any(re.search(pattern, line) for pattern in ADULT_LINE_PATTERNS + ADULT_LINE_WORDS)
+
+
+def is_contaminated_line(line):
+    """래프팅 가격이 들어간 줄"""
+    return any(price in line for price in RAFTING_PRICES)
+
+
+def has_rafting_contamination(response):
+    return (
+        '$340' in response or '340달러' in response or
+        '$49' in response or '49달러' in response or
+        ('$438' in response and '$340' in response)  # 래프팅 계산 결과
+    )
+
+
+def warn_phrase(phrase):
+    try:
+        print(f"Warning: Removing forbidden phrase '{phrase}' from response")
+    except UnicodeEncodeError:
+        print("Warning: Removing forbidden phrase from response")
+
+
+def clean_punctuation(text):
+    """금지 표현을 지운 뒤 남은 연속 공백 / 구두점 정리"""
+    text = text.replace('  ', ' ').replace(' :', ':').replace(' -', ' ')
+    return text.replace('- ', '').replace(': ', ' ')
+
+
+def remove_phrases(text, phrases):
+    """금지 표현 제거 (표현 하나를 지울 때마다 구두점 / 문장 시작 정리)
+
+    정리 결과가 다음 표현 매칭에 영향을 주므로 ("보통 ... 기준: " 은 정리 후 "기준 " 이 되어 남음)
+    표현 목록 순서대로 하나씩 지운다.
+    """
+    for phrase in phrases:
+        if phrase in text:
+            warn_phrase(phrase)
+
+            # 직접적으로 금지된 표현을 제거
+            text = clean_punctuation(text.replace(phrase, '').strip())
+
+            # 문장 시작 부분의 잘못된 구두점 제거
+            while text.startswith((':', '-', ' ', ',')):
+                text = text[1:].strip()
+    return text
+
+
+def break_list_items(text):
+    """자동 줄바꿈 처리 - 번호가 있는 리스트나 정렬된 정보"""
+    # 1. 숫자 + 점 + 공백 패턴 (1. 2. 3.)
+    text = re.sub(r'(\d+\.\s)', r'\n\1', text)
+
+    # 2. 숫자 + 괄호 + 공백 패턴 (1) 2) 3))
+    text = re.sub(r'(\d+\)\s)', r'\n\1', text)
+
+    # 3. **내용**: 패턴 (볼드체로 구분된 항목들)
+    text = re.sub(r'(\*\*[^*]+\*\*:)', r'\n\1', text)
+
+    # 4. - 항목들 (대시로 시작하는 리스트)
+    text = re.sub(r'(\s-\s)', r'\n- ', text)
+    return text
+
+
+def tidy(text):
+    """빈 문장 정리"""
+    return text.replace('..', '.').replace('  ', ' ')
+
+
+def filter_response(response, user_message='', hoi_an_context=False, hits=None):
+    """전체 응답에 필터 규칙 적용 (validate_and_fix_response, StreamingResponseFilter 와 같은 결과)"""
+    # 사용자 질문 분석 - 정확히 물어본 것만 답변하도록 필터링
+    # "아이3명"만 물어봤는데 성인 정보가 포함되어 있으면 해당 줄 제거
+    if user_message and is_child_only_question(user_message, hits):
+        filtered_lines = []
+        for line in response.split('\n'):
+            if not any(re.search(pattern, line) for pattern in ADULT_LINE_PATTERNS):
+                filtered_lines.append(line)
+            else:
+                try:
+                    print("Warning: Removing adult info from child-only question")
+                except UnicodeEncodeError:
+                    print("Warning: Removing adult info")
+        response = '\n'.join(filtered_lines)
+
+        # 성인 관련 문장 제거
+        for word in ADULT_LINE_WORDS:
+            response = re.sub(r'[^\n]*' + word + r'[^\n]*\n?', '', response)
+
+    # 래프팅 가격 오염 감지 및 차단
+    if hoi_an_context and has_rafting_contamination(response):
+        print("CRITICAL: Detected rafting price contamination in Hoi An context!")
+        # 래프팅 가격 정보가 포함된 문장들을 제거
+        filtered_lines = []
+        for line in response.split('\n'):
+            if not is_contaminated_line(line):
+                filtered_lines.append(line)
+            else:
+                print(f"Removing contaminated line (length: {len(line)})")
+
+        response = '\n'.join(filtered_lines).strip()
+
+        if not response.strip():
+            response = HOI_AN_FALLBACK
+
+    # 금지된 표현 제거 (모든 가격 질문에서는 완화 - 어린이, 성인, 인원수 관련)
+    response = remove_phrases(response, phrases_to_remove(user_message, hits))
+
+    # 자동 줄바꿈 처리 - 번호가 있는 리스트나 정렬된 정보
+    response = break_list_items(response)
+
+    # 첫 줄 빈줄 제거 및 연속 줄바꿈 정리
+    response = response.strip()
+    response = re.sub(r'\n\n+', '\n\n', response)  # 3개 이상 연속 줄바꿈을 2개로
+    response = re.sub(r'^\n', '', response)  # 맨 앞 줄바꿈 제거
+
+    # 빈 문장 정리
+    return tidy(response).strip()
+
+
+class StreamingResponseFilter:
+    """토큰 스트림에 validate_and_fix_response 규칙을 적용
+
+    feed() 로 받은 조각을 줄 단위로 처리해 내보낼 텍스트를 반환하고,
+    마지막에 flush() 로 남은 부분을 처리한다.
+    줄을 통째로 지우는 규칙(아이 질문 / 호이안 맥락)이 없으면
+    줄이 끝나기 전에도 규칙에 걸릴 수 없는 앞부분은 바로 내보낸다.
+
+    호이안 맥락의 래프팅 가격 줄은 전체 응답 기준(has_rafting_contamination)과 같게 지운다:
+    $340 / $49 처럼 오염으로 판단하는 가격이 나오기 전까지 $438 같은 가격 줄과 그 뒤 줄은
+    보류했다가, 오염이 확인되면 가격 줄을 지우고 끝까지 확인되지 않으면 그대로 내보낸다.
+    이미 내보낸 텍스트는 고칠 수 없으므로, 금지 표현 뒤 구두점 정리는
+    전체 응답이 아니라 처음 금지 표현이 나온 지점부터 적용된다
+    (전체 응답은 표현 목록 순서대로 지울 때마다 응답 전체를 정리 - filter_response).
+    """
+
+    # 줄 중간에서 끊을 때 남겨둘 글자 수 (가장 긴 금지 표현 + 여유)
+    HOLDBACK = max(len(phrase) for phrase in FORBIDDEN_PHRASES) + 2
+    # 끊는 지점 바로 앞에 오면 안 되는 글자 (공백/구두점 정리, 목록 패턴에 걸칠 수 있음)
+    UNSAFE_TAIL = set(' \t-:.)*0123456789')
+
+    def __init__(self, user_message, hoi_an_context=False, hits=None):
+        self.phrases = phrases_to_remove(user_message, hits)
+        self.child_only = is_child_only_question(user_message, hits)
+        self.hoi_an_context = hoi_an_context
+
+        self._buffer = ''  # 아직 처리하지 않은 현재 줄
+        self._held = []  # 오염 여부가 정해질 때까지 보류한 줄 [(줄, 줄바꿈 여부)]
+        self._started = False  # 내용이 있는 글자를 내보냈는지
+        self._newlines = 0  # 마지막으로 내보낸 연속 줄바꿈 수
+        self.removed_lines = 0
+        self.cleanup = False  # 금지 표현을 한 번 지운 뒤로는 구두점 정리를 계속 적용
+        self.contaminated = False
+        self.raw = ''  # 필터 전 원문
+        self.text = ''  # 필터 후 내보낸 전체 텍스트
+
+    def _drops_whole_lines(self):
+        return self.child_only or self.hoi_an_context
+
+    def _take_line(self, line, newline=True):
+        """줄 하나에 줄 단위 규칙 적용 -> 지금 내보낼 텍스트 (지우거나 보류하면 '')"""
+        if self.child_only and is_adult_line(line):
+            try:
+                print("Warning: Removing adult info from child-only question")
+            except UnicodeEncodeError:
+                print("Warning: Removing adult info")
+            self.removed_lines += 1
+            return ''
+        if self.hoi_an_context:
+            if not self.contaminated and has_rafting_contamination(line):
+                print("CRITICAL: Detected rafting price contamination in Hoi An context!")
+                self.contaminated = True
+                held, self._held = self._held, []
+                return ''.join(self._take_line(*item) for item in held) + self._take_line(line, newline)
+            if self.contaminated and is_contaminated_line(line):
+                print(f"Removing contaminated line (length: {len(line)})")
+                self.removed_lines += 1
+                return ''
+            if not self.contaminated and (self._held or is_contaminated_line(line)):
+                self._held.append((line, newline))
+                return ''
+        return self._emit(line, newline)
+
+    def _emit(self, line, newline):
+        return self._write(self._transform(line) + ('\n' if newline else ''))
+
+    def _transform(self, segment):
+        if self.cleanup:
+            segment = clean_punctuation(segment)
+        # 전체 응답과 같이 표현 목록 순서대로 지우고 지울 때마다 정리
+        for phrase in self.phrases:
+            if phrase in segment:
+                warn_phrase(phrase)
+                segment = clean_punctuation(segment.replace(phrase, ''))
+                self.cleanup = True
+        if self.cleanup:
+            # 이미 내보낸 공백과 이어지는 공백
+            if self.text.endswith(' ') and segment.startswith(' '):
+                segment = segment[1:]
+        segment = break_list_items(segment)
+        return tidy(segment)
+
+    def _write(self, text):
+        """줄바꿈 정리(맨 앞 빈 줄 제거, 3개 이상 연속 줄바꿈은 2개로) 후 내보낼 텍스트"""
+        out = []
+        for part in re.split(r'(\n)', text):
+            if part == '\n':
+                if self._started and self._newlines < 2:
+                    out.append(part)
+                    self._newlines += 1
+            elif part:
+                if not self._started:
+                    # 문장 시작 부분의 잘못된 구두점 제거
+                    part = part.lstrip(':-, \t')
+                    if not part:
+                        continue
+                    self._started = True
+                out.append(part)
+                self._newlines = 0
+        written = ''.join(out)
+        self.text += written
+        return written
+
+    def _safe_cut(self):
+        """현재 줄에서 지금 내보내도 되는 길이 (규칙에 걸칠 수 있는 뒷부분은 남김)"""
+        cut = len(self._buffer) - self.HOLDBACK
+        while cut > 0 and self._buffer[cut - 1] in self.UNSAFE_TAIL:
+            cut -= 1
+        # 끊는 지점에 걸친 금지 표현은 통째로 남김
+        for phrase in self.phrases:
+            start = self._buffer.find(phrase, max(cut - len(phrase) + 1, 0))
+            if 0 <= start < cut < start + len(phrase):
+                cut = start
+        # 닫히지 않은 **볼드** 는 남김
+        if cut > 0 and self._buffer[:cut].count('**') % 2 == 1:
+            cut = self._buffer.rfind('**', 0, cut)
+        return max(cut, 0)
+
+    def feed(self, chunk):
+        """토큰 조각 입력 -> 지금 내보낼 텍스트"""
+        if not chunk:
+            return ''
+        self.raw += chunk
+        self._buffer += chunk
+        out = []
+
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            out.append(self._take_line(line))
+
+        # 줄 단위 규칙이 없을 때만 줄 앞부분을 먼저 내보냄 (_take_line 은 그대로 통과시키는 경우)
+        if not self._drops_whole_lines():
+            cut = self._safe_cut()
+            if cut > 0:
+                out.append(self._emit(self._buffer[:cut], False))
+                self._buffer = self._buffer[cut:]
+
+        return ''.join(out)
+
+    def flush(self):
+        """스트림 종료 -> 남은 텍스트"""
+        out = []
+        if self._buffer:
+            out.append(self._take_line(self._buffer, False))
+        self._buffer = ''
+
+        # 끝까지 오염이 확인되지 않았으면 보류한 줄은 그대로
+        held, self._held = self._held, []
+        for line, newline in held:
+            out.append(self._emit(line, newline))
+
+        # 래프팅 가격 줄을 지우고 남은 내용이 없으면 안내 문구
+        if self.contaminated and not self.text.strip():
+            out.append(self._write(HOI_AN_FALLBACK))
+        return ''.join(out)
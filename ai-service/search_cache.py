@@ -0,0 +1,139 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from singleflight import SingleFlight
+
+
+class SearchCache:
+    """카탈로그 검색 결과 캐시 (TTL 캐시 + single-flight + stale-while-revalidate)
+
+    - 캐시 미스가 동시에 여러 개 나도 같은 키의 DB 조회는 한 번만 실행되고,
+      나머지 요청은 그 결과를 기다렸다가 공유한다 (stats 의 coalesced)
+    - 만료된 값은 cache.stale_ttl 이내라면 즉시 반환하고 백그라운드에서 새로 조회
+      (조회가 실패하면 stale_ttl 이 지날 때까지 마지막 정상 값을 계속 사용)
+    - 빈 결과는 negative_ttl 로 짧게 캐시 (stale 기간 없음)
+    - get_or_load_async: 로더가 코루틴 함수인 asyncio 버전 (같은 캐시/통계 공유)
+    """
+
+    def __init__(self, cache, negative_ttl=30, refresh_workers=2):
+        self.cache = cache
+        self.negative_ttl = negative_ttl
+        self.flight = SingleFlight()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='cache-refresh')
+        self._refreshing = set()
+        self._refresh_tasks = set()  # 실행 중인 비동기 갱신 태스크 (GC 방지)
+        self._lock = threading.Lock()
+
+        self.stale_served = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.negative_stores = 0
+
+    def _store(self, cache_key, results):
+        if results:
+            self.cache.set(cache_key, results)
+        else:
+            # 빈 결과는 stale 로 내보내지 않음 (negative_ttl 이 지나면 바로 다시 조회)
+            self.cache.set(cache_key, results, ttl=self.negative_ttl, stale_ttl=0)
+            with self._lock:
+                self.negative_stores += 1
+
+    def _refresh(self, cache_key, loader):
+        try:
+            self._store(cache_key, self.flight.do(cache_key, loader))
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+            print(f"Background cache refresh error (serving stale): {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(cache_key)
+
+    def _schedule_refresh(self, cache_key, loader):
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+            self.refreshes += 1
+        self._executor.submit(self._refresh, cache_key, loader)
+
+    def get_or_load(self, cache_key, loader, label='results'):
+        cached, state = self.cache.get_with_state(cache_key)
+        if state != 'miss':
+            if state == 'stale':
+                with self._lock:
+                    self.stale_served += 1
+                self._schedule_refresh(cache_key, loader)
+            try:
+                print(f"Using {'stale ' if state == 'stale' else ''}cached {label}")
+            except UnicodeEncodeError:
+                print("Using cached results")
+            return cached
+
+        def load():
+            # 앞선 조회가 방금 끝났으면 그 결과 사용 (미스는 get_with_state 에서 이미 집계)
+            cached = self.cache.peek(cache_key)
+            if cached is not None:
+                return cached
+            results = loader()
+            self._store(cache_key, results)
+            return results
+
+        return self.flight.do(cache_key, load)
+
+    async def _refresh_async(self, cache_key, loader):
+        try:
+            self._store(cache_key, await self.flight.do_async(cache_key, loader))
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+            print(f"Background cache refresh error (serving stale): {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(cache_key)
+
+    def _schedule_refresh_async(self, cache_key, loader):
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+            self.refreshes += 1
+        task = asyncio.get_running_loop().create_task(self._refresh_async(cache_key, loader))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def get_or_load_async(self, cache_key, loader, label='results'):
+        cached, state = self.cache.get_with_state(cache_key)
+        if state != 'miss':
+            if state == 'stale':
+                with self._lock:
+                    self.stale_served += 1
+                self._schedule_refresh_async(cache_key, loader)
+            try:
+                print(f"Using {'stale ' if state == 'stale' else ''}cached {label}")
+            except UnicodeEncodeError:
+                print("Using cached results")
+            return cached
+
+        async def load():
+            cached = self.cache.peek(cache_key)
+            if cached is not None:
+                return cached
+            results = await loader()
+            self._store(cache_key, results)
+            return results
+
+        return await self.flight.do_async(cache_key, load)
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats['single_flight'] = self.flight.stats()
+        with self._lock:
+            stats.update({
+                'stale_served': self.stale_served,
+                'background_refreshes': self.refreshes,
+                'refresh_errors': self.refresh_errors,
+                'negative_stores': self.negative_stores,
+            })
+        return stats
@@ -0,0 +1,160 @@
+import heapq
+import math
+import re
+import threading
+
+# 한글 연속 구간 / 영문·숫자 연속 구간
+TOKEN_RUN_PATTERN = re.compile(r'[가-힣]+|[a-z0-9]+')
+
+
+def tokenize(text):
+    """한글은 2글자 단위 바이그램(1글자 구간은 그대로), 영문/숫자는 단어 단위 토큰"""
+    tokens = []
+    for run in TOKEN_RUN_PATTERN.findall(text.lower()):
+        if run[0] >= '가' and len(run) > 1:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+class InvertedIndex:
+    """호텔/투어 텍스트용 역색인 (BM25 랭킹, top-k, 행 단위 증분 갱신)
+
+    검색어 하나는 LIKE '%term%' 과 같은 의미로 매칭한다:
+    검색어의 토큰을 모두 가진 문서만 후보로 뽑고, 후보에 대해서만 부분 문자열을 확인.
+    따라서 검색 비용은 카탈로그 크기 x 검색어 수가 아니라 매칭 문서 수에 비례한다.
+    """
+
+    def __init__(self, fields, weights=None, k1=1.2, b=0.75):
+        self.fields = fields
+        self.weights = weights or {}
+        self.k1 = k1
+        self.b = b
+
+        self._lock = threading.RLock()
+        self._postings = {}  # token -> {doc_id: 가중 tf}
+        self._char_tokens = {}  # 글자 -> 그 글자를 포함한 토큰 (부분 문자열 검색어의 후보 토큰)
+        self._docs = {}  # doc_id -> (검색용 소문자 텍스트, 문서 길이, 정렬 키)
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _doc_terms(self, row):
+        weighted = {}
+        length = 0
+        for field in self.fields:
+            weight = self.weights.get(field, 1.0)
+            for token in tokenize(row.get(field) or ''):
+                weighted[token] = weighted.get(token, 0.0) + weight
+                length += 1
+        return weighted, length
+
+    def add(self, doc_id, row, order_key=None):
+        """문서 추가 (이미 있으면 교체)"""
+        with self._lock:
+            self.remove(doc_id)
+            text = '\n'.join((row.get(field) or '').lower() for field in self.fields)
+            weighted, length = self._doc_terms(row)
+            for token, tf in weighted.items():
+                posting = self._postings.get(token)
+                if posting is None:
+                    posting = self._postings[token] = {}
+                    for char in set(token):
+                        self._char_tokens.setdefault(char, set()).add(token)
+                posting[doc_id] = tf
+            self._docs[doc_id] = (text, length, order_key if order_key is not None else doc_id)
+            self._total_length += length
+
+    def remove(self, doc_id):
+        with self._lock:
+            doc = self._docs.pop(doc_id, None)
+            if doc is None:
+                return
+            text, length, _ = doc
+            self._total_length -= length
+            for token in set(tokenize(text)):
+                posting = self._postings.get(token)
+                if posting is not None:
+                    posting.pop(doc_id, None)
+                    if not posting:
+                        del self._postings[token]
+                        for char in set(token):
+                            tokens = self._char_tokens[char]
+                            tokens.discard(token)
+                            if not tokens:
+                                del self._char_tokens[char]
+
+    def _term_slots(self, term):
+        """검색어 -> 토큰 슬롯 목록 (각 슬롯의 토큰 중 하나는 문서에 있어야 함)"""
+        slots = []
+        for run in TOKEN_RUN_PATTERN.findall(term):
+            if run[0] >= '가' and len(run) > 1:
+                for i in range(len(run) - 1):
+                    bigram = run[i:i + 2]
+                    slots.append([bigram] if bigram in self._postings else [])
+            else:
+                # 한글 1글자, 영문/숫자는 단어 일부일 수 있으므로 포함 토큰을 찾음
+                # (검색어 글자 중 포함 토큰이 가장 적은 글자의 토큰만 확인)
+                char_tokens = [self._char_tokens.get(char, ()) for char in set(run)]
+                candidates = min(char_tokens, key=len)
+                slot = [run] if run in self._postings else []
+                slot.extend(token for token in candidates if run in token and token != run)
+                slots.append(slot)
+        return slots
+
+    def _candidates(self, slots):
+        candidates = None
+        for slot in sorted(slots, key=lambda s: sum(len(self._postings[t]) for t in s)):
+            docs = set()
+            for token in slot:
+                docs.update(self._postings[token])
+            candidates = docs if candidates is None else candidates & docs
+            if not candidates:
+                return set()
+        return candidates or set()
+
+    def search(self, query_terms, k=10):
+        """검색어 목록 중 하나라도 포함한 문서를 BM25 점수순으로 최대 k개 반환 -> [(doc_id, score)]"""
+        with self._lock:
+            if not self._docs:
+                return []
+            n_docs = len(self._docs)
+            avg_length = self._total_length / n_docs if n_docs else 0.0
+            scores = {}
+
+            for term in dict.fromkeys(t.lower().strip() for t in query_terms if t and t.strip()):
+                slots = self._term_slots(term)
+                if not slots:
+                    continue
+                for doc_id in self._candidates(slots):
+                    text, length, _ = self._docs[doc_id]
+                    if term not in text:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length) if avg_length else self.k1
+                    score = 0.0
+                    for slot in slots:
+                        for token in slot:
+                            tf = self._postings[token].get(doc_id)
+                            if tf:
+                                df = len(self._postings[token])
+                                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                                score += idf * tf * (self.k1 + 1) / (tf + norm)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+            top = heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], self._docs[item[0]][2]))
+            return top
+
+
+def rank_rows(rows, fields, weights, query_terms, k=10):
+    """DB 에서 가져온 후보 행을 검색어 기준 BM25 로 다시 정렬해 최대 k개 반환 (동점은 원래 순서)"""
+    index = InvertedIndex(fields, weights)
+    for position, row in enumerate(rows):
+        index.add(position, row)
+    ranked = [position for position, _ in index.search(query_terms, k)]
+    # 토큰이 없는 검색어(기호 등)로만 매칭된 행은 원래 순서대로 뒤에 채움
+    if len(ranked) < k:
+        seen = set(ranked)
+        ranked.extend(p for p in range(len(rows)) if p not in seen)
+    return [rows[position] for position in ranked[:k]]
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """같은 키에 대한 동시 호출을 하나로 합침
+
+    처음 들어온 호출만 fn 을 실행하고, 실행 중에 같은 키로 들어온 호출은
+    그 결과(또는 예외)를 기다렸다가 그대로 받는다.
+    do_async 는 같은 동작의 asyncio 버전 (한 이벤트 루프 안에서 합침).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}  # key -> asyncio.Task
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, fn):
+        """fn 은 코루틴 함수. 실행 중인 같은 키 호출이 있으면 그 결과를 기다림
+
+        fn 은 별도 태스크로 실행하고 처음 호출도 shield 로 기다린다.
+        먼저 들어온 호출이 취소돼도 (스트리밍 클라이언트 연결 끊김 등) 실행은 계속되어
+        같은 키를 기다리는 다른 요청은 결과를 그대로 받는다.
+        """
+        task = self._async_calls.get(key)
+        if task is not None:
+            with self._lock:
+                self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._async_calls[key] = task
+            task.add_done_callback(lambda done: self._finish_async(key, done))
+            with self._lock:
+                self.executions += 1
+        return await asyncio.shield(task)
+
+    def _finish_async(self, key, task):
+        if self._async_calls.get(key) is task:
+            del self._async_calls[key]
+        if not task.cancelled():
+            task.exception()  # 기다리는 호출이 없어도 경고가 남지 않도록
+
+    def stats(self):
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls) + len(self._async_calls),
+            }
@@ -0,0 +1,116 @@
+"""동의어 그래프 (synonyms.json)
+
+설정 파일의 {대표어: [동의어, ...]} 를 한 번 컴파일해
+- expand(): 단어의 동의어 목록 (사전 계산, O(1) 조회)
+- term_id() / canonical(): 같은 그룹의 단어를 하나의 그룹 id / 대표어로 (벡터 검색의 개념 토큰용)
+을 제공한다. 서로의 동의어 목록에 들어 있는 그룹(호텔/리조트 등)은 하나의 그룹으로 합친다.
+"""
+import json
+import os
+import threading
+
+SYNONYMS_FILE = os.getenv('SYNONYMS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'synonyms.json'))
+
+
+class SynonymGraph:
+    """양방향 동의어 그래프 (용어 -> 그룹 id -> 대표어)"""
+
+    def __init__(self, groups):
+        self.groups = {head: list(values) for head, values in groups.items()}
+        self._expansions = {}  # 소문자 용어 -> 동의어 튜플
+        self._term_ids = {}  # 소문자 용어 -> 그룹 id
+        self._canonical_names = []  # 그룹 id -> 대표어
+
+        terms = []
+        for head, values in self.groups.items():
+            terms.append(head.lower())
+            terms.extend(value.lower() for value in values)
+        for term in dict.fromkeys(terms):
+            self._expansions[term] = tuple(self._expand(term))
+        self._build_term_ids()
+
+    def _expand(self, word_lower):
+        """단어의 동의어 (직접 매칭 -> 역방향 매칭 순, 중복/원본 제외)"""
+        synonyms = []
+        for head, values in self.groups.items():
+            if head.lower() == word_lower:
+                synonyms.extend(values)
+        for head, values in self.groups.items():
+            if word_lower in [value.lower() for value in values]:
+                synonyms.append(head)
+                synonyms.extend(values)
+
+        unique_synonyms = []
+        for synonym in synonyms:
+            if synonym.lower() != word_lower and synonym not in unique_synonyms:
+                unique_synonyms.append(synonym)
+        return unique_synonyms
+
+    def _build_term_ids(self):
+        # 같은 용어를 공유하는 그룹끼리 합침 (union-find), 대표어는 설정 파일에서 먼저 나온 그룹의 대표어
+        parent = {}
+
+        def find(term):
+            while parent[term] != term:
+                parent[term] = parent[parent[term]]
+                term = parent[term]
+            return term
+
+        for head, values in self.groups.items():
+            head_lower = head.lower()
+            parent.setdefault(head_lower, head_lower)
+            for value in values:
+                value_lower = value.lower()
+                parent.setdefault(value_lower, value_lower)
+                root_head, root_value = find(head_lower), find(value_lower)
+                if root_head != root_value:
+                    parent[root_value] = root_head
+
+        root_ids = {}
+        for head in self.groups:
+            root = find(head.lower())
+            if root not in root_ids:
+                root_ids[root] = len(self._canonical_names)
+                self._canonical_names.append(head)
+        for term in parent:
+            self._term_ids[term] = root_ids[find(term)]
+
+    def __len__(self):
+        return len(self._term_ids)
+
+    def expand(self, word):
+        """단어의 동의어 목록 (없으면 빈 목록)"""
+        return list(self._expansions.get(word.lower(), ()))
+
+    def term_id(self, term):
+        """용어의 그룹 id (그래프에 없으면 None)"""
+        return self._term_ids.get(term.lower().strip())
+
+    def canonical(self, term):
+        """용어의 대표어 (그래프에 없으면 그대로)"""
+        term_id = self.term_id(term)
+        return term if term_id is None else self._canonical_names[term_id]
+
+
+def load_synonyms(path=SYNONYMS_FILE):
+    """설정 파일에서 동의어 그래프 생성 (읽기 실패 시 빈 그래프)"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            groups = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Synonyms load error ({path}): {e}")
+        groups = {}
+    return SynonymGraph(groups)
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+def get_synonym_graph():
+    """프로세스 전역 동의어 그래프 (최초 호출 시 적재)"""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = load_synonyms()
+    return _graph
@@ -0,0 +1,58 @@
+"""투어명 색인 (match_tour_names 용)
+
+투어명과 별칭을 소문자 + 공백/하이픈 제거로 정규화해 미리 색인한다.
+- 메시지에 투어명/별칭이 들어 있는지: Aho-Corasick 자동자로 메시지를 한 번 훑음
+- 메시지가 투어명의 일부인지 ("래프" -> "래프팅"): 투어명의 모든 부분 문자열 사전 조회
+둘 다 메시지 길이에 비례하는 시간으로 투어 id 를 찾는다.
+"""
+from keyword_matcher import KeywordMatcher
+
+
+def normalize_name(text):
+    return (text or '').lower().replace(' ', '').replace('-', '')
+
+
+class TourNameIndex:
+    """정규화된 투어명 / 별칭 -> 투어 id"""
+
+    def __init__(self, tours, aliases=None):
+        # tours: 투어 행 목록 (id 가 없으면 목록 순서를 id 로 사용)
+        # aliases: 투어명 -> 별칭 목록 (메시지에 들어 있을 때만 매칭)
+        aliases = aliases or {}
+        self.tours = {}  # 투어 id -> 행
+        self._name_ids = {}  # 정규화된 이름/별칭 -> [투어 id]
+        self._substring_ids = {}  # 정규화된 투어명의 부분 문자열 -> {투어 id}
+
+        for position, tour in enumerate(tours):
+            name = tour.get('tour_name')
+            if not name:
+                continue
+            tour_id = tour.get('id', position)
+            self.tours[tour_id] = tour
+
+            normalized = normalize_name(name)
+            for term in [normalized] + [normalize_name(alias) for alias in aliases.get(name, ())]:
+                if term and tour_id not in self._name_ids.setdefault(term, []):
+                    self._name_ids[term].append(tour_id)
+            for start in range(len(normalized)):
+                for end in range(start + 1, len(normalized) + 1):
+                    self._substring_ids.setdefault(normalized[start:end], set()).add(tour_id)
+
+        self._matcher = KeywordMatcher({'name': list(self._name_ids)})
+
+    def __len__(self):
+        return len(self.tours)
+
+    def match(self, message):
+        """메시지에 언급된 투어 id 목록 (색인 순서)"""
+        normalized = normalize_name(message)
+        if not normalized:
+            return []
+        matched = set(self._substring_ids.get(normalized, ()))
+        for term in self._matcher.scan(normalized).keywords('name'):
+            matched.update(self._name_ids[term])
+        return [tour_id for tour_id in self.tours if tour_id in matched]
+
+    def match_names(self, message):
+        """메시지에 언급된 투어명 목록"""
+        return [self.tours[tour_id]['tour_name'] for tour_id in self.match(message)]
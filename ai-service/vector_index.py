@@ -0,0 +1,174 @@
+"""호텔/투어 유사도 검색 (로컬 벡터 색인)
+
+키워드 검색이 놓치는 바꿔 말하기("애들이랑 물놀이" -> 래프팅)를 위해
+텍스트를 해시된 글자 n-gram 블록 + 동의어 그룹 블록 벡터로 만들어 (외부 모델 없음)
+numpy 연속 행렬에 한 행씩 저장하고, 메시지 벡터와의 유사도를
+행렬-벡터 곱 한 번으로 계산해 상위 k 개를 고른다.
+두 블록은 따로 정규화하므로 긴 설명의 n-gram 이 동의어 성분을 묻어버리지 않는다
+(점수 = n-gram 코사인과 동의어 그룹 코사인의 가중 평균).
+numpy 가 없으면 VECTOR_SEARCH_AVAILABLE 이 False 이고 키워드 검색만 사용한다.
+"""
+import math
+import re
+import threading
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from keyword_matcher import KeywordMatcher
+from synonyms import get_synonym_graph
+
+VECTOR_SEARCH_AVAILABLE = np is not None
+
+VECTOR_DIM = 2048  # n-gram 해시 공간 크기
+CONCEPT_DIM = 256  # 동의어 그룹 블록 크기 (행당 float32 x (VECTOR_DIM + CONCEPT_DIM))
+NGRAM_SIZES = (2, 3)
+CONCEPT_SHARE = 0.5  # 메시지에 동의어 그룹이 있을 때 점수 중 그룹 코사인 비중 (물놀이 / 래프팅 이 같은 그룹)
+MIN_CONCEPT_LENGTH = 2  # 한 글자 동의어("돈", "값")는 다른 단어 안에서 잘못 매칭되므로 제외
+WORD_PATTERN = re.compile(r'[가-힣]+|[a-z0-9]+')
+
+
+class HashingVectorizer:
+    """텍스트 -> float32 벡터 ([단어 경계 포함 글자 n-gram 블록 | 동의어 그룹 블록], 블록별 단위 벡터)"""
+
+    def __init__(self, dim=VECTOR_DIM, concept_dim=CONCEPT_DIM, graph=None):
+        self.ngram_dim = dim
+        self.dim = dim + concept_dim
+        self.graph = graph or get_synonym_graph()
+        terms = []
+        for head, values in self.graph.groups.items():
+            terms.extend(term for term in [head] + list(values) if len(term) >= MIN_CONCEPT_LENGTH)
+        self._concepts = KeywordMatcher({'term': terms})
+
+    def _features(self, text, weight, counts, concepts):
+        text = (text or '').lower()
+        for word in WORD_PATTERN.findall(text):
+            padded = f'<{word}>'
+            for size in NGRAM_SIZES:
+                for i in range(len(padded) - size + 1):
+                    gram = padded[i:i + size]
+                    counts[gram] = counts.get(gram, 0.0) + weight
+        for term in self._concepts.scan(text).keywords('term'):
+            term_id = self.graph.term_id(term)
+            if term_id is not None:
+                concepts[term_id] = max(concepts.get(term_id, 0.0), weight)
+
+    def _block(self, vector, start, size, counts):
+        """counts 를 vector[start:start + size] 에 해시해 넣고 단위 길이로 (특징이 없으면 False)"""
+        block = vector[start:start + size]
+        for feature, count in counts.items():
+            hashed = zlib.crc32(str(feature).encode('utf-8'))
+            sign = 1.0 if (hashed // size) % 2 == 0 else -1.0
+            # 긴 설명에서 반복되는 단어가 벡터를 독차지하지 않도록 로그 스케일
+            block[hashed % size] += sign * (1.0 + math.log(count))
+        norm = float(np.linalg.norm(block))
+        if norm == 0.0:
+            return False
+        block /= norm
+        return True
+
+    def transform(self, fields, query=False):
+        """[(텍스트, 가중치 >= 1)] -> 블록별 단위 벡터 (특징이 없으면 None)
+
+        query 면 두 블록에 (1 - CONCEPT_SHARE, CONCEPT_SHARE) 를 곱해 문서 벡터와의 곱이
+        블록별 코사인의 가중 평균이 되게 한다 (메시지에 동의어 그룹이 없으면 n-gram 코사인 그대로).
+        """
+        counts = {}
+        concepts = {}
+        for text, weight in fields:
+            self._features(text, weight, counts, concepts)
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        has_ngrams = self._block(vector, 0, self.ngram_dim, counts)
+        has_concepts = self._block(vector, self.ngram_dim, self.dim - self.ngram_dim, concepts)
+        if not has_ngrams and not has_concepts:
+            return None
+        if query and has_ngrams and has_concepts:
+            vector[:self.ngram_dim] *= 1.0 - CONCEPT_SHARE
+            vector[self.ngram_dim:] *= CONCEPT_SHARE
+        return vector
+
+
+class VectorIndex:
+    """호텔/투어 벡터 색인 (연속 행렬, 행 단위 증분 갱신 - InvertedIndex 와 같은 add/remove)"""
+
+    def __init__(self, fields, weights=None, vectorizer=None, initial_capacity=64):
+        self.fields = fields
+        self.weights = weights or {}
+        self.vectorizer = vectorizer or HashingVectorizer()
+
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((initial_capacity, self.vectorizer.dim), dtype=np.float32)
+        self._doc_ids = []  # 행 번호 -> doc_id
+        self._order_keys = []  # 행 번호 -> 정렬 키 (같은 점수일 때 순서)
+        self._rows = {}  # doc_id -> 행 번호
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    def add(self, doc_id, row, order_key=None):
+        """문서 추가 (이미 있으면 그 행을 덮어씀)"""
+        vector = self.vectorizer.transform(
+            [(row.get(field), self.weights.get(field, 1.0)) for field in self.fields]
+        )
+        with self._lock:
+            if vector is None:
+                self.remove(doc_id)
+                return
+            position = self._rows.get(doc_id)
+            if position is None:
+                position = len(self._doc_ids)
+                if position == self._matrix.shape[0]:
+                    grown = np.zeros((position * 2, self._matrix.shape[1]), dtype=np.float32)
+                    grown[:position] = self._matrix
+                    self._matrix = grown
+                self._doc_ids.append(doc_id)
+                self._order_keys.append(None)
+                self._rows[doc_id] = position
+            self._matrix[position] = vector
+            self._order_keys[position] = order_key if order_key is not None else doc_id
+
+    def remove(self, doc_id):
+        """문서 삭제 (마지막 행을 빈 자리로 옮겨 행렬을 연속으로 유지)"""
+        with self._lock:
+            position = self._rows.pop(doc_id, None)
+            if position is None:
+                return
+            last = len(self._doc_ids) - 1
+            if position != last:
+                moved = self._doc_ids[last]
+                self._matrix[position] = self._matrix[last]
+                self._doc_ids[position] = moved
+                self._order_keys[position] = self._order_keys[last]
+                self._rows[moved] = position
+            self._matrix[last] = 0.0
+            self._doc_ids.pop()
+            self._order_keys.pop()
+
+    def search(self, text, limit=10, min_score=0.0):
+        """텍스트와 유사도(블록별 코사인 가중 평균)가 높은 문서 [(doc_id, 점수)] (점수 내림차순)"""
+        query = self.vectorizer.transform([(text, 1.0)], query=True)
+        if query is None:
+            return []
+        with self._lock:
+            count = len(self._doc_ids)
+            if count == 0:
+                return []
+            scores = self._matrix[:count] @ query
+            k = min(limit, count)
+            top = np.argpartition(-scores, k - 1)[:k] if k < count else np.arange(count)
+            results = [(int(position), float(scores[position])) for position in top if scores[position] >= min_score]
+            results.sort(key=lambda item: (-item[1], self._order_keys[item[0]]))
+            return [(self._doc_ids[position], score) for position, score in results]
+
+
+def blend_rankings(keyword_ids, vector_ids, vector_weight=0.5, k=60):
+    """키워드 / 유사도 순위 합치기 (reciprocal rank fusion, 키워드 순위 가중치 1)"""
+    scores = {}
+    for weight, ranked in ((1.0, keyword_ids), (vector_weight, vector_ids)):
+        for rank, doc_id in enumerate(ranked):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank + 1)
+    return sorted(scores, key=lambda doc_id: -scores[doc_id])
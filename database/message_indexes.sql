@@ -0,0 +1,8 @@
+-- 대화 메시지 조회 인덱스
+-- ai-service/database.py 의 fetch_recent_messages 가 사용 (재시작 후 대화 컨텍스트 복원)
+--
+-- WHERE conversation_id = ? ORDER BY created_at DESC, id DESC LIMIT N
+--   -> 대화의 최근 N 개만 인덱스 역순 스캔 (정렬 없음)
+
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created
+    ON messages (conversation_id, created_at DESC, id DESC);
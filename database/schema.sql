@@ -41,6 +41,7 @@ CREATE INDEX idx_conversations_admin_id ON conversations(admin_id);
 CREATE INDEX idx_conversations_updated_at ON conversations(updated_at DESC);
 CREATE INDEX idx_messages_conversation_id ON messages(conversation_id);
 CREATE INDEX idx_messages_created_at ON messages(created_at DESC);
+CREATE INDEX idx_messages_conversation_created ON messages(conversation_id, created_at DESC, id DESC);
 
 -- 업데이트 시간 자동 갱신 함수
 CREATE OR REPLACE FUNCTION update_updated_at_column()
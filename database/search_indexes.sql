@@ -0,0 +1,39 @@
+-- 호텔/투어 검색 인덱스 (PostgreSQL 12+)
+-- ai-service/database.py 의 search_hotels / search_tours 가 사용
+--
+-- search_text: 이름 + 지역 + 설명을 소문자로 합친 생성 컬럼
+--   -> GIN 트라이그램 인덱스로 LIKE '%검색어%' (3글자 이상) 를 인덱스 스캔
+-- search_tsv: search_text 의 단어 tsvector ('simple' 사전)
+--   -> 2글자 이하 검색어가 단어 앞에서 매칭될 때의 가산 점수 (ts_rank, '다낭:*')
+--   (2글자 이하 검색어 매칭 자체는 기존 LIKE 와 같은 부분 문자열: strpos(search_text, ...) > 0)
+-- 한글 트라이그램이 추출되려면 DB 가 UTF-8 ctype (예: C.UTF-8, ko_KR.UTF-8) 이어야 함
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 호텔
+ALTER TABLE hotels ADD COLUMN IF NOT EXISTS search_text TEXT
+    GENERATED ALWAYS AS (
+        lower(coalesce(hotel_name, '') || ' ' || coalesce(hotel_region, '') || ' ' || coalesce(description, ''))
+    ) STORED;
+
+ALTER TABLE hotels ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR
+    GENERATED ALWAYS AS (
+        to_tsvector('simple', lower(coalesce(hotel_name, '') || ' ' || coalesce(hotel_region, '') || ' ' || coalesce(description, '')))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_hotels_search_trgm ON hotels USING GIN (search_text gin_trgm_ops) WHERE is_active = true;
+CREATE INDEX IF NOT EXISTS idx_hotels_search_tsv ON hotels USING GIN (search_tsv) WHERE is_active = true;
+
+-- 투어
+ALTER TABLE tours ADD COLUMN IF NOT EXISTS search_text TEXT
+    GENERATED ALWAYS AS (
+        lower(coalesce(tour_name, '') || ' ' || coalesce(tour_region, '') || ' ' || coalesce(description, ''))
+    ) STORED;
+
+ALTER TABLE tours ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR
+    GENERATED ALWAYS AS (
+        to_tsvector('simple', lower(coalesce(tour_name, '') || ' ' || coalesce(tour_region, '') || ' ' || coalesce(description, '')))
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tours_search_trgm ON tours USING GIN (search_text gin_trgm_ops) WHERE is_active = true;
+CREATE INDEX IF NOT EXISTS idx_tours_search_tsv ON tours USING GIN (search_tsv) WHERE is_active = true;
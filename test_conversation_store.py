@@ -0,0 +1,61 @@
+import sys
+import time
+sys.path.append('ai-service')
+from conversation_store import MemoryConversationStore, ConversationRecord
+
+
+def make_record(text):
+    record = ConversationRecord()
+    record.add_turn(text, "안내드렸습니다")
+    return record
+
+
+def test_lru_eviction():
+    """크기 상한을 넘으면 가장 오래 안 쓴 대화부터 제거"""
+    record_size = make_record("다낭 래프팅").estimate_size()
+    store = MemoryConversationStore(ttl=3600, max_bytes=record_size * 3)
+    for conversation_id in (1, 2, 3):
+        store.save(conversation_id, make_record("다낭 래프팅"))
+    store.get(1)  # 1 을 최근 사용으로
+    store.save(4, make_record("다낭 래프팅"))
+
+    assert store.get(2) is None
+    assert all(store.get(conversation_id) is not None for conversation_id in (1, 3, 4))
+    stats = store.stats()
+    assert stats['evictions'] == 1 and stats['conversations'] == 3
+    assert stats['bytes'] <= stats['max_bytes']
+    print("least recently used conversation evicted:", stats['evictions'])
+
+
+def test_idle_expiry():
+    """ttl 동안 쓰지 않은 대화는 만료"""
+    store = MemoryConversationStore(ttl=0.2)
+    store.save(1, make_record("호텔 추천"))
+    assert store.get(1) is not None
+    time.sleep(0.3)
+    assert store.get(1) is None
+    stats = store.stats()
+    assert stats['expirations'] == 1 and stats['conversations'] == 0
+    print("idle conversation expired")
+
+
+def test_turn_writes_once():
+    """한 턴 안에서는 한 번 읽고 턴이 끝날 때 한 번 씀"""
+    store = MemoryConversationStore()
+    store.save(1, make_record("다낭 래프팅"))
+    reads, writes = store.reads, store.writes
+    with store.turn():
+        record = store.get(1)
+        record.add_turn("성인 2명 얼마", "예약금 8만원 + $340")
+        store.save(1, record)
+        assert store.get(1) is record
+        store.save(1, record)
+    assert (store.reads - reads, store.writes - writes) == (1, 1)
+    assert len(store.get(1).messages) == 2
+    print("turn read once / written once")
+
+
+if __name__ == "__main__":
+    test_lru_eviction()
+    test_idle_expiry()
+    test_turn_writes_once()
@@ -0,0 +1,66 @@
+import sys
+sys.path.append('ai-service')
+from party_slots import PartySlots
+
+
+def merge_all(messages, slots=None):
+    slots = slots or PartySlots()
+    for message in messages:
+        slots = slots.merged(message)
+    return slots
+
+
+def test_split_across_turns():
+    """여러 턴에 나눠 말한 인원을 하나로 합침"""
+    slots = merge_all(["성인 4명 아이 2명", "아이 한명 추가", "애들 키 90cm, 120cm, 140cm"])
+    assert slots == PartySlots(4, (90, 120, 140))
+    assert slots.summary() == "성인 4명 + 아동 3명(키 90cm, 키 120cm, 키 140cm)"
+    assert slots.as_party() == {'adults': 4, 'children': [90, 120, 140], 'infants': 0}
+    print("split turns merged:", slots.summary())
+
+
+def test_increment_and_replace():
+    """"N명 더" 는 더하고, "성인 N명이면?" 은 성인만 바꿈"""
+    slots = PartySlots(4, (90, 120, 140))
+    assert slots.merged("성인 두명 더") == PartySlots(6, (90, 120, 140))
+    assert slots.merged("성인 3명이면?") == PartySlots(3, (90, 120, 140))
+    print("increment / replace applied")
+
+
+def test_untracked_messages():
+    """1인당 / 키 구간 질문은 인원을 바꾸지 않음"""
+    slots = PartySlots(4, (90, 120, 140))
+    assert slots.merged("1인당 얼마") == slots
+    assert slots.merged("키 120cm 이하 아이") == slots
+    # 성인 수를 모르면 추가할 수 없음
+    assert PartySlots().merged("아이 1명 추가") == PartySlots()
+    assert PartySlots().as_party() is None and PartySlots().summary() == ""
+    print("untracked messages ignored")
+
+
+def test_unattributed_count():
+    """종류를 모르는 "N명" 이 섞이면 인원을 모르는 상태로 (프롬프트에 이전 대화 사용)"""
+    slots = PartySlots(4, (90, 120))
+    assert not slots.merged("성인 2명 아이들 2명").known
+    assert not slots.merged("성인 2명 초등학생 2명 얼마").known
+    assert not slots.merged("성인 1명 아이들 2명 추가").known
+    # "총 N명" 은 종류별 합과 맞으면 허용, 총 인원만 말하면 아동을 뺀 나머지가 성인
+    assert slots.merged("성인 2명 아이 1명 총 3명") == PartySlots(2, (None,))
+    assert slots.merged("총 5명") == PartySlots(3, (90, 120))
+    print("unattributed counts leave the party unknown")
+
+
+def test_fresh_start():
+    """다른 투어 질문이면 이전 인원을 버리고 다시 셈"""
+    slots = PartySlots(2, (120,)).merged("스노쿨링 성인 2명", fresh=True)
+    assert slots == PartySlots(2)
+    assert PartySlots.from_dict(slots.to_dict()) == slots
+    print("fresh slots:", slots.summary())
+
+
+if __name__ == "__main__":
+    test_split_across_turns()
+    test_increment_and_replace()
+    test_untracked_messages()
+    test_unattributed_count()
+    test_fresh_start()
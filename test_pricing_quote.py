@@ -0,0 +1,73 @@
+import sys
+sys.path.append('ai-service')
+from pricing import get_price_table, parse_party, quote, format_quote, is_price_question
+
+# tours.description 의 래프팅 가격 안내 (tour_info.json 과 같은 형식)
+RAFTING_DESCRIPTION = """래프팅 가격안내 성인 기준 예약금 (한국에서 결제) + 잔금 (현지에서 결제) 1명은
+  4만원이나 최소 두명부터 받기 때문에 1인 4만원은 계산하지 않음 2인 8만원 + $340 3인 12만원 + $445 4인
+  16만원 + $520 5인 20만원 + $595 6인 24만원 + $670 7인 28만원 + $745 8인 32만원 + $820 9명 이상은
+  직원에게 문의해주세요라고 하기 아동가격 (1인 기준) 키 90cm 미만 무료 키 90cm 이상 ~ 키 140cm 미만
+  예약금 2만원 + 잔금 $49 키 140cm 이상은 성인"""
+
+
+def rafting_quote(message):
+    table = get_price_table(RAFTING_DESCRIPTION)
+    party = parse_party(message)
+    return quote(table, party) if party else None
+
+
+def test_parse_rafting_table():
+    table = get_price_table(RAFTING_DESCRIPTION)
+    assert table is not None
+    assert table.group_prices[2] == (80000, 340)
+    assert table.group_prices[8] == (320000, 820)
+    assert table.min_party == 2 and table.max_party == 8
+    assert table.child_tiers == [(0, 90, None), (90, 140, (20000, 49))]
+    assert table.adult_height == 140
+    print("rafting price table parsed")
+
+
+def test_adults_and_child_quote():
+    """성인 2 + 아동 1(키 120cm) = 예약금 10만원 + $389"""
+    result = rafting_quote("성인 2명 아이 1명 키 120cm 얼마예요?")
+    assert (result['deposit'], result['balance']) == (100000, 389)
+    text = format_quote('다낭 래프팅', result)
+    assert "예약금 10만원" in text and "$389" in text
+    print("성인 2 + 아동 1 quote:", result['deposit'], result['balance'])
+
+
+def test_total_count():
+    """"총 N명" 은 종류별 인원 합과 맞을 때만 허용"""
+    party = parse_party("성인 2명 아이 1명 총 3명 얼마")
+    assert party == {'adults': 2, 'children': [None], 'infants': 0}
+    assert parse_party("2명 얼마") == {'adults': 2, 'children': [], 'infants': 0}
+    print("total count accepted")
+
+
+def test_height_tiers():
+    """키 90cm 미만은 무료, 140cm 이상은 성인 요금 (성인 3명 그룹 가격)"""
+    result = rafting_quote("성인 2명 아이 2명 키 80cm, 150cm 가격")
+    assert (result['deposit'], result['balance']) == (120000, 445)
+    assert result['lines'][0][2] == 3
+    print("height tiers applied")
+
+
+def test_llm_fallbacks():
+    """최대 인원 초과 / 1인당 질문 / 종류를 모르는 인원은 가격표로 계산하지 않음"""
+    assert rafting_quote("성인 9명 얼마") is None
+    assert parse_party("1인당 얼마") is None
+    assert parse_party("성인 2명 아이들 2명 얼마") is None
+    assert parse_party("성인 2명 초등학생 2명 가격") is None
+    assert parse_party("성인 2명 아이 1명 총 4명 얼마") is None
+    assert is_price_question("성인 2명이면 얼마예요?")
+    # 알 수 없는 달러 금액이 있는 가격표는 애매한 것으로 봄
+    assert get_price_table("2인 8만원 + $340 3인 12만원 + $445 단체 $999 별도") is None
+    print("fallback cases go to the LLM")
+
+
+if __name__ == "__main__":
+    test_parse_rafting_table()
+    test_adults_and_child_quote()
+    test_total_count()
+    test_height_tiers()
+    test_llm_fallbacks()
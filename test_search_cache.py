@@ -0,0 +1,42 @@
+import sys
+import time
+import asyncio
+sys.path.append('ai-service')
+from cache import TTLCache
+from search_cache import SearchCache
+
+
+def test_miss_counted_once():
+    """캐시 미스 한 번은 misses 1 (재확인 조회는 집계하지 않음), 다음 조회는 hit"""
+    search_cache = SearchCache(TTLCache(ttl=60, stale_ttl=60))
+    assert search_cache.get_or_load(('래프팅',), lambda: ['다낭 래프팅']) == ['다낭 래프팅']
+    assert search_cache.get_or_load(('래프팅',), lambda: ['다낭 래프팅']) == ['다낭 래프팅']
+
+    async def load():
+        return ['골프']
+    assert asyncio.run(search_cache.get_or_load_async(('골프',), load)) == ['골프']
+
+    stats = search_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 2, 0.333)
+    print("misses counted once:", stats['hits'], stats['misses'])
+
+
+def test_negative_entry_not_stale():
+    """빈 결과는 negative_ttl 이 지나면 stale 로 내보내지 않고 다시 조회"""
+    search_cache = SearchCache(TTLCache(ttl=60, stale_ttl=60), negative_ttl=0.1)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return [] if len(loads) == 1 else ['다낭 래프팅']
+
+    assert search_cache.get_or_load(('물놀이',), loader) == []
+    time.sleep(0.2)
+    assert search_cache.get_or_load(('물놀이',), loader) == ['다낭 래프팅']
+    assert len(loads) == 2 and search_cache.stats()['stale_served'] == 0
+    print("empty result reloaded after negative_ttl")
+
+
+if __name__ == "__main__":
+    test_miss_counted_once()
+    test_negative_entry_not_stale()
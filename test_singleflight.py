@@ -0,0 +1,93 @@
+import sys
+import time
+import asyncio
+import threading
+sys.path.append('ai-service')
+from singleflight import SingleFlight
+
+
+def test_threads_coalesced():
+    """같은 키로 동시에 들어온 호출은 한 번만 실행되고 같은 결과를 받음"""
+    flight = SingleFlight()
+    started = threading.Event()
+    results = []
+
+    def slow_search():
+        started.set()
+        time.sleep(0.2)
+        return ['다낭 래프팅']
+
+    def call():
+        results.append(flight.do(('래프팅',), slow_search))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=call) for _ in range(9)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert results == [['다낭 래프팅']] * 10
+    assert flight.stats() == {'executions': 1, 'coalesced': 9, 'in_flight': 0}
+    print("thread calls coalesced:", flight.stats())
+
+
+def test_error_shared():
+    """실행 중 예외는 기다리던 호출에도 그대로 전달"""
+    flight = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("db down")
+
+    def call():
+        try:
+            flight.do('key', failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+
+    assert errors == ["db down", "db down"]
+    assert flight.stats()['in_flight'] == 0
+    print("error shared with waiting call")
+
+
+def test_async_leader_cancelled():
+    """먼저 들어온 호출이 취소돼도 기다리던 호출은 결과를 받음"""
+    async def run():
+        flight = SingleFlight()
+
+        async def slow_search():
+            await asyncio.sleep(0.1)
+            return 'result'
+
+        leader = asyncio.ensure_future(flight.do_async('key', slow_search))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async('key', slow_search))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == 'result'
+        assert leader.cancelled()
+        return flight.stats()
+
+    stats = asyncio.run(run())
+    assert stats == {'executions': 1, 'coalesced': 1, 'in_flight': 0}
+    print("async follower survives leader cancel:", stats)
+
+
+if __name__ == "__main__":
+    test_threads_coalesced()
+    test_error_shared()
+    test_async_leader_cancelled()
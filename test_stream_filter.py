@@ -0,0 +1,57 @@
+import sys
+import random
+sys.path.append('ai-service')
+from response_filter import StreamingResponseFilter, filter_response
+
+# (질문, 호이안 맥락, 응답 원문)
+SAMPLES = [
+    ("다낭 래프팅 알려줘", False,
+     "다낭 래프팅 투어 안내입니다.\n1. 집결 08:00 2. 래프팅 3. 점심\n**포함**: 장비, 가이드\n- 준비물 - 수건"),
+    ("호이안 5명 얼마", True,
+     "호이안 투어 5명 가격입니다.\n총액: $438\n잔금 $340\n호이안 구시가지 포함"),
+    ("호이안 5명 얼마", True,
+     "호이안 투어 5명 가격입니다.\n총액: $438 (5인)\n호이안 구시가지 포함"),
+    ("호이안 투어 알려줘", True,
+     "잔금 $340 입니다\n$49 추가"),
+    ("아이 3명 가격은?", False,
+     "아동 3명 가격입니다.\n성인 3명: 예약금 18만원\n아동 3명: 잔금 $90\n총합은: $1,092"),
+    ("아이 2명 호이안 가격은?", True,
+     "아동 2명: $60\n성인 2명: $340\n$438 포함\n호이안 안내"),
+    ("투어 정보", False,
+     "일반적으로 오전에 출발합니다.\n\n\n\n보통 4시간 소요됩니다"),
+]
+
+
+def stream_text(user_message, hoi_an_context, response, rng):
+    stream = StreamingResponseFilter(user_message, hoi_an_context)
+    position = 0
+    while position < len(response):
+        size = rng.randint(1, 8)
+        stream.feed(response[position:position + size])
+        position += size
+    stream.flush()
+    return stream.text.strip()
+
+
+def test_stream_matches_batch():
+    """무작위로 나눈 스트림 필터 결과가 전체 응답 필터 결과와 같은지"""
+    rng = random.Random(12)
+    for user_message, hoi_an_context, response in SAMPLES:
+        expected = filter_response(response, user_message, hoi_an_context)
+        for _ in range(50):
+            streamed = stream_text(user_message, hoi_an_context, response, rng)
+            assert streamed == expected, (user_message, streamed, expected)
+    print("stream filter matches batch filter")
+
+
+def test_price_line_kept_without_contamination():
+    """$438 만 있고 $340 / $49 가 없으면 전체 응답 기준과 같이 지우지 않음"""
+    response = "호이안 투어 5명 가격입니다.\n총액: $438 (5인)\n호이안 구시가지 포함"
+    streamed = stream_text("호이안 5명 얼마", True, response, random.Random(1))
+    assert "$438" in streamed
+    print("uncontaminated price line kept")
+
+
+if __name__ == "__main__":
+    test_stream_matches_batch()
+    test_price_line_kept_without_contamination()
@@ -0,0 +1,43 @@
+import sys
+import json
+sys.path.append('ai-service')
+from catalog import Catalog, VECTOR_SEARCH
+
+
+def load_catalog():
+    """tour_info.json 투어로 만든 메모리 카탈로그 (DB 없이)"""
+    with open('tour_info.json', encoding='utf-8') as f:
+        tours = [dict(tour, id=tour['index']) for tour in json.load(f)]
+    catalog = Catalog(lambda since: [], lambda since: tours)
+    catalog.load()
+    return catalog
+
+
+def tour_names(catalog, query_terms):
+    return [tour['tour_name'] for tour in catalog.search_tours(query_terms)]
+
+
+def test_paraphrase_finds_rafting():
+    """투어명이 없는 바꿔 말하기(물놀이 / 급류타기)도 래프팅 투어를 찾음"""
+    catalog = load_catalog()
+    assert tour_names(catalog, ['물놀이']) == ['래프팅']
+    assert tour_names(catalog, ['급류타기']) == ['래프팅']
+    assert tour_names(catalog, ['애들이랑', '물놀이'])[0] == '래프팅'
+    assert tour_names(catalog, ['가족', '여행'])[0] == '패밀리팩'
+    print("paraphrases found:", tour_names(catalog, ['물놀이']))
+
+
+def test_unrelated_query_empty():
+    """카탈로그에 없는 활동은 비슷한 글자만으로 투어를 끌어오지 않음"""
+    catalog = load_catalog()
+    assert tour_names(catalog, ['스노클링']) == []
+    assert tour_names(catalog, ['마사지']) == []
+    print("unrelated query returns nothing")
+
+
+if __name__ == "__main__":
+    if not VECTOR_SEARCH:
+        print("numpy 가 없어 벡터 검색 확인을 건너뜀")
+    else:
+        test_paraphrase_finds_rafting()
+        test_unrelated_query_empty()